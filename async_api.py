@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter
+
+import counters
+import db_async
+
+# Async versions of the dashboard read endpoints. auth.py mounts this router
+# ahead of its own routes when FIXIT_ASYNC_DB=1, so these handlers shadow the
+# sync ones on the same paths.
+#
+# Only these three dashboard reads have async twins. They are stateless
+# aggregate queries that every admin page polls, which is where a sync
+# worker's threadpool fills up first. The complaint reads and writes stay
+# sync on purpose: detail and history are answered from view_cache (most
+# requests do no database work at all), and the write paths run counters,
+# rollups, sketches, events and dedupe inside one mysql.connector
+# transaction; porting them to aiomysql would mean a second copy of all of
+# that to keep in step. Compare the two modes with benchmarks/bench_http.py
+# against a running server and database before widening this.
+router = APIRouter()
+
+
+@router.on_event("startup")
+async def open_async_pool():
+    await db_async.open_pool()
+
+
+@router.on_event("shutdown")
+async def close_async_pool():
+    await db_async.close_pool()
+
+
+# ===================== ADMIN STATS =====================
+@router.get("/api/stats")
+async def admin_stats():
+    # served from the incrementally maintained counters (see counters.py)
+    today = datetime.now().date()
+    totals, daily = await asyncio.gather(
+        db_async.fetch_all(counters.TOTALS_SQL),
+        db_async.fetch_all(counters.DAILY_SQL, (today - timedelta(days=1),)),
+    )
+    return counters.summarize(totals, daily, today)
+
+
+# ===================== ESCALATIONS LIST =====================
+@router.get("/escalations")
+async def get_escalations():
+    rows = await db_async.fetch_all("""
+        SELECT id, type, priority, department
+        FROM complaints
+        WHERE status = 'Escalated'
+        ORDER BY escalated_at DESC
+        LIMIT 10
+    """)
+    return {"escalated": rows}
+
+
+# ===================== AI SUGGESTION =====================
+@router.get("/api/ai-suggestion")
+async def ai_suggestion():
+    top = await db_async.fetch_one("""
+        SELECT department, COUNT(*) as count
+        FROM complaints
+        GROUP BY department
+        ORDER BY count DESC
+        LIMIT 1
+    """)
+
+    if not top:
+        return {"suggestion": "No data available yet."}
+
+    return {
+        "suggestion": f"Most complaints are from {top['department']}. Consider allocating more resources there."
+    }
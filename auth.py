@@ -1,12 +1,38 @@
-from fastapi import FastAPI, HTTPException, Path
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Path, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime, timedelta
-import math
+from pydantic import BaseModel, ValidationError
+from typing import Literal, Optional
+from datetime import date, datetime, timedelta
+from collections import Counter
+import base64
+import json
+import threading
 
 import mysql.connector as sql
-import bcrypt
+
+import config
+import counters
+import dedupe
+import events
+import feed
+import fastjson
+from fastjson import FastJSONResponse
+from escalations import escalation_scheduler, sweeps
+import migrations
+from db import db_cursor, pool, PoolTimeout
+from hashing import hash_pool, HashQueueFull, HashTimeout
+import hashing
+from geo import GEOM_FROM_WKT, bbox_wkt, bounding_box, point_wkt
+from hotset import hotset
+import heatmap
+import ranking
+import rollups
+import sketches
+from writebehind import write_behind
+from nearby_cache import nearby_cache, nearest
+from view_cache import view_cache, bump_history, bump_users, parse_if_none_match
 
 app = FastAPI()
 
@@ -23,85 +49,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ===================== DB CONNECTION =====================
-def get_conn():
-    return sql.connect(
-        host="localhost",
-        user="fixit_user",
-        password="fixit1234",
-        database="fixit",
-        port=3306
+# ===================== ASYNC MODE =====================
+# mounted first so its async handlers take precedence over the sync ones below
+if config.ASYNC_DB:
+    import async_api
+    import db_async
+    app.include_router(async_api.router)
+
+# ===================== OVERLOAD ERRORS =====================
+@app.exception_handler(PoolTimeout)
+def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, please retry"},
+        headers={"Retry-After": "1"},
     )
 
-# ===================== ENSURE TABLES =====================
-def ensure_tables():
-    conn = None
-    cursor = None
-    try:
-        conn = get_conn()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(100) NOT NULL,
-            aadhar_no VARCHAR(12) NOT NULL UNIQUE,
-            mobile_no VARCHAR(15) NOT NULL UNIQUE,
-            password VARCHAR(255) NOT NULL,
-            lat DECIMAL(10,8) NULL,
-            lng DECIMAL(11,8) NULL,
-            location_text VARCHAR(255) NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        );
-        """)
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS complaints (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT NOT NULL,
-            type VARCHAR(50) NOT NULL,
-            description TEXT,
-            image_url TEXT,
-            status ENUM('Reported','Acknowledged','InProgress','Resolved','Escalated') DEFAULT 'Reported',
-            priority VARCHAR(20) NOT NULL,
-            department VARCHAR(50) NOT NULL,
-            latitude DECIMAL(10,8),
-            longitude DECIMAL(11,8),
-            reported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            acknowledged_at DATETIME NULL,
-            in_progress_at DATETIME NULL,
-            resolved_at DATETIME NULL,
-            escalated_at DATETIME NULL,
-            CONSTRAINT fk_complaints_user FOREIGN KEY (user_id) REFERENCES users(id)
-                ON DELETE CASCADE
-        );
-        """)
+@app.exception_handler(HashQueueFull)
+def hash_queue_full_handler(request: Request, exc: HashQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-ins right now, please retry"},
+        headers={"Retry-After": "2"},
+    )
 
-        conn.commit()
-        print("✅ users + complaints tables ensured")
+@app.exception_handler(HashTimeout)
+def hash_timeout_handler(request: Request, exc: HashTimeout):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Sign-in is slow right now, please retry"},
+        headers={"Retry-After": "2"},
+    )
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
+# ===================== SCHEMA =====================
+def ensure_tables():
+    with db_cursor(dictionary=False) as (conn, cursor):
+        applied = migrations.migrate(conn, cursor)
+    if applied:
+        print(f"✅ schema migrated to version {migrations.LATEST_VERSION}")
+    else:
+        print(f"✅ schema already at version {migrations.LATEST_VERSION}")
+
+
+# ===================== BACKGROUND JOBS =====================
+def publish_status(old, new, at):
+    # live feed event for a committed status transition
+    feed.bus.publish({
+        "type": "escalated" if new["status"] == "Escalated" else "status",
+        "complaint_id": new["id"],
+        "user_id": new.get("user_id"),
+        "status": new["status"],
+        "previous_status": old.get("status") if old else None,
+        "complaint_type": new.get("type"),
+        "priority": new.get("priority"),
+        "department": new.get("department"),
+        "at": at,
+    })
+
+def on_escalated(rows):
+    # called by the escalation scheduler and overdue sweeps after each committed batch
+    for row in rows:
+        hotset.upsert(row)
+        nearby_cache.invalidate_point(row.get("latitude"), row.get("longitude"))
+        view_cache.invalidate_complaint(row["id"])
+        publish_status(None, row, row.get("escalated_at"))
 
 
 @app.on_event("startup")
 def startup():
     ensure_tables()
+    hash_pool.start()
+    rounds = hashing.calibrate()
+    print(f"✅ bcrypt cost factor: {rounds}")
+    if hotset.enabled:
+        with db_cursor() as (conn, cursor):
+            hotset.load(cursor)
+        hotset.start_refresh(db_cursor, config.HOTSET_REFRESH_S)
+        print(f"✅ hot set loaded: {hotset.stats()['open_complaints']} open complaints")
+    counters.reconciler.start(db_cursor, config.COUNTER_RECONCILE_S)
+    rollups.reconciler.start(db_cursor, config.ROLLUP_RECONCILE_S)
+    sketches.reconciler.start(db_cursor, config.SKETCH_RECONCILE_S)
+    heatmap.reconciler.start(db_cursor, config.HEATMAP_RECONCILE_S)
+    if escalation_scheduler.enabled:
+        with db_cursor() as (conn, cursor):
+            escalation_scheduler.load(cursor)
+        escalation_scheduler.start(db_cursor, on_escalated, config.ESCALATION_RELOAD_S)
+        print(f"✅ escalation scheduler tracking {escalation_scheduler.stats()['tracked']} deadlines")
+    if write_behind.enabled:
+        replayed = write_behind.open()
+        write_behind.start(db_cursor, write_submissions, publish_created)
+        print(f"✅ write-behind queue on {write_behind.journal.path}, {replayed} submissions replayed")
     print("✅ Backend started")
 
 
+@app.on_event("shutdown")
+def shutdown():
+    hotset.stop()
+    counters.reconciler.stop()
+    rollups.reconciler.stop()
+    sketches.reconciler.stop()
+    heatmap.reconciler.stop()
+    escalation_scheduler.stop()
+    write_behind.stop()
+    pool.close_all()
+    hash_pool.shutdown()
+
+
 @app.get("/")
 def health():
     return {"status": "ok", "message": "API running"}
 
 
+# ===================== METRICS =====================
+@app.get("/api/metrics")
+def metrics():
+    result = {"db_pool": pool.stats(), "hash_pool": hash_pool.stats(), "hotset": hotset.stats(),
+              "nearby_cache": nearby_cache.stats(), "counters": counters.reconciler.stats(),
+              "rollups": rollups.reconciler.stats(), "sketches": sketches.reconciler.stats(),
+              "heatmap": heatmap.reconciler.stats(),
+              "escalation_scheduler": escalation_scheduler.stats(), "write_behind": write_behind.stats(),
+              "view_cache": view_cache.stats(), "feed": feed.bus.stats()}
+    if config.ASYNC_DB:
+        result["async_db_pool"] = db_async.stats()
+    return result
+
+
 # ===================== TIME FORMAT HELPERS =====================
 def day_suffix(day: int) -> str:
     if 11 <= day <= 13:
@@ -145,8 +217,6 @@ class LoginModel(BaseModel):
 # ===================== SIGNUP =====================
 @app.post("/api/signup")
 def signup(data: SignupModel):
-    conn = None
-    cursor = None
     try:
         aadhar = (data.aadhar or "").strip()
         if len(aadhar) != 12 or not aadhar.isdigit():
@@ -163,71 +233,82 @@ def signup(data: SignupModel):
         if not password:
             raise HTTPException(status_code=400, detail="Password required")
 
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT id FROM users WHERE aadhar_no=%s", (aadhar,))
+            if cursor.fetchone():
+                raise HTTPException(status_code=409, detail="Aadhaar already registered")
 
-        cursor.execute("SELECT id FROM users WHERE aadhar_no=%s", (aadhar,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=409, detail="Aadhaar already registered")
+            cursor.execute("SELECT id FROM users WHERE mobile_no=%s", (mobile,))
+            if cursor.fetchone():
+                raise HTTPException(status_code=409, detail="Mobile already registered")
 
-        cursor.execute("SELECT id FROM users WHERE mobile_no=%s", (mobile,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=409, detail="Mobile already registered")
+        # hash without holding a pooled connection
+        hashed_pw = hash_pool.hash_password(password)
 
-        hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                """
+                INSERT INTO users (name, aadhar_no, mobile_no, password, lat, lng, location_text)
+                VALUES (%s,%s,%s,%s,%s,%s,%s)
+                """,
+                (name, aadhar, mobile, hashed_pw, data.lat, data.lng, data.location_text),
+            )
+            user_id = cursor.lastrowid
+            counters.apply(cursor, {(None, "users"): 1})
+            conn.commit()
 
-        cursor.execute(
-            """
-            INSERT INTO users (name, aadhar_no, mobile_no, password, lat, lng, location_text)
-            VALUES (%s,%s,%s,%s,%s,%s,%s)
-            """,
-            (name, aadhar, mobile, hashed_pw, data.lat, data.lng, data.location_text),
-        )
-        conn.commit()
+            return {"status": "success", "user_id": user_id, "name": name}
 
-        return {"status": "success", "user_id": cursor.lastrowid, "name": name}
+    except sql.IntegrityError:
+        # lost a race with a concurrent signup for the same Aadhaar/mobile
+        raise HTTPException(status_code=409, detail="Aadhaar or mobile already registered")
 
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
-
 
 # ===================== LOGIN =====================
+def rehash_password(user_id: int, old_hash: str, password: str):
+    # runs after the login response is sent; opportunistic: only when a
+    # worker is free, and never fails the login
+    if not hash_pool.is_idle():
+        return
+    try:
+        new_hash = hash_pool.hash_password(password)
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                "UPDATE users SET password=%s WHERE id=%s AND password=%s",
+                (new_hash, user_id, old_hash),
+            )
+            conn.commit()
+    except (HashQueueFull, HashTimeout, sql.Error):
+        pass
+
 @app.post("/api/login")
-def login(data: LoginModel):
-    conn = None
-    cursor = None
+def login(data: LoginModel, background_tasks: BackgroundTasks):
     try:
         aadhar = (data.aadhar or "").strip()
         password = (data.password or "").strip()
 
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute(
-            """
-            SELECT id, name, password, mobile_no, aadhar_no, lat, lng, location_text
-            FROM users
-            WHERE aadhar_no=%s
-            """,
-            (aadhar,),
-        )
-        user = cursor.fetchone()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        if not bcrypt.checkpw(password.encode("utf-8"), user["password"].encode("utf-8")):
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                """
+                SELECT id, name, password, mobile_no, aadhar_no, lat, lng, location_text
+                FROM users
+                WHERE aadhar_no=%s
+                """,
+                (aadhar,),
+            )
+            user = cursor.fetchone()
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+
+        if not hash_pool.check_password(password, user["password"]):
             raise HTTPException(status_code=401, detail="Invalid password")
 
+        if hash_pool.needs_rehash(user["password"]):
+            background_tasks.add_task(rehash_password, user["id"], user["password"], password)
+
         return {
             "status": "success",
             "user_id": user["id"],
@@ -242,16 +323,6 @@ def login(data: LoginModel):
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
-
 
 # ===================== COMPLAINT MODELS =====================
 class ComplaintCreateModel(BaseModel):
@@ -270,137 +341,635 @@ class ComplaintAdminUpdateModel(BaseModel):
 
 ADMIN_ALLOWED_STATUS = ["Acknowledged", "InProgress", "Resolved", "Escalated"]
 
+# fields= names accepted by the complaint list endpoints -> SQL (c = complaints, u = owner)
+COMPLAINT_FIELDS = {
+    "id": "c.id",
+    "user_id": "c.user_id",
+    "type": "c.type",
+    "description": "c.description",
+    "image_url": "c.image_url",
+    "status": "c.status",
+    "priority": "c.priority",
+    "department": "c.department",
+    "latitude": "c.latitude",
+    "longitude": "c.longitude",
+    "reported_at": "c.reported_at",
+    "acknowledged_at": "c.acknowledged_at",
+    "in_progress_at": "c.in_progress_at",
+    "resolved_at": "c.resolved_at",
+    "escalated_at": "c.escalated_at",
+    "reports_count": "c.reports_count",
+    "location_text": "u.location_text",
+}
+# every field above; never c.*, whose binary location column can't be encoded
+COMPLAINT_SELECT = fastjson.projection(COMPLAINT_FIELDS, COMPLAINT_FIELDS)
+
+def list_fields(fields, allowed, default, required=()):
+    try:
+        return fastjson.select_fields(fields, allowed, default, required)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def list_response(payload, key, rows, names, shape):
+    """payload[key] = rows as objects, or column arrays for shape=columnar."""
+    payload[key] = fastjson.columnar(rows, names) if shape == "columnar" else rows
+    return FastJSONResponse(content=payload)
+
 
 # ===================== CREATE COMPLAINT =====================
-@app.post("/api/complaints")
-def create_complaint(data: ComplaintCreateModel):
-    conn = None
-    cursor = None
-    try:
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
+COMPLAINT_INSERT_SQL = """
+    INSERT INTO complaints
+    (user_id, type, description, image_url, status, priority, department,
+     latitude, longitude, location, reported_at, submission_id)
+    VALUES {values}
+"""
+COMPLAINT_VALUES = f"(%s,%s,%s,%s,%s,%s,%s,%s,%s,{GEOM_FROM_WKT},%s,%s)"
+
+def complaint_params(data: ComplaintCreateModel, reported_at: datetime, submission_id=None):
+    return (
+        data.user_id,
+        data.type,
+        data.description,
+        data.image_url,
+        "Reported",
+        data.priority,
+        data.department,
+        data.latitude,
+        data.longitude,
+        point_wkt(data.latitude, data.longitude),
+        reported_at,
+        submission_id,
+    )
 
-        cursor.execute("SELECT id FROM users WHERE id=%s", (data.user_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="User not found")
+def created_row(data: ComplaintCreateModel, complaint_id: int, reported_at: datetime):
+    return {
+        "id": complaint_id,
+        "user_id": data.user_id,
+        "type": data.type,
+        "priority": data.priority,
+        "department": data.department,
+        "status": "Reported",
+        "description": data.description,
+        "latitude": data.latitude,
+        "longitude": data.longitude,
+        "reported_at": reported_at,
+    }
+
+def apply_created(cursor, rows):
+    # counter/rollup/heatmap deltas and change-feed events for new complaints; the
+    # last step of the insert's transaction
+    delta = Counter()
+    rollup_delta = {}
+    heatmap_delta = {}
+    for row in rows:
+        delta.update(counters.changes(None, row))
+        rollups.merge(rollup_delta, rollups.changes(None, row))
+        heatmap.merge(heatmap_delta, heatmap.changes(None, row))
+    counters.apply(cursor, delta)
+    rollups.apply(cursor, rollup_delta)
+    heatmap.apply(cursor, heatmap_delta)
+    events.append(cursor, [events.event("created", None, row, row["reported_at"]) for row in rows])
+
+def publish_created(rows):
+    # in-process read models; after commit
+    for row in rows:
+        hotset.upsert(row)
+        nearby_cache.invalidate_point(row["latitude"], row["longitude"])
+        escalation_scheduler.track(row)
+        view_cache.invalidate_user(row["user_id"])
+
+def known_user_ids(cursor, user_ids):
+    """The subset of user_ids that exist, in one query."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return set()
+    cursor.execute(
+        f"SELECT id FROM users WHERE id IN ({','.join(['%s'] * len(user_ids))})",
+        tuple(user_ids),
+    )
+    return {row["id"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+
+def insert_complaints(conn, cursor, items):
+    """Insert [(key, data, reported_at, submission_id)] as one multi-row INSERT.
 
+    Commits on success. If the batch fails it is rolled back and retried
+    row by row, one commit each, so the error lands on the offending item.
+    Returns (created [(key, row)], failed [(key, error)]).
+    """
+    created, failed = [], []
+    try:
+        bump_users(cursor, (data.user_id for _, data, _, _ in items))
         cursor.execute(
-            """
-            INSERT INTO complaints
-            (user_id, type, description, image_url, status, priority, department,
-             latitude, longitude, reported_at)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """,
-            (
-                data.user_id,
-                data.type,
-                data.description,
-                data.image_url,
-                "Reported",
-                data.priority,
-                data.department,
-                data.latitude,
-                data.longitude,
-                datetime.now(),
-            ),
+            COMPLAINT_INSERT_SQL.format(values=", ".join([COMPLAINT_VALUES] * len(items))),
+            tuple(v for _, data, at, sid in items for v in complaint_params(data, at, sid)),
         )
+        # a multi-row INSERT takes one consecutive block of ids; lastrowid is the first
+        first_id = cursor.lastrowid
+        cursor.execute("SELECT @@auto_increment_increment")
+        step = cursor.fetchone()[0]
+        for n, (key, data, at, _) in enumerate(items):
+            created.append((key, created_row(data, first_id + n * step, at)))
+        apply_created(cursor, [row for _, row in created])
         conn.commit()
+        return created, failed
+    except sql.Error:
+        conn.rollback()
+        created = []
 
-        return {"status": "success", "message": "Complaint created", "complaint_id": cursor.lastrowid}
+    for key, data, at, sid in items:
+        try:
+            bump_users(cursor, [data.user_id])
+            cursor.execute(
+                COMPLAINT_INSERT_SQL.format(values=COMPLAINT_VALUES),
+                complaint_params(data, at, sid),
+            )
+            row = created_row(data, cursor.lastrowid, at)
+            apply_created(cursor, [row])
+            conn.commit()
+            created.append((key, row))
+        except sql.Error as e:
+            conn.rollback()
+            failed.append((key, f"MySQL error: {str(e)}"))
+    return created, failed
+
+def link_duplicates(conn, cursor, items):
+    """Link items that repeat an open complaint to it (see dedupe.py) and commit.
+
+    items are [(key, data, reported_at, submission_id)]. Returns (linked
+    [(key, canonical {"id", "reports_count"} after the link)], the items
+    that still need inserting). Retries the whole step on a deadlock.
+    """
+    if not config.DEDUPE_ENABLED:
+        return [], items
+    for attempt in range(1, dedupe.LINK_ATTEMPTS + 1):
+        try:
+            return _link_duplicates(conn, cursor, items)
+        except sql.Error as e:
+            conn.rollback()
+            if e.errno != dedupe.ER_LOCK_DEADLOCK or attempt == dedupe.LINK_ATTEMPTS:
+                raise
+
+def _link_duplicates(conn, cursor, items):
+    # look everything up first, so the writes below stay short
+    found, rest = [], []
+    for item in items:
+        _, data, at, _ = item
+        canonical = None
+        if data.latitude is not None and data.longitude is not None:
+            canonical = dedupe.find_canonical(cursor, data.type, data.latitude, data.longitude, at)
+        if canonical:
+            found.append((item, canonical))
+        else:
+            rest.append(item)
+    if not found:
+        return [], rest
+
+    # resolved since the lookup: insert those as new complaints instead
+    reports = dedupe.lock_canonicals(cursor, (canonical["id"] for _, canonical in found))
+    rest.extend(item for item, canonical in found if canonical["id"] not in reports)
+    found = [(item, canonical) for item, canonical in found if canonical["id"] in reports]
+    linked = []
+    for (key, data, at, sid), canonical in found:
+        dedupe.link(cursor, canonical["id"], data, at, canonical["distance_m"], sid)
+        reports[canonical["id"]] += 1
+        linked.append((key, {"id": canonical["id"], "reports_count": reports[canonical["id"]]}))
+    conn.commit()
+    for (_, data, _, _), canonical in found:
+        view_cache.invalidate_complaint(canonical["id"])
+        view_cache.invalidate_user(data.user_id)
+    return linked, rest
+
+@app.post("/api/complaints")
+def create_complaint(data: ComplaintCreateModel):
+    try:
+        with db_cursor() as (conn, cursor):
+            # whole seconds, as stored, so counters bucket it the way MySQL will
+            reported_at = datetime.now().replace(microsecond=0)
+
+            if config.DEDUPE_ENABLED and data.latitude is not None and data.longitude is not None:
+                # a plain read: a link locks the canonical complaint before any users row
+                if not known_user_ids(cursor, [data.user_id]):
+                    raise HTTPException(status_code=404, detail="User not found")
+                linked, _ = link_duplicates(conn, cursor, [(None, data, reported_at, None)])
+                if linked:
+                    _, canonical = linked[0]
+                    return {
+                        "status": "success",
+                        "message": "Already reported; your report was added to the existing complaint",
+                        "complaint_id": canonical["id"],
+                        "duplicate": True,
+                        "reports_count": canonical["reports_count"],
+                    }
+
+            # doubles as the existence check, and locks the user row before the insert
+            if not bump_users(cursor, [data.user_id]):
+                raise HTTPException(status_code=404, detail="User not found")
+
+            cursor.execute(
+                COMPLAINT_INSERT_SQL.format(values=COMPLAINT_VALUES),
+                complaint_params(data, reported_at),
+            )
+            row = created_row(data, cursor.lastrowid, reported_at)
+            apply_created(cursor, [row])
+            conn.commit()
+
+        publish_created([row])
+
+        return {"status": "success", "message": "Complaint created", "complaint_id": row["id"], "duplicate": False}
 
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-    finally:
+
+# ===================== QUEUED COMPLAINT SUBMISSION =====================
+# Write-behind path (FIXIT_WRITE_BEHIND=1): the complaint is journaled
+# locally and acknowledged with a submission id; writebehind flushes it to
+# MySQL with others in one group-committed batch, linking near-duplicates
+# the way create_complaint does.
+def complaint_fields(data: ComplaintCreateModel):
+    return {
+        "user_id": data.user_id,
+        "type": data.type,
+        "priority": data.priority,
+        "department": data.department,
+        "description": data.description,
+        "image_url": data.image_url,
+        "latitude": data.latitude,
+        "longitude": data.longitude,
+    }
+
+def write_submissions(conn, cursor, records):
+    """Write-behind batch writer: ({submission id: status}, created rows)."""
+    sids = [record["sid"] for record in records]
+    placeholders = ",".join(["%s"] * len(sids))
+    cursor.execute(
+        f"""
+        SELECT submission_id, id, FALSE FROM complaints WHERE submission_id IN ({placeholders})
+        UNION ALL
+        SELECT submission_id, complaint_id, TRUE FROM complaint_duplicates WHERE submission_id IN ({placeholders})
+        """,
+        (*sids, *sids),
+    )
+    # already written before a crash; replay must not insert them again
+    results = {
+        sid: {"state": "committed", "complaint_id": cid, "duplicate": bool(duplicate)}
+        for sid, cid, duplicate in cursor.fetchall()
+    }
+
+    fresh = [(record, ComplaintCreateModel(**record["data"])) for record in records if record["sid"] not in results]
+    known = known_user_ids(cursor, (data.user_id for _, data in fresh))
+    items = []
+    for record, data in fresh:
+        if data.user_id in known:
+            items.append((record["sid"], data, datetime.fromisoformat(record["at"]), record["sid"]))
+        else:
+            results[record["sid"]] = {"state": "failed", "error": "User not found"}
+    linked, items = link_duplicates(conn, cursor, items)
+    for sid, canonical in linked:
+        results[sid] = {"state": "committed", "complaint_id": canonical["id"], "duplicate": True}
+    created, failed = insert_complaints(conn, cursor, items) if items else ([], [])
+    for sid, row in created:
+        results[sid] = {"state": "committed", "complaint_id": row["id"], "duplicate": False}
+    for sid, error in failed:
+        results[sid] = {"state": "failed", "error": error}
+    return results, [row for _, row in created]
+
+@app.post("/api/complaints/queued", status_code=202)
+def submit_complaint(data: ComplaintCreateModel):
+    if not write_behind.enabled:
+        raise HTTPException(status_code=503, detail="Queued submission is disabled; use POST /api/complaints")
+    reported_at = datetime.now().replace(microsecond=0)
+    try:
+        submission_id = write_behind.submit(complaint_fields(data), reported_at)
+    except OSError as e:
+        raise HTTPException(status_code=503, detail=f"Could not journal submission: {str(e)}")
+    return {
+        "status": "accepted",
+        "submission_id": submission_id,
+        "status_url": f"/api/complaints/submissions/{submission_id}",
+    }
+
+@app.get("/api/complaints/submissions/{submission_id}")
+def submission_status(submission_id: str):
+    # statuses are per worker (see writebehind.py): another worker only
+    # knows a submission once its row is written
+    status = write_behind.status(submission_id)
+    if status is None:
+        # not seen by this worker (or aged out): look for the written row
         try:
-            if cursor: cursor.close()
-        except:
-            pass
+            with db_cursor() as (conn, cursor):
+                cursor.execute(
+                    """
+                    SELECT id, FALSE AS duplicate FROM complaints WHERE submission_id=%s
+                    UNION ALL
+                    SELECT complaint_id, TRUE FROM complaint_duplicates WHERE submission_id=%s
+                    """,
+                    (submission_id, submission_id),
+                )
+                row = cursor.fetchone()
+        except sql.Error as e:
+            raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
+        if not row:
+            raise HTTPException(
+                status_code=404,
+                detail="Submission not found; it may still be queued on another worker, retry shortly",
+            )
+        status = {"state": "committed", "complaint_id": row["id"], "duplicate": bool(row["duplicate"])}
+    return {"submission_id": submission_id, **status}
+
+
+# ===================== BULK CREATE COMPLAINTS =====================
+# Accepts a JSON array or NDJSON (one complaint per line, streamed). Items
+# are handled chunk_size at a time: one set-based user lookup, near-duplicate
+# links (see dedupe.py), then one multi-row INSERT in its own transaction. If ingestion stops after some
+# chunks committed (too many items, a database error), the answer is a 207
+# with those chunks' results and the error rather than a bare error status.
+def item_error(e: ValidationError) -> str:
+    first = e.errors()[0]
+    return f"{'.'.join(str(p) for p in first['loc'])}: {first['msg']}"
+
+def ingest_chunk(items, first_index):
+    """Validate and insert one chunk; returns a {"index", "id"|"error"} result per item."""
+    results = []
+    valid = []
+    for offset, item in enumerate(items):
+        index = first_index + offset
+        if isinstance(item, Exception):
+            results.append({"index": index, "error": f"Invalid JSON: {item}"})
+            continue
+        if not isinstance(item, dict):
+            results.append({"index": index, "error": "Each item must be a JSON object"})
+            continue
         try:
-            if conn: conn.close()
-        except:
-            pass
+            valid.append((index, ComplaintCreateModel(**item)))
+        except ValidationError as e:
+            results.append({"index": index, "error": item_error(e)})
+    if not valid:
+        return results
+
+    with db_cursor(dictionary=False) as (conn, cursor):
+        known = known_user_ids(cursor, (data.user_id for _, data in valid))
+        reported_at = datetime.now().replace(microsecond=0)
+        pending = []
+        for index, data in valid:
+            if data.user_id in known:
+                pending.append((index, data, reported_at, None))
+            else:
+                results.append({"index": index, "error": "User not found"})
+        linked, pending = link_duplicates(conn, cursor, pending)
+        results.extend({"index": index, "id": canonical["id"], "duplicate": True} for index, canonical in linked)
+        if not pending:
+            return results
+        created, failed = insert_complaints(conn, cursor, pending)
+
+    publish_created([row for _, row in created])
+    results.extend({"index": index, "id": row["id"]} for index, row in created)
+    results.extend({"index": index, "error": error} for index, error in failed)
+    return results
+
+async def ndjson_items(request: Request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+def parse_item(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+@app.post("/api/complaints/bulk")
+async def bulk_create_complaints(request: Request, chunk_size: int = config.BULK_CHUNK_SIZE):
+    if chunk_size <= 0 or chunk_size > config.BULK_MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be between 1 and {config.BULK_MAX_CHUNK_SIZE}")
+
+    results = []
+    received = 0
+    # set when ingestion has to stop early: {"status_code", "detail"}
+    stopped = None
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            # streamed: each chunk is inserted while the rest is still arriving
+            chunk = []
+            async for line in ndjson_items(request):
+                if received == config.BULK_MAX_ITEMS:
+                    stopped = {"status_code": 413, "detail": f"At most {config.BULK_MAX_ITEMS} items per request"}
+                    break
+                chunk.append(parse_item(line))
+                received += 1
+                if len(chunk) == chunk_size:
+                    results.extend(await run_in_threadpool(ingest_chunk, chunk, received - len(chunk)))
+                    chunk = []
+            if chunk:
+                results.extend(await run_in_threadpool(ingest_chunk, chunk, received - len(chunk)))
+        else:
+            try:
+                items = json.loads(await request.body())
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+            if not isinstance(items, list):
+                raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+            if len(items) > config.BULK_MAX_ITEMS:
+                raise HTTPException(status_code=413, detail=f"At most {config.BULK_MAX_ITEMS} items per request")
+            received = len(items)
+            for start in range(0, received, chunk_size):
+                results.extend(await run_in_threadpool(ingest_chunk, items[start:start + chunk_size], start))
+
+    except sql.Error as e:
+        stopped = {"status_code": 500, "detail": f"MySQL error: {str(e)}"}
+    except PoolTimeout:
+        if not any("id" in r for r in results):
+            raise
+        stopped = {"status_code": 503, "detail": "Database busy, please retry"}
+
+    results.sort(key=lambda r: r["index"])
+    linked = sum(1 for r in results if r.get("duplicate"))
+    inserted = sum(1 for r in results if "id" in r) - linked
+    if stopped is None:
+        return {
+            "status": "success",
+            "received": received,
+            "inserted": inserted,
+            "linked": linked,
+            "failed": received - inserted - linked,
+            "results": results,
+        }
+    if not inserted + linked:
+        raise HTTPException(**stopped)
+    # earlier chunks are committed: report them next to the error instead of
+    # an error response that hides them. Items from index "processed" on were
+    # not ingested and can be resent.
+    return JSONResponse(
+        status_code=207,
+        content={
+            "status": "partial",
+            "error": stopped,
+            "received": received,
+            "processed": len(results),
+            "inserted": inserted,
+            "linked": linked,
+            "failed": len(results) - inserted - linked,
+            "results": results,
+        },
+    )
 
 
 # ===================== GET COMPLAINTS BY USER =====================
+def render_json(payload) -> bytes:
+    return fastjson.dumps(payload)
+
+def cached_view(request: Request, key, probe, load):
+    """Serve a view_cache entry: 200 with the cached body, 304, or None (no such view)."""
+    found = view_cache.lookup(key, parse_if_none_match(request.headers.get("if-none-match")), probe, load)
+    if found is None:
+        return None
+    etag, body = found
+    # always revalidate, so the browser sends If-None-Match on every visit
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/api/complaints/user/{user_id}")
-def get_user_complaints(user_id: int):
-    conn = None
-    cursor = None
+def get_user_complaints(request: Request, user_id: int):
+    def probe():
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT history_version FROM users WHERE id=%s", (user_id,))
+            row = cursor.fetchone()
+        # unknown users keep getting an empty history, stamped 0
+        return row["history_version"] if row else 0
+
+    def load():
+        with db_cursor() as (conn, cursor):
+            # stamp first: if a write lands in between, the body is newer than
+            # its stamp and the next revalidation reloads it
+            cursor.execute("SELECT history_version FROM users WHERE id=%s", (user_id,))
+            stamp = cursor.fetchone()
+            # own complaints, plus the ones this user reported again as a duplicate
+            cursor.execute(
+                f"""
+                SELECT {COMPLAINT_SELECT}, FALSE AS linked
+                FROM complaints c
+                JOIN users u ON u.id = c.user_id
+                WHERE c.user_id=%s
+                UNION ALL
+                SELECT {COMPLAINT_SELECT}, TRUE AS linked
+                FROM (SELECT DISTINCT complaint_id FROM complaint_duplicates WHERE user_id=%s) d
+                JOIN complaints c ON c.id = d.complaint_id
+                JOIN users u ON u.id = c.user_id
+                WHERE c.user_id <> %s
+                ORDER BY reported_at DESC
+                """,
+                (user_id, user_id, user_id),
+            )
+            rows = cursor.fetchall()
+        version = stamp["history_version"] if stamp else 0
+        return version, render_json({"status": "success", "complaints": rows}), [row["id"] for row in rows]
+
     try:
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
+        return cached_view(request, ("user", user_id), probe, load)
 
-        cursor.execute(
-            """
-            SELECT c.*, u.location_text
-            FROM complaints c
-            JOIN users u ON u.id = c.user_id
-            WHERE c.user_id=%s
-            ORDER BY c.reported_at DESC
-            """,
-            (user_id,),
+    except sql.Error as e:
+        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
+
+
+# ===================== DELTA SYNC =====================
+# Complaints in a user's history created or changed since the client's
+# token (0 = everything). The token is the change feed's committed
+# watermark, read in the same snapshot as the rows; see events.py for why
+# nothing committed later can carry a smaller row_version.
+@app.get("/api/complaints/user/{user_id}/sync")
+def sync_user_complaints(
+    user_id: int,
+    since: int = Query(0, ge=0),
+    fields: Optional[str] = None,
+    shape: Literal["rows", "columnar"] = "rows",
+):
+    # id and reported_at are needed to merge and order the client's copy
+    names = list_fields(fields, COMPLAINT_FIELDS, COMPLAINT_FIELDS, required=("id", "reported_at"))
+    select = fastjson.projection(names, COMPLAINT_FIELDS)
+    try:
+        with db_cursor() as (conn, cursor):
+            # also starts a fresh snapshot for both reads below
+            cutoff = events.horizon(conn, cursor)
+            token = events.watermark(cursor, cutoff)
+            # rows untouched since before the change feed have row_version 0
+            changed, since_params = ("AND c.row_version > %s", (since,)) if since else ("", ())
+            cursor.execute(
+                f"""
+                SELECT {select}, FALSE AS linked
+                FROM complaints c
+                JOIN users u ON u.id = c.user_id
+                WHERE c.user_id=%s {changed}
+                UNION ALL
+                SELECT {select}, TRUE AS linked
+                FROM (SELECT DISTINCT complaint_id FROM complaint_duplicates WHERE user_id=%s) d
+                JOIN complaints c ON c.id = d.complaint_id
+                JOIN users u ON u.id = c.user_id
+                WHERE c.user_id <> %s {changed}
+                ORDER BY reported_at DESC
+                """,
+                (user_id, *since_params, user_id, user_id, *since_params),
+            )
+            rows = cursor.fetchall()
+
+        return list_response(
+            {"status": "success", "token": token, "full": since == 0},
+            "complaints",
+            rows,
+            [*names, "linked"],
+            shape,
         )
-        rows = cursor.fetchall()
-        return {"status": "success", "complaints": rows}
 
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
-
 
 # ===================== GET SINGLE COMPLAINT =====================
 @app.get("/api/complaints/{complaint_id}")
-def get_complaint(complaint_id: int = Path(...)):
-    conn = None
-    cursor = None
-    try:
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute(
-            """
-            SELECT c.*, u.location_text
-            FROM complaints c
-            JOIN users u ON u.id = c.user_id
-            WHERE c.id=%s
-            """,
-            (complaint_id,),
-        )
-        row = cursor.fetchone()
+def get_complaint(request: Request, complaint_id: int = Path(...)):
+    def probe():
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT version FROM complaints WHERE id=%s", (complaint_id,))
+            row = cursor.fetchone()
+        return row["version"] if row else None
+
+    def load():
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"""
+                SELECT {COMPLAINT_SELECT}, c.version AS version
+                FROM complaints c
+                JOIN users u ON u.id = c.user_id
+                WHERE c.id=%s
+                """,
+                (complaint_id,),
+            )
+            row = cursor.fetchone()
         if not row:
-            raise HTTPException(status_code=404, detail="Complaint not found")
+            return None
+        return row["version"], render_json({"status": "success", "complaint": row}), [complaint_id]
 
-        return {"status": "success", "complaint": row}
+    try:
+        response = cached_view(request, ("complaint", complaint_id), probe, load)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Complaint not found")
+        return response
 
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
-
 
 # ===================== ADMIN UPDATE =====================
 @app.patch("/api/admin/complaints/{complaint_id}")
 def update_complaint_status(complaint_id: int = Path(...), data: ComplaintAdminUpdateModel = None):
-    conn = None
-    cursor = None
     try:
         status = data.status if data else None
         priority = data.priority if data else None
@@ -408,99 +977,174 @@ def update_complaint_status(complaint_id: int = Path(...), data: ComplaintAdminU
         if status and status not in ADMIN_ALLOWED_STATUS:
             raise HTTPException(status_code=400, detail="Invalid status for admin update")
 
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("SELECT * FROM complaints WHERE id=%s", (complaint_id,))
-        complaint = cursor.fetchone()
-        if not complaint:
-            raise HTTPException(status_code=404, detail="Complaint not found")
-
-        timestamps = {
-            "Acknowledged": "acknowledged_at",
-            "InProgress": "in_progress_at",
-            "Resolved": "resolved_at",
-            "Escalated": "escalated_at",
-        }
-
-        query_parts = []
-        values = []
+        with db_cursor() as (conn, cursor):
+            # locked so the counter deltas below are computed from the row we replace
+            cursor.execute("SELECT * FROM complaints WHERE id=%s FOR UPDATE", (complaint_id,))
+            complaint = cursor.fetchone()
+            if not complaint:
+                raise HTTPException(status_code=404, detail="Complaint not found")
+
+            timestamps = {
+                "Acknowledged": "acknowledged_at",
+                "InProgress": "in_progress_at",
+                "Resolved": "resolved_at",
+                "Escalated": "escalated_at",
+            }
+
+            now = datetime.now().replace(microsecond=0)
+            query_parts = []
+            values = []
+            changes = {}
+
+            if status:
+                query_parts.append("status=%s")
+                values.append(status)
+                changes["status"] = status
+
+                ts_field = timestamps.get(status)
+                if ts_field:
+                    query_parts.append(f"{ts_field}=%s")
+                    values.append(now)
+                    changes[ts_field] = now
+
+            if priority:
+                query_parts.append("priority=%s")
+                values.append(priority)
+                changes["priority"] = priority
+
+            if not query_parts:
+                raise HTTPException(status_code=400, detail="Nothing to update")
+
+            query_parts.append("version = version + 1")
+            query = f"UPDATE complaints SET {', '.join(query_parts)} WHERE id=%s"
+            values.append(complaint_id)
+
+            cursor.execute(query, tuple(values))
+            bump_history(cursor, [complaint_id])
+            counters.apply(cursor, counters.changes(complaint, {**complaint, **changes}))
+            rollups.apply(cursor, rollups.changes(complaint, {**complaint, **changes}))
+            sketches.apply(cursor, sketches.changes(complaint, {**complaint, **changes}))
+            heatmap.apply(cursor, heatmap.changes(complaint, {**complaint, **changes}))
+            # the row always changed (version at least), so it always gets an event
+            kind = events.change_kind(complaint, {**complaint, **changes})
+            events.append(cursor, [events.event(kind, complaint, {**complaint, **changes}, now)])
+            conn.commit()
+
+        hotset.upsert({**complaint, **changes})
+        nearby_cache.invalidate_point(complaint.get("latitude"), complaint.get("longitude"))
+        escalation_scheduler.track({**complaint, **changes})
+        view_cache.invalidate_complaint(complaint_id)
+        if "status" in changes and changes["status"] != complaint["status"]:
+            publish_status(complaint, {**complaint, **changes}, now)
 
-        if status:
-            query_parts.append("status=%s")
-            values.append(status)
+        return {"status": "success", "message": "Complaint updated"}
 
-            ts_field = timestamps.get(status)
-            if ts_field:
-                query_parts.append(f"{ts_field}=%s")
-                values.append(datetime.now())
+    except sql.Error as e:
+        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-        if priority:
-            query_parts.append("priority=%s")
-            values.append(priority)
 
-        if not query_parts:
-            raise HTTPException(status_code=400, detail="Nothing to update")
+# ===================== CHANGE FEED =====================
+# Cursor-paged complaint_events: pass the last seq you processed as after,
+# then next_after from each page, until has_more is false. A page ends early
+# at a seq whose transaction may still be committing; poll again for the rest.
+@app.get("/api/events")
+def list_events(
+    after: int = Query(0, ge=0),
+    limit: int = Query(config.EVENTS_PAGE_SIZE, ge=1, le=config.EVENTS_PAGE_MAX),
+    fields: Optional[str] = None,
+    shape: Literal["rows", "columnar"] = "rows",
+):
+    names = list_fields(fields, events.FIELDS, events.FIELDS, required=("seq",))
+    try:
+        with db_cursor() as (conn, cursor):
+            cutoff = events.horizon(conn, cursor)
+            cursor.execute(events.page_sql(names), (after, limit + 1))
+            fetched = cursor.fetchall()
+            # stop short of seqs whose transactions may still commit (see events.py)
+            rows = events.committed(fetched, after, events.increment(cursor), cutoff)
+    except sql.Error as e:
+        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-        query = f"UPDATE complaints SET {', '.join(query_parts)} WHERE id=%s"
-        values.append(complaint_id)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return list_response(
+        {
+            "status": "success",
+            "next_after": rows[-1]["seq"] if rows else after,
+            "has_more": has_more,
+        },
+        "events",
+        rows,
+        names,
+        shape,
+    )
 
-        cursor.execute(query, tuple(values))
-        conn.commit()
 
-        return {"status": "success", "message": "Complaint updated"}
+# ===================== LIVE FEED =====================
+# Server-Sent Events: escalations for admins, status transitions of their
+# own complaints for citizens. Browsers reconnect on their own and send
+# Last-Event-ID, so a dropped connection resumes where it left off.
+def event_stream(request: Request, match):
+    return StreamingResponse(
+        feed.stream(request, match),
+        media_type="text/event-stream",
+        # no proxy buffering, or events arrive in bursts
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    except sql.Error as e:
-        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
+@app.get("/api/stream/admin")
+async def admin_stream(request: Request):
+    return event_stream(request, lambda event: event["type"] == "escalated")
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
+@app.get("/api/stream/user/{user_id}")
+async def user_stream(request: Request, user_id: int):
+    return event_stream(request, lambda event: event["user_id"] == user_id)
 
 
 # ===================== AUTO ESCALATE OVERDUE =====================
-@app.post("/api/admin/escalate-overdue")
-def escalate_overdue(hours: int = 24):
-    conn = None
-    cursor = None
+# Runs as a chunked sweep (see escalations.OverdueSweep): bounded batches in
+# primary-key order, each its own short transaction, so a large backlog
+# never blocks citizen inserts for long.
+def run_sweep(sweep):
     try:
-        cutoff = datetime.now() - timedelta(hours=hours)
-
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute(
-            """
-            UPDATE complaints
-            SET status='Escalated', escalated_at=%s
-            WHERE status <> 'Resolved'
-              AND status <> 'Escalated'
-              AND reported_at <= %s
-            """,
-            (datetime.now(), cutoff),
-        )
-        conn.commit()
+        sweep.run(db_cursor, on_escalated)
+    except Exception as e:
+        print(f"⚠️ overdue sweep {sweep.id} failed: {e}")
 
-        return {"status": "success", "message": "Overdue complaints escalated"}
+@app.post("/api/admin/escalate-overdue")
+def escalate_overdue(
+    hours: int = 24,
+    background: bool = False,
+    batch_size: int = config.ESCALATION_SWEEP_BATCH,
+    pause_s: float = config.ESCALATION_SWEEP_PAUSE_S,
+):
+    if hours < 0:
+        raise HTTPException(status_code=400, detail="hours must not be negative")
+    if batch_size <= 0 or batch_size > 5000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 5000")
+    if pause_s < 0:
+        raise HTTPException(status_code=400, detail="pause_s must not be negative")
+
+    now = datetime.now().replace(microsecond=0)
+    sweep = sweeps.create(now - timedelta(hours=hours), now, batch_size, pause_s)
+
+    if background:
+        threading.Thread(target=run_sweep, args=(sweep,), name=f"overdue-sweep-{sweep.id}", daemon=True).start()
+        return JSONResponse(status_code=202, content={"status": "accepted", **sweep.progress(include_ids=False)})
 
+    try:
+        sweep.run(db_cursor, on_escalated)
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
+    return {"status": "success", "message": "Overdue complaints escalated", **sweep.progress()}
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
+
+@app.get("/api/admin/escalate-overdue/{sweep_id}")
+def escalate_overdue_progress(sweep_id: int, include_ids: bool = False):
+    sweep = sweeps.get(sweep_id)
+    if not sweep:
+        raise HTTPException(status_code=404, detail="Sweep not found")
+    return {"status": "success", **sweep.progress(include_ids=include_ids)}
 
 
 # ===================== NEARBY COMPLAINTS (WHAT'S HAPPENING AROUND YOU) =====================
@@ -508,75 +1152,126 @@ class NearbyComplaintsQuery(BaseModel):
     latitude: float
     longitude: float
     radius_km: float = 5.0
+    # deprecated: superseded by k; still validated for old clients
     limit: int = 50
     only_unresolved: bool = True
+    # how many complaints to return, and how to rank them:
+    # "priority" (then newest), "distance", or "score" (priority x closeness + age)
+    k: int = 5
+    order: str = "priority"
 
-@app.post("/api/complaints/nearby")
-def nearby_complaints(body: NearbyComplaintsQuery):
-    conn = None
-    cursor = None
-    try:
-        lat = float(body.latitude)
-        lng = float(body.longitude)
-        radius_km = float(body.radius_km)
-
-        if radius_km <= 0 or radius_km > 50:
-            raise HTTPException(status_code=400, detail="radius_km must be between 0 and 50")
-        if body.limit <= 0 or body.limit > 200:
-            raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+def query_nearby(lat, lng, radius_km, k, order, only_unresolved):
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
 
-        lat_delta = radius_km / 111.0
-        lng_delta = radius_km / (111.0 * max(0.2, math.cos(math.radians(lat))))
+    unresolved_filter = ""
+    if only_unresolved:
+        unresolved_filter = "AND c.status <> 'Resolved'"
 
-        min_lat = lat - lat_delta
-        max_lat = lat + lat_delta
-        min_lng = lng - lng_delta
-        max_lng = lng + lng_delta
+    order_params = (radius_km,) if order == "score" else ()
 
-        unresolved_filter = ""
-        if body.only_unresolved:
-            unresolved_filter = "AND c.status <> 'Resolved'"
+    with db_cursor() as (conn, cursor):
+        # MBRContains is answered from the SPATIAL index on c.location;
+        # ST_Distance_Sphere then trims the box to the exact radius, and
+        # ORDER BY ... LIMIT k lets MySQL keep only the top k while sorting
+        cursor.execute(
+            f"""
+            SELECT * FROM (
+                SELECT
+                    c.id,
+                    c.user_id,
+                    c.type,
+                    c.description,
+                    c.image_url,
+                    c.status,
+                    c.priority,
+                    c.department,
+                    c.latitude,
+                    c.longitude,
+                    c.reported_at,
+                    ST_Distance_Sphere(c.location, {GEOM_FROM_WKT}) / 1000 AS distance_km
+                FROM complaints c
+                WHERE MBRContains({GEOM_FROM_WKT}, c.location)
+                  AND c.latitude IS NOT NULL
+                  AND c.longitude IS NOT NULL
+                  {unresolved_filter}
+            ) nearby
+            WHERE distance_km <= %s
+            ORDER BY {ranking.sql_order_by(order)}
+            LIMIT %s
+            """,
+            (
+                point_wkt(lat, lng),
+                bbox_wkt(min_lat, max_lat, min_lng, max_lng),
+                radius_km,
+                *order_params,
+                k,
+            ),
+        )
+        return cursor.fetchall()
 
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
 
+def load_nearby_candidates(min_lat, max_lat, min_lng, max_lng, only_unresolved, limit):
+    """Up to limit complaints in a box, for the nearby cache to narrow per request."""
+    unresolved_filter = "AND c.status <> 'Resolved'" if only_unresolved else ""
+    with db_cursor() as (conn, cursor):
         cursor.execute(
             f"""
             SELECT
                 c.id,
-                c.user_id,
                 c.type,
                 c.description,
-                c.image_url,
                 c.status,
                 c.priority,
                 c.department,
                 c.latitude,
                 c.longitude,
-                c.reported_at,
-                (
-                  6371 * ACOS(
-                    COS(RADIANS(%s)) * COS(RADIANS(c.latitude)) * COS(RADIANS(c.longitude) - RADIANS(%s))
-                    + SIN(RADIANS(%s)) * SIN(RADIANS(c.latitude))
-                  )
-                ) AS distance_km
+                c.reported_at
             FROM complaints c
-            WHERE c.latitude IS NOT NULL
+            WHERE MBRContains({GEOM_FROM_WKT}, c.location)
+              AND c.latitude IS NOT NULL
               AND c.longitude IS NOT NULL
-              AND c.latitude BETWEEN %s AND %s
-              AND c.longitude BETWEEN %s AND %s
               {unresolved_filter}
-            HAVING distance_km <= %s
-            ORDER BY c.reported_at DESC
             LIMIT %s
             """,
-            (lat, lng, lat, min_lat, max_lat, min_lng, max_lng, radius_km, body.limit),
+            (bbox_wkt(min_lat, max_lat, min_lng, max_lng), limit),
         )
+        return cursor.fetchall()
 
-        rows = cursor.fetchall()
 
-        priority_order = {"High": 1, "Medium": 2, "Low": 3}
+@app.post("/api/complaints/nearby")
+def nearby_complaints(body: NearbyComplaintsQuery):
+    try:
+        lat = float(body.latitude)
+        lng = float(body.longitude)
+        radius_km = float(body.radius_km)
 
+        if radius_km <= 0 or radius_km > 50:
+            raise HTTPException(status_code=400, detail="radius_km must be between 0 and 50")
+        if body.limit <= 0 or body.limit > 200:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+        if body.k <= 0 or body.k > 100:
+            raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+        if body.order not in ranking.ORDERS:
+            raise HTTPException(status_code=400, detail=f"order must be one of {', '.join(ranking.ORDERS)}")
+
+        now = datetime.now()
+        # the hot set answers open-only searches from memory; the cache takes
+        # the rest (resolved included, or the hot set not loaded yet), and
+        # SQL whatever the cache won't hold
+        if body.only_unresolved and hotset.ready:
+            rows = hotset.nearby(lat, lng, radius_km, body.k, body.order, now)
+        else:
+            candidates = None
+            if nearby_cache.enabled:
+                candidates = nearby_cache.candidates(
+                    lat, lng, radius_km, body.only_unresolved, load_nearby_candidates,
+                )
+            if candidates is not None:
+                rows = nearest(candidates, lat, lng, radius_km, body.k, body.order, now)
+            else:
+                rows = query_nearby(lat, lng, radius_km, body.k, body.order, body.only_unresolved)
+
+        # rows arrive ranked and already cut to k; only these get formatted
         items = []
         for r in rows:
             reported_at = r.get("reported_at")
@@ -601,109 +1296,336 @@ def nearby_complaints(body: NearbyComplaintsQuery):
                 "longitude": float(r["longitude"]) if r.get("longitude") is not None else None,
             })
 
-        items.sort(key=lambda x: priority_order.get(x.get("priority"), 9))
-        items = items[:5]
-
-        return {"status": "success", "items": items, "count": len(items)}
+        return {"status": "success", "items": items, "count": len(items), "order": body.order}
 
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-    finally:
-        try:
-            if cursor: cursor.close()
-        except:
-            pass
-        try:
-            if conn: conn.close()
-        except:
-            pass
+
+# ===================== HEATMAP TILES =====================
+@app.get("/api/heatmap/tiles")
+def heatmap_tiles(
+    min_lat: float,
+    max_lat: float,
+    min_lng: float,
+    max_lng: float,
+    zoom: int,
+    status: Optional[str] = None,
+    complaint_type: Optional[str] = Query(None, alias="type"),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    format: str = "json",
+):
+    """Complaints binned into a zoom-sized grid over a bounding box.
+
+    Each cell is (centroid lat, centroid lng, complaint count). Up to
+    heatmap.BINNED_MAX_ZOOM the cells are summed from heatmap_cells (see
+    heatmap.py), so the cost follows the cells and days in view, not the
+    complaints behind them; every cell the box touches is returned whole.
+    Higher zooms bin the complaints in the box from the SPATIAL index.
+    since is inclusive and until exclusive, both whole report days.
+    Longitudes are [-180, 180]; a -180 edge is moved just inside SRID
+    4326's (-180, 180] range.
+    """
+    if not (-90 <= min_lat < max_lat <= 90) or not (-180 <= min_lng < max_lng <= 180):
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    if not heatmap.MIN_ZOOM <= zoom <= heatmap.MAX_ZOOM:
+        raise HTTPException(status_code=400, detail=f"zoom must be between {heatmap.MIN_ZOOM} and {heatmap.MAX_ZOOM}")
+    if format not in ("json", "binary"):
+        raise HTTPException(status_code=400, detail="format must be json or binary")
+
+    cell_deg = heatmap.cell_size_deg(zoom)
+    if heatmap.cell_count(min_lat, max_lat, min_lng, max_lng, cell_deg) > heatmap.MAX_CELLS:
+        raise HTTPException(status_code=400, detail="Bounding box too large for this zoom")
+
+    try:
+        with db_cursor(dictionary=False) as (conn, cursor):
+            if zoom <= heatmap.BINNED_MAX_ZOOM:
+                first_row, first_col = heatmap.cell_of(min_lat, min_lng, zoom)
+                last_row, last_col = heatmap.cell_of(max_lat, max_lng, zoom)
+                query, filter_params = heatmap.cells_sql(status, complaint_type, since, until)
+                cursor.execute(query, (zoom, first_row, last_row, first_col, last_col, *filter_params))
+                scale = heatmap.FIXED_POINT_SCALE
+                cells = [
+                    (int(lat_sum) / n / scale, int(lng_sum) / n / scale, int(n))
+                    for lat_sum, lng_sum, n in cursor.fetchall()
+                ]
+            else:
+                filters = ""
+                params = [bbox_wkt(min_lat, max_lat, min_lng, max_lng)]
+                for clause, value in (
+                    ("status = %s", status),
+                    ("type = %s", complaint_type),
+                    ("reported_at >= %s", since),
+                    ("reported_at < %s", until),
+                ):
+                    if value is not None:
+                        filters += f" AND {clause}"
+                        params.append(value)
+                # the bbox is answered from the SPATIAL index on location
+                cursor.execute(
+                    f"""
+                    SELECT AVG(latitude), AVG(longitude), COUNT(*)
+                    FROM complaints
+                    WHERE MBRContains({GEOM_FROM_WKT}, location)
+                      AND latitude IS NOT NULL AND longitude IS NOT NULL
+                      {filters}
+                    GROUP BY FLOOR(latitude / %s), FLOOR(longitude / %s)
+                    """,
+                    (*params, cell_deg, cell_deg),
+                )
+                cells = [(float(lat), float(lng), int(n)) for lat, lng, n in cursor.fetchall()]
+
+        if format == "binary":
+            return Response(content=heatmap.encode_binary(cells), media_type=heatmap.BINARY_MEDIA_TYPE)
+        return {
+            "status": "success",
+            "zoom": zoom,
+            "cell_deg": cell_deg,
+            "count": len(cells),
+            "cells": [[round(lat, 5), round(lng, 5), n] for lat, lng, n in cells],
+        }
+
+    except sql.Error as e:
+        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
 
 # ===================== ADMIN STATS =====================
+# served from the incrementally maintained counters (see counters.py)
 @app.get("/api/stats")
 def admin_stats():
-    conn = None
-    cursor = None
+    today = datetime.now().date()
+    with db_cursor() as (conn, cursor):
+        cursor.execute(counters.TOTALS_SQL)
+        totals = cursor.fetchall()
+        cursor.execute(counters.DAILY_SQL, (today - timedelta(days=1),))
+        daily = cursor.fetchall()
+    return counters.summarize(totals, daily, today)
+
+
+@app.post("/api/admin/stats/reconcile")
+def reconcile_stats():
+    """Recount the dashboard counters from source now."""
+    drift = counters.reconciler.run(db_cursor)
+    if drift is None:
+        return {"status": "busy", "message": "A reconcile is already running"}
+    return {"status": "success", "corrections": sum(1 for n in drift.values() if n)}
+
+
+# ===================== ANALYTICS (HOURLY ROLLUPS) =====================
+# trend and SLA reads touch only complaint_rollups (see rollups.py), so their
+# cost depends on the range and number of groups, not on table size.
+# Ranges are in whole hours: start is rounded down to its hour.
+ANALYTICS_GROUPS = ("department", "type", "priority")
+
+def rollup_filters(start, end, department, complaint_type, priority):
+    conditions = ["bucket >= %s", "bucket < %s"]
+    params = [rollups.hour_bucket(start), end]
+    for column, value in (("department", department), ("type", complaint_type), ("priority", priority)):
+        if value:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    return " AND ".join(conditions), params
+
+def avg_hours(total_seconds, count):
+    return round(float(total_seconds) / count / 3600, 2) if count else None
+
+@app.get("/api/analytics/trends")
+def analytics_trends(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "day",
+    department: Optional[str] = None,
+    complaint_type: Optional[str] = Query(None, alias="type"),
+    priority: Optional[str] = None,
+):
+    """created/acknowledged/resolved/escalated per hour or day."""
+    if granularity not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="granularity must be hour or day")
+    end = end or datetime.now()
+    start = start or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    where, params = rollup_filters(start, end, department, complaint_type, priority)
+    period = "bucket" if granularity == "hour" else "DATE(bucket)"
     try:
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"""
+                SELECT {period} AS period,
+                       SUM(created) AS created,
+                       SUM(acknowledged) AS acknowledged,
+                       SUM(resolved) AS resolved,
+                       SUM(escalated) AS escalated
+                FROM complaint_rollups
+                WHERE {where}
+                GROUP BY period
+                ORDER BY period
+                """,
+                tuple(params),
+            )
+            rows = cursor.fetchall()
+
+        series = [
+            {
+                "period": r["period"].isoformat(),
+                "created": int(r["created"]),
+                "acknowledged": int(r["acknowledged"]),
+                "resolved": int(r["resolved"]),
+                "escalated": int(r["escalated"]),
+            }
+            for r in rows
+        ]
+        return {"status": "success", "granularity": granularity, "series": series}
 
-        # Total complaints today
-        cursor.execute("""
-            SELECT COUNT(*) as total_today
-            FROM complaints
-            WHERE DATE(reported_at) = CURDATE()
-        """)
-        total_today = cursor.fetchone()["total_today"]
+    except sql.Error as e:
+        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-        # Escalated today
-        cursor.execute("""
-            SELECT COUNT(*) as escalated_today
-            FROM complaints
-            WHERE DATE(escalated_at) = CURDATE()
-        """)
-        escalated_today = cursor.fetchone()["escalated_today"]
 
-        # Total users
-        cursor.execute("SELECT COUNT(*) as total_users FROM users")
-        total_users = cursor.fetchone()["total_users"]
+@app.get("/api/analytics/sla")
+def analytics_sla(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[str] = None,
+    department: Optional[str] = None,
+    complaint_type: Optional[str] = Query(None, alias="type"),
+    priority: Optional[str] = None,
+):
+    """Average response (reported -> acknowledged) and resolution times.
+
+    A complaint counts in the range where it was acknowledged/resolved.
+    """
+    if group_by is not None and group_by not in ANALYTICS_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(ANALYTICS_GROUPS)}")
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    where, params = rollup_filters(start, end, department, complaint_type, priority)
+    group_select = f"{group_by}," if group_by else ""
+    group_clause = f"GROUP BY {group_by} ORDER BY {group_by}" if group_by else ""
+    try:
+        with db_cursor() as (conn, cursor):
+            cursor.execute(
+                f"""
+                SELECT {group_select}
+                       SUM(response_sum_s) AS response_sum_s,
+                       SUM(response_count) AS response_count,
+                       SUM(resolution_sum_s) AS resolution_sum_s,
+                       SUM(resolution_count) AS resolution_count
+                FROM complaint_rollups
+                WHERE {where}
+                {group_clause}
+                """,
+                tuple(params),
+            )
+            rows = cursor.fetchall()
+
+        results = []
+        for r in rows:
+            response_count = int(r["response_count"] or 0)
+            resolution_count = int(r["resolution_count"] or 0)
+            item = {
+                "avg_response_time_hours": avg_hours(r["response_sum_s"] or 0, response_count),
+                "avg_resolution_time_hours": avg_hours(r["resolution_sum_s"] or 0, resolution_count),
+                "acknowledged": response_count,
+                "resolved": resolution_count,
+            }
+            if group_by:
+                item = {group_by: r[group_by], **item}
+            results.append(item)
+
+        if group_by:
+            return {"status": "success", "group_by": group_by, "groups": results}
+        return {"status": "success", **results[0]}
 
-        # Active tickets (not resolved)
-        cursor.execute("""
-            SELECT COUNT(*) as active_tickets
-            FROM complaints
-            WHERE status <> 'Resolved'
-        """)
-        active_tickets = cursor.fetchone()["active_tickets"]
+    except sql.Error as e:
+        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-        # Priority summary
-        cursor.execute("""
-            SELECT priority, COUNT(*) as count
-            FROM complaints
-            GROUP BY priority
-        """)
-        priority_summary = cursor.fetchall()
 
-        # Status distribution
-        cursor.execute("""
-            SELECT status, COUNT(*) as count
-            FROM complaints
-            GROUP BY status
-        """)
-        status_distribution = cursor.fetchall()
+@app.get("/api/analytics/sla/percentiles")
+def analytics_sla_percentiles(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    q: str = "0.5,0.9,0.99",
+    group_by: Optional[str] = None,
+    department: Optional[str] = None,
+    priority: Optional[str] = None,
+):
+    """Response/resolution time quantiles, merged from the per-day sketches.
+
+    start/end are inclusive days; a complaint counts on the day it was
+    acknowledged/resolved. Values are within 1% of the exact quantile.
+    """
+    try:
+        qs = [float(v) for v in q.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="q must be comma-separated numbers")
+    if not qs or any(not 0 <= v <= 1 for v in qs):
+        raise HTTPException(status_code=400, detail="q values must be between 0 and 1")
+    if group_by is not None and group_by not in ("department", "priority"):
+        raise HTTPException(status_code=400, detail="group_by must be department or priority")
+    end = end or datetime.now().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    conditions = ["day >= %s", "day <= %s"]
+    params = [start, end]
+    for column, value in (("department", department), ("priority", priority)):
+        if value:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    group_select = f"{group_by}, " if group_by else ""
 
-        # Department volume
-        cursor.execute("""
-            SELECT department, COUNT(*) as count
-            FROM complaints
-            GROUP BY department
-        """)
-        department_volume = cursor.fetchall()
+    try:
+        with db_cursor() as (conn, cursor):
+            # one row per (group, metric, bin): a few hundred rows at most
+            cursor.execute(
+                f"""
+                SELECT {group_select}metric, bin, SUM(count) AS n
+                FROM sla_sketches
+                WHERE {' AND '.join(conditions)}
+                GROUP BY {group_select}metric, bin
+                """,
+                tuple(params),
+            )
+            rows = cursor.fetchall()
+
+        histograms = {}
+        for r in rows:
+            group = r[group_by] if group_by else None
+            histograms.setdefault(group, {}).setdefault(r["metric"], Counter())[r["bin"]] += int(r["n"])
+
+        def summary(per_metric):
+            result = {}
+            for metric in sketches.METRICS:
+                histogram = per_metric.get(metric, Counter())
+                values = sketches.quantiles(histogram, qs)
+                result[metric] = {
+                    "count": sum(n for n in histogram.values() if n > 0),
+                    "hours": {
+                        f"p{v * 100:g}": round(values[v] / 3600, 2) if values[v] is not None else None
+                        for v in qs
+                    },
+                }
+            return result
+
+        if group_by:
+            groups = [{group_by: g, **summary(h)} for g, h in sorted(histograms.items())]
+            return {"status": "success", "group_by": group_by, "groups": groups}
+        return {"status": "success", **summary(histograms.get(None, {}))}
+
+    except sql.Error as e:
+        raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
 
-        return {
-            "total_today": total_today,
-            "percentage_change": 0,
-            "escalated_today": escalated_today,
-            "total_users": total_users,
-            "active_tickets": active_tickets,
-            "priority_summary": priority_summary,
-            "status_distribution": status_distribution,
-            "department_volume": department_volume
-        }
 
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 # ===================== ESCALATIONS LIST =====================
 @app.get("/escalations")
 def get_escalations():
-    conn = None
-    cursor = None
-    try:
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
-
+    with db_cursor() as (conn, cursor):
         cursor.execute("""
             SELECT id, type, priority, department
             FROM complaints
@@ -716,19 +1638,10 @@ def get_escalations():
 
         return {"escalated": rows}
 
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
-
 # ===================== AI SUGGESTION =====================
 @app.get("/api/ai-suggestion")
 def ai_suggestion():
-    conn = None
-    cursor = None
-    try:
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
-
+    with db_cursor() as (conn, cursor):
         cursor.execute("""
             SELECT department, COUNT(*) as count
             FROM complaints
@@ -744,40 +1657,130 @@ def ai_suggestion():
         return {
             "suggestion": f"Most complaints are from {top['department']}. Consider allocating more resources there."
         }
-
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 # ===================== ADMIN GET ALL COMPLAINTS =====================
-@app.get("/api/admin/complaints")
-def get_all_complaints():
-    conn = None
-    cursor = None
+# Pages walk (reported_at, id) newest first. The cursor is the last row's
+# key, so each page is an index range scan from where the previous one
+# stopped, however deep the client has scrolled.
+ADMIN_FILTER_COLUMNS = ("status", "priority", "department")
+ADMIN_LIST_FIELDS = ("id", "type", "description", "status", "priority", "department", "reported_at", "location_text")
+
+def encode_cursor(reported_at: datetime, complaint_id: int) -> str:
+    raw = f"{reported_at.isoformat()}|{complaint_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
     try:
-        conn = get_conn()
-        cursor = conn.cursor(dictionary=True)
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        reported_at, complaint_id = raw.split("|")
+        return datetime.fromisoformat(reported_at), int(complaint_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def count_complaints(cursor, where, params, filtered):
+    """(total, exact) for the list; unfiltered uses the table statistics."""
+    if not filtered:
+        cursor.execute(
+            """
+            SELECT TABLE_ROWS AS n FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'complaints'
+            """
+        )
+        row = cursor.fetchone()
+        return int(row["n"] or 0) if row else 0, False
 
-        cursor.execute("""
-            SELECT 
-                c.id,
-                c.type,
-                c.description,
-                c.status,
-                c.priority,
-                c.department,
-                c.reported_at,
-                u.location_text
-            FROM complaints c
-            JOIN users u ON u.id = c.user_id
-            ORDER BY c.reported_at DESC
-        """)
+    cap = config.ADMIN_COUNT_CAP
+    cursor.execute(
+        f"SELECT COUNT(*) AS n FROM (SELECT 1 FROM complaints c {where} LIMIT %s) t",
+        (*params, cap + 1),
+    )
+    n = cursor.fetchone()["n"]
+    return min(n, cap), n <= cap
 
-        rows = cursor.fetchall()
-        return rows
+@app.get("/api/admin/complaints")
+def get_all_complaints(
+    limit: int = config.ADMIN_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    department: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    shape: Literal["rows", "columnar"] = "rows",
+):
+    if limit <= 0 or limit > config.ADMIN_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {config.ADMIN_PAGE_MAX}")
+    # id and reported_at make up the page cursor
+    names = list_fields(fields, COMPLAINT_FIELDS, ADMIN_LIST_FIELDS, required=("id", "reported_at"))
+    # the owner's row is only read when location_text is asked for
+    join_users = "JOIN users u ON u.id = c.user_id" if "location_text" in names else ""
+
+    conditions = []
+    params = []
+    filters = {"status": status, "priority": priority, "department": department}
+    for column in ADMIN_FILTER_COLUMNS:
+        if filters[column]:
+            conditions.append(f"c.{column} = %s")
+            params.append(filters[column])
+    if date_from:
+        conditions.append("c.reported_at >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("c.reported_at < %s")
+        params.append(date_to)
+    filtered = bool(conditions)
+
+    page_conditions = list(conditions)
+    page_params = list(params)
+    if cursor:
+        after_reported_at, after_id = decode_cursor(cursor)
+        page_conditions.append("(c.reported_at, c.id) < (%s, %s)")
+        page_params += [after_reported_at, after_id]
+
+    def where_clause(parts):
+        return f"WHERE {' AND '.join(parts)}" if parts else ""
+
+    try:
+        with db_cursor() as (conn, cur):
+            # one extra row tells us whether another page exists
+            cur.execute(
+                f"""
+                SELECT {fastjson.projection(names, COMPLAINT_FIELDS)}
+                FROM complaints c
+                {join_users}
+                {where_clause(page_conditions)}
+                ORDER BY c.reported_at DESC, c.id DESC
+                LIMIT %s
+                """,
+                (*page_params, limit + 1),
+            )
+            rows = cur.fetchall()
+
+            # the total only matters for the first page; clients keep it
+            total = total_exact = None
+            if not cursor:
+                total, total_exact = count_complaints(cur, where_clause(conditions), params, filtered)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            if last["reported_at"] is not None:
+                next_cursor = encode_cursor(last["reported_at"], last["id"])
+
+        return list_response(
+            {
+                "status": "success",
+                "count": len(rows),
+                "next_cursor": next_cursor,
+                "total": total,
+                "total_exact": total_exact,
+            },
+            "items",
+            rows,
+            names,
+            shape,
+        )
 
     except sql.Error as e:
         raise HTTPException(status_code=500, detail=f"MySQL error: {str(e)}")
-
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
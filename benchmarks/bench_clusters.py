@@ -0,0 +1,143 @@
+"""Cluster detection for auto-escalation: SQL self-join vs grid index.
+
+Fills a scratch table with synthetic 'Reported' complaints around a city and
+times, at each size, the self-join from the original auto_escalate() against
+clustering.find_clustered() on the same rows (including the time to fetch
+them). The join is quadratic, so it is skipped above --join-max rows; where
+both run, their results are compared. Also times the incremental path:
+adding a handful of new complaints to a warm index and checking only their
+neighbourhoods. The scratch table is dropped afterwards.
+
+    python benchmarks/bench_clusters.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "pages", "Admin"))
+
+from clustering import ClusterIndex, find_clustered  # noqa: E402
+from db import get_conn  # noqa: E402
+from geo import GEOM_FROM_WKT, point_wkt  # noqa: E402
+
+TABLE = "bench_cluster_complaints"
+CENTER = (28.6139, 77.2090)
+TYPES = ["Pothole", "Garbage", "Streetlight", "Water Leakage", "Drainage"]
+
+JOIN_SQL = f"""
+    SELECT c1.id
+    FROM {TABLE} c1
+    JOIN {TABLE} c2
+      ON c1.type = c2.type
+      AND c1.id != c2.id
+      AND c1.status = 'Reported'
+      AND c2.status = 'Reported'
+      AND c1.latitude IS NOT NULL
+      AND c1.longitude IS NOT NULL
+      AND c2.latitude IS NOT NULL
+      AND c2.longitude IS NOT NULL
+      AND (
+        6371000 * ACOS(
+            COS(RADIANS(c1.latitude)) * COS(RADIANS(c2.latitude)) *
+            COS(RADIANS(c2.longitude) - RADIANS(c1.longitude)) +
+            SIN(RADIANS(c1.latitude)) * SIN(RADIANS(c2.latitude))
+        )
+      ) <= 5000
+    GROUP BY c1.id
+    HAVING COUNT(c2.id) > 5
+"""
+
+FETCH_SQL = f"""
+    SELECT id, type, latitude, longitude
+    FROM {TABLE}
+    WHERE status = 'Reported' AND latitude IS NOT NULL AND longitude IS NOT NULL
+"""
+
+
+def random_point(spread_deg):
+    return (CENTER[0] + random.uniform(-spread_deg, spread_deg),
+            CENTER[1] + random.uniform(-spread_deg, spread_deg))
+
+
+def fill(conn, cursor, count, spread_deg):
+    rows = []
+    for _ in range(count):
+        lat, lng = random_point(spread_deg)
+        rows.append((1, random.choice(TYPES), "Reported", "Medium", "Roads", lat, lng, point_wkt(lat, lng)))
+        if len(rows) == 5000:
+            insert(conn, cursor, rows)
+            rows = []
+    if rows:
+        insert(conn, cursor, rows)
+
+
+def insert(conn, cursor, rows):
+    cursor.executemany(
+        f"""
+        INSERT INTO {TABLE} (user_id, type, status, priority, department, latitude, longitude, location)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,{GEOM_FROM_WKT})
+        """,
+        rows,
+    )
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--spread-deg", type=float, default=1.0, help="half-width of the synthetic city")
+    parser.add_argument("--join-max", type=int, default=10000, help="skip the SQL join above this many rows")
+    parser.add_argument("--new", type=int, default=20, help="complaints added for the incremental timing")
+    args = parser.parse_args()
+
+    conn = get_conn()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"CREATE TABLE {TABLE} LIKE complaints")
+
+    print(f"{'rows':>10} {'join_ms':>10} {'grid_ms':>9} {'incr_ms':>9} {'clustered':>10} {'match':>6}")
+    try:
+        current = 0
+        for size in sorted(args.sizes):
+            fill(conn, cursor, size - current, args.spread_deg)
+            current = size
+
+            started = time.perf_counter()
+            cursor.execute(FETCH_SQL)
+            rows = cursor.fetchall()
+            grid = find_clustered(rows)
+            grid_ms = (time.perf_counter() - started) * 1000
+
+            join_ms, match = None, "-"
+            if size <= args.join_max:
+                started = time.perf_counter()
+                cursor.execute(JOIN_SQL)
+                joined = {cid for (cid,) in cursor.fetchall()}
+                join_ms = (time.perf_counter() - started) * 1000
+                match = "yes" if joined == grid else "NO"
+
+            index = ClusterIndex()
+            for cid, ctype, lat, lng in rows:
+                index.add(cid, ctype, lat, lng)
+            new_ids = []
+            started = time.perf_counter()
+            for i in range(args.new):
+                cid = -(i + 1)
+                index.add(cid, random.choice(TYPES), *random_point(args.spread_deg))
+                new_ids.append(cid)
+            index.clustered(index.affected_by(new_ids))
+            incr_ms = (time.perf_counter() - started) * 1000
+
+            join_text = f"{join_ms:>10.1f}" if join_ms is not None else f"{'skipped':>10}"
+            print(f"{size:>10} {join_text} {grid_ms:>9.1f} {incr_ms:>9.1f} {len(grid):>10} {match:>6}")
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
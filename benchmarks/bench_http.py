@@ -0,0 +1,92 @@
+"""Closed-loop HTTP load generator for comparing backend modes.
+
+Start the API in the mode under test, then point this at it, e.g.
+
+    FIXIT_ASYNC_DB=0 uvicorn auth:app --port 8000   # sync path
+    python benchmarks/bench_http.py /api/stats --concurrency 32 --requests 2000
+
+    FIXIT_ASYNC_DB=1 uvicorn auth:app --port 8000   # async path
+    python benchmarks/bench_http.py /api/stats --concurrency 32 --requests 2000
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run(url, method, body, concurrency, total):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = [total]
+    data = json.dumps(body).encode() if body is not None else None
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            req = urllib.request.Request(url, data=data, method=method)
+            if data is not None:
+                req.add_header("Content-Type", "application/json")
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req) as resp:
+                    resp.read()
+                ok = True
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "rps": round(len(latencies) / wall, 1) if wall else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default="/api/stats")
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--body", default=None, help="JSON request body")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    body = json.loads(args.body) if args.body else None
+    result = run(args.base + args.path, args.method, body, args.concurrency, args.requests)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Nearby-complaint query latency vs table size: DECIMAL bbox + ACOS vs SPATIAL index.
+
+Builds a scratch copy of `complaints` (CREATE TABLE ... LIKE, so the SPATIAL
+index comes along), fills it with synthetic complaints scattered around a
+city, and times both query shapes at each size. The scratch table is dropped
+afterwards; the real `complaints` table is never touched.
+
+    python benchmarks/bench_nearby.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from db import get_conn  # noqa: E402
+from geo import GEOM_FROM_WKT, bbox_wkt, bounding_box, point_wkt  # noqa: E402
+
+TABLE = "bench_nearby_complaints"
+CENTER = (28.6139, 77.2090)
+
+LEGACY_SQL = f"""
+    SELECT c.id,
+        (6371 * ACOS(
+            COS(RADIANS(%s)) * COS(RADIANS(c.latitude)) * COS(RADIANS(c.longitude) - RADIANS(%s))
+            + SIN(RADIANS(%s)) * SIN(RADIANS(c.latitude))
+        )) AS distance_km
+    FROM {TABLE} c
+    WHERE c.latitude IS NOT NULL AND c.longitude IS NOT NULL
+      AND c.latitude BETWEEN %s AND %s
+      AND c.longitude BETWEEN %s AND %s
+      AND c.status <> 'Resolved'
+    HAVING distance_km <= %s
+    ORDER BY c.id DESC
+    LIMIT 50
+"""
+
+SPATIAL_SQL = f"""
+    SELECT c.id, ST_Distance_Sphere(c.location, {GEOM_FROM_WKT}) / 1000 AS distance_km
+    FROM {TABLE} c
+    WHERE MBRContains({GEOM_FROM_WKT}, c.location)
+      AND c.latitude IS NOT NULL AND c.longitude IS NOT NULL
+      AND c.status <> 'Resolved'
+    HAVING distance_km <= %s
+    ORDER BY c.id DESC
+    LIMIT 50
+"""
+
+
+def fill(conn, cursor, target, current, spread_deg):
+    statuses = ["Reported", "Acknowledged", "InProgress", "Resolved", "Escalated"]
+    rows = []
+    for _ in range(target - current):
+        lat = CENTER[0] + random.uniform(-spread_deg, spread_deg)
+        lng = CENTER[1] + random.uniform(-spread_deg, spread_deg)
+        rows.append((1, "Pothole", random.choice(statuses), "Medium", "Roads", lat, lng, point_wkt(lat, lng)))
+        if len(rows) == 5000:
+            insert(conn, cursor, rows)
+            rows = []
+    if rows:
+        insert(conn, cursor, rows)
+
+
+def insert(conn, cursor, rows):
+    cursor.executemany(
+        f"""
+        INSERT INTO {TABLE} (user_id, type, status, priority, department, latitude, longitude, location)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,{GEOM_FROM_WKT})
+        """,
+        rows,
+    )
+    conn.commit()
+
+
+def timed(cursor, sql, params, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    parser.add_argument("--spread-deg", type=float, default=1.0, help="half-width of the synthetic city")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = get_conn()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"CREATE TABLE {TABLE} LIKE complaints")
+
+    lat, lng = CENTER
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, args.radius_km)
+    legacy_params = (lat, lng, lat, min_lat, max_lat, min_lng, max_lng, args.radius_km)
+    spatial_params = (point_wkt(lat, lng), bbox_wkt(min_lat, max_lat, min_lng, max_lng), args.radius_km)
+
+    print(f"{'rows':>10} {'legacy_ms':>10} {'spatial_ms':>11} {'speedup':>8}")
+    try:
+        current = 0
+        for size in sorted(args.sizes):
+            fill(conn, cursor, size, current, args.spread_deg)
+            current = size
+            cursor.execute(f"ANALYZE TABLE {TABLE}")
+            cursor.fetchall()
+
+            legacy = timed(cursor, LEGACY_SQL, legacy_params, args.repeats)
+            spatial = timed(cursor, SPATIAL_SQL, spatial_params, args.repeats)
+            print(f"{size:>10} {legacy:>10.2f} {spatial:>11.2f} {legacy / spatial:>7.1f}x")
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
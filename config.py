@@ -0,0 +1,171 @@
+import json
+import os
+
+
+def _env_json(name: str, default):
+    value = os.getenv(name)
+    return json.loads(value) if value else default
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+# ===================== DATABASE =====================
+DB_HOST = os.getenv("FIXIT_DB_HOST", "localhost")
+DB_PORT = _env_int("FIXIT_DB_PORT", 3306)
+DB_USER = os.getenv("FIXIT_DB_USER", "fixit_user")
+DB_PASSWORD = os.getenv("FIXIT_DB_PASSWORD", "fixit1234")
+DB_NAME = os.getenv("FIXIT_DB_NAME", "fixit")
+
+# ===================== CONNECTION POOL =====================
+# max connections held by one worker process
+DB_POOL_SIZE = _env_int("FIXIT_DB_POOL_SIZE", 10)
+# seconds a request waits for a free connection before getting a 503
+DB_POOL_TIMEOUT = _env_float("FIXIT_DB_POOL_TIMEOUT", 5.0)
+# connections older than this (seconds) are closed and replaced on checkout
+DB_POOL_MAX_LIFETIME = _env_float("FIXIT_DB_POOL_MAX_LIFETIME", 1800.0)
+# connections idle longer than this (seconds) are pinged before reuse
+DB_POOL_PING_INTERVAL = _env_float("FIXIT_DB_POOL_PING_INTERVAL", 30.0)
+
+# ===================== ASYNC MODE =====================
+# serve the dashboard read endpoints from async handlers over aiomysql
+ASYNC_DB = os.getenv("FIXIT_ASYNC_DB", "0") == "1"
+
+# ===================== PASSWORD HASHING =====================
+# worker processes dedicated to bcrypt
+HASH_WORKERS = _env_int("FIXIT_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+# hash jobs allowed to wait behind the busy workers before shedding with 503
+HASH_QUEUE_SIZE = _env_int("FIXIT_HASH_QUEUE_SIZE", 32)
+# seconds a request waits for its hash result
+HASH_TIMEOUT = _env_float("FIXIT_HASH_TIMEOUT", 10.0)
+# latency budget (ms) for one hash; startup calibration picks the highest
+# bcrypt cost that fits it on this host
+BCRYPT_TARGET_MS = _env_float("FIXIT_BCRYPT_TARGET_MS", 250.0)
+BCRYPT_MIN_ROUNDS = _env_int("FIXIT_BCRYPT_MIN_ROUNDS", 10)
+BCRYPT_MAX_ROUNDS = _env_int("FIXIT_BCRYPT_MAX_ROUNDS", 15)
+# set to pin the cost factor and skip calibration; with several workers this
+# keeps every one hashing at the same cost, and logins rehash stored
+# passwords to it whether it went up or down
+BCRYPT_ROUNDS = _env_int("FIXIT_BCRYPT_ROUNDS", 0)
+
+# ===================== OPEN-COMPLAINT HOT SET =====================
+# in-process NumPy copy of unresolved complaints used by nearby search
+HOTSET_ENABLED = os.getenv("FIXIT_HOTSET", "1") == "1"
+# full reload interval (seconds); bounds staleness from other workers' writes
+HOTSET_REFRESH_S = _env_float("FIXIT_HOTSET_REFRESH_S", 60.0)
+
+# ===================== NEARBY CACHE =====================
+NEARBY_CACHE_ENTRIES = _env_int("FIXIT_NEARBY_CACHE_ENTRIES", 2048)
+# seconds a cached cell stays valid; bounds staleness from other workers' writes
+NEARBY_CACHE_TTL_S = _env_float("FIXIT_NEARBY_CACHE_TTL_S", 30.0)
+# cells with more complaints than this are not cached; those searches use SQL
+NEARBY_CACHE_MAX_ROWS = _env_int("FIXIT_NEARBY_CACHE_MAX_ROWS", 5000)
+
+# ===================== ADMIN COMPLAINT LIST =====================
+ADMIN_PAGE_SIZE = _env_int("FIXIT_ADMIN_PAGE_SIZE", 50)
+ADMIN_PAGE_MAX = _env_int("FIXIT_ADMIN_PAGE_MAX", 200)
+# filtered totals are counted exactly up to this many rows, then reported as
+# a lower bound instead of scanning the rest
+ADMIN_COUNT_CAP = _env_int("FIXIT_ADMIN_COUNT_CAP", 10000)
+
+# ===================== DASHBOARD COUNTERS =====================
+# rows each counter is spread over, so concurrent writers rarely share a lock
+COUNTER_SLOTS = _env_int("FIXIT_COUNTER_SLOTS", 8)
+# seconds between recounts from source; 0 disables the background job
+COUNTER_RECONCILE_S = _env_float("FIXIT_COUNTER_RECONCILE_S", 600.0)
+# how many recent days of daily tallies each recount checks
+COUNTER_RECONCILE_DAYS = _env_int("FIXIT_COUNTER_RECONCILE_DAYS", 7)
+
+# ===================== HOURLY ROLLUPS =====================
+# seconds between recounts from source; 0 disables the background job
+ROLLUP_RECONCILE_S = _env_float("FIXIT_ROLLUP_RECONCILE_S", 900.0)
+# how many recent days of rollups each recount checks
+ROLLUP_RECONCILE_DAYS = _env_int("FIXIT_ROLLUP_RECONCILE_DAYS", 2)
+
+# ===================== SLA SKETCHES =====================
+# seconds between recounts from source; 0 disables the background job
+SKETCH_RECONCILE_S = _env_float("FIXIT_SKETCH_RECONCILE_S", 900.0)
+# how many recent days of sketches each recount checks
+SKETCH_RECONCILE_DAYS = _env_int("FIXIT_SKETCH_RECONCILE_DAYS", 2)
+
+# ===================== HEATMAP CELLS =====================
+# highest zoom kept pre-binned in heatmap_cells; higher zooms bin raw rows,
+# and each binned zoom adds one row upsert per complaint write
+HEATMAP_BINNED_MAX_ZOOM = _env_int("FIXIT_HEATMAP_BINNED_MAX_ZOOM", 14)
+# seconds between recounts from source; 0 disables the background job
+HEATMAP_RECONCILE_S = _env_float("FIXIT_HEATMAP_RECONCILE_S", 900.0)
+# how many recent days of reported complaints each recount checks
+HEATMAP_RECONCILE_DAYS = _env_int("FIXIT_HEATMAP_RECONCILE_DAYS", 2)
+
+# ===================== ESCALATION SCHEDULER =====================
+# escalate open complaints as their deadlines pass, in a background thread
+ESCALATION_ENABLED = os.getenv("FIXIT_ESCALATION_SCHEDULER", "1") == "1"
+# hours from reported_at until an open complaint is escalated
+ESCALATION_SLA_HOURS = _env_float("FIXIT_ESCALATION_SLA_HOURS", 24.0)
+# per-department/priority SLA hours, most specific wins, e.g.
+# {"Water/High": 4, "priority:High": 8, "department:Roads": 48}
+ESCALATION_SLA_OVERRIDES = _env_json("FIXIT_ESCALATION_SLA_OVERRIDES", {})
+# complaints escalated per transaction
+ESCALATION_BATCH_SIZE = _env_int("FIXIT_ESCALATION_BATCH_SIZE", 100)
+# full reload interval (seconds); picks up complaints written by other workers
+ESCALATION_RELOAD_S = _env_float("FIXIT_ESCALATION_RELOAD_S", 300.0)
+# overdue sweep (POST /api/admin/escalate-overdue): rows per transaction
+# and seconds to pause between transactions
+ESCALATION_SWEEP_BATCH = _env_int("FIXIT_ESCALATION_SWEEP_BATCH", 500)
+ESCALATION_SWEEP_PAUSE_S = _env_float("FIXIT_ESCALATION_SWEEP_PAUSE_S", 0.05)
+
+# ===================== BULK INGESTION =====================
+# complaints per multi-row INSERT/transaction in POST /api/complaints/bulk
+BULK_CHUNK_SIZE = _env_int("FIXIT_BULK_CHUNK_SIZE", 500)
+BULK_MAX_CHUNK_SIZE = _env_int("FIXIT_BULK_MAX_CHUNK_SIZE", 5000)
+# items accepted per request
+BULK_MAX_ITEMS = _env_int("FIXIT_BULK_MAX_ITEMS", 50000)
+
+# ===================== WRITE-BEHIND QUEUE =====================
+# accept POST /api/complaints/queued: journal locally, write to MySQL in batches
+WRITE_BEHIND_ENABLED = os.getenv("FIXIT_WRITE_BEHIND", "0") == "1"
+# journal directory; each worker claims one of WRITE_BEHIND_JOURNAL_SLOTS files in it
+WRITE_BEHIND_JOURNAL_DIR = os.getenv("FIXIT_WRITE_BEHIND_JOURNAL_DIR", "./journal")
+WRITE_BEHIND_JOURNAL_SLOTS = _env_int("FIXIT_WRITE_BEHIND_JOURNAL_SLOTS", 16)
+# rewrite a journal with only its live submissions once it grows past this many bytes
+WRITE_BEHIND_JOURNAL_COMPACT_BYTES = _env_int("FIXIT_WRITE_BEHIND_JOURNAL_COMPACT_BYTES", 64 * 1024 * 1024)
+# flush when this many submissions are queued, or the oldest has waited this long
+WRITE_BEHIND_BATCH = _env_int("FIXIT_WRITE_BEHIND_BATCH", 500)
+WRITE_BEHIND_FLUSH_MS = _env_int("FIXIT_WRITE_BEHIND_FLUSH_MS", 50)
+# submission statuses kept in memory for polling
+WRITE_BEHIND_STATUS_KEEP = _env_int("FIXIT_WRITE_BEHIND_STATUS_KEEP", 100000)
+
+# ===================== NEAR-DUPLICATES =====================
+# link new complaints to an unresolved one of the same type nearby instead of inserting
+DEDUPE_ENABLED = os.getenv("FIXIT_DEDUPE", "1") == "1"
+# how close (metres) and how recent (hours) the existing complaint must be
+DEDUPE_RADIUS_M = _env_float("FIXIT_DEDUPE_RADIUS_M", 50.0)
+DEDUPE_WINDOW_HOURS = _env_float("FIXIT_DEDUPE_WINDOW_HOURS", 72.0)
+
+# ===================== VIEW CACHE =====================
+# rendered complaint detail / user history bodies kept per worker (0 disables)
+VIEW_CACHE_ENTRIES = _env_int("FIXIT_VIEW_CACHE_ENTRIES", 10000)
+# seconds an entry is served without re-reading its version stamp; bounds
+# how long another worker's write can go unseen
+VIEW_CACHE_TTL_S = _env_float("FIXIT_VIEW_CACHE_TTL_S", 2.0)
+
+# ===================== LIVE FEED =====================
+# events kept per worker for Last-Event-ID resume
+FEED_RING_SIZE = _env_int("FIXIT_FEED_RING_SIZE", 10000)
+# undelivered events per connection before it is cut off
+FEED_QUEUE_SIZE = _env_int("FIXIT_FEED_QUEUE_SIZE", 256)
+# seconds between keep-alive comments on an idle stream
+FEED_HEARTBEAT_S = _env_float("FIXIT_FEED_HEARTBEAT_S", 15.0)
+# reconnect delay suggested to EventSource clients
+FEED_RETRY_MS = _env_int("FIXIT_FEED_RETRY_MS", 3000)
+
+# ===================== CHANGE FEED =====================
+# GET /api/events page size: default and largest allowed
+EVENTS_PAGE_SIZE = _env_int("FIXIT_EVENTS_PAGE_SIZE", 500)
+EVENTS_PAGE_MAX = _env_int("FIXIT_EVENTS_PAGE_MAX", 5000)
+# margin (seconds) when comparing event times with the oldest open
+# transaction's start, which InnoDB reports to the whole second
+EVENTS_GAP_SLACK_S = _env_float("FIXIT_EVENTS_GAP_SLACK_S", 2.0)
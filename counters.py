@@ -0,0 +1,272 @@
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import config
+
+# ===================== DASHBOARD COUNTERS =====================
+# Running tallies behind /api/stats, updated in the same transaction as the
+# complaint/user write they describe:
+#
+#   stat_counters        all-time: status:<s>, priority:<p>, department:<d>, users
+#   stat_daily_counters  per day:  reported, escalated
+#
+# Each counter is spread over COUNTER_SLOTS rows and writers pick a slot at
+# random, so concurrent writers rarely queue on the same row lock; readers
+# sum the slots. Writes outside the API (admin scripts, manual SQL) are
+# corrected by reconcile().
+
+LOCK_NAME = "fixit_counter_reconcile"
+
+CREATE_COUNTERS = """
+CREATE TABLE IF NOT EXISTS stat_counters (
+    name VARCHAR(80) NOT NULL,
+    slot TINYINT UNSIGNED NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, slot)
+)
+"""
+
+CREATE_DAILY_COUNTERS = """
+CREATE TABLE IF NOT EXISTS stat_daily_counters (
+    day DATE NOT NULL,
+    name VARCHAR(80) NOT NULL,
+    slot TINYINT UNSIGNED NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, name, slot)
+)
+"""
+
+TOTALS_SQL = "SELECT name, SUM(value) AS value FROM stat_counters GROUP BY name"
+DAILY_SQL = """
+    SELECT day, name, SUM(value) AS value
+    FROM stat_daily_counters
+    WHERE day >= %s
+    GROUP BY day, name
+"""
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def contributions(row) -> Counter:
+    """What one complaint row adds to the counters. Missing keys add nothing.
+
+    Totals are keyed (None, name), daily tallies (day, name).
+    """
+    keys = Counter()
+    for column in ("status", "priority", "department"):
+        if row.get(column) is not None:
+            keys[(None, f"{column}:{row[column]}")] += 1
+    if row.get("reported_at") is not None:
+        keys[(_day(row["reported_at"]), "reported")] += 1
+    if row.get("escalated_at") is not None:
+        keys[(_day(row["escalated_at"]), "escalated")] += 1
+    return keys
+
+
+def changes(old, new, weight=1) -> Counter:
+    """Counter deltas for a row going from old to new (either may be None).
+
+    Only the columns present in the dicts are compared, so callers can pass
+    just what changed.
+    """
+    delta = Counter()
+    for key, n in contributions(new or {}).items():
+        delta[key] += n * weight
+    for key, n in contributions(old or {}).items():
+        delta[key] -= n * weight
+    return delta
+
+
+def apply(cursor, delta, slot=None):
+    """Add delta to the counters; call inside the writer's transaction."""
+    totals = []
+    daily = []
+    # a fixed lock order keeps concurrent writers from deadlocking
+    for (day, name), n in sorted(delta.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        if not n:
+            continue
+        row_slot = random.randrange(config.COUNTER_SLOTS) if slot is None else slot
+        if day is None:
+            totals.append((name, row_slot, n))
+        else:
+            daily.append((day, name, row_slot, n))
+
+    if totals:
+        cursor.execute(
+            "INSERT INTO stat_counters (name, slot, value) VALUES "
+            + ", ".join(["(%s,%s,%s)"] * len(totals))
+            + " ON DUPLICATE KEY UPDATE value = value + VALUES(value)",
+            tuple(v for row in totals for v in row),
+        )
+    if daily:
+        cursor.execute(
+            "INSERT INTO stat_daily_counters (day, name, slot, value) VALUES "
+            + ", ".join(["(%s,%s,%s,%s)"] * len(daily))
+            + " ON DUPLICATE KEY UPDATE value = value + VALUES(value)",
+            tuple(v for row in daily for v in row),
+        )
+
+
+def percentage_change(today: int, yesterday: int) -> float:
+    if yesterday == 0:
+        return 100 if today > 0 else 0
+    return round((today - yesterday) / yesterday * 100, 2)
+
+
+def summarize(totals, daily, today: date):
+    """/api/stats payload from TOTALS_SQL rows and DAILY_SQL rows since yesterday.
+
+    Rows are dicts, as returned by dictionary cursors on both drivers.
+    """
+    totals = {r["name"]: int(r["value"]) for r in totals}
+    daily = {(_day(r["day"]), r["name"]): int(r["value"]) for r in daily}
+    yesterday = today - timedelta(days=1)
+
+    def breakdown(column):
+        prefix = f"{column}:"
+        return [
+            {column: name[len(prefix):], "count": n}
+            for name, n in sorted(totals.items())
+            if name.startswith(prefix) and n > 0
+        ]
+
+    status_distribution = breakdown("status")
+    total_today = daily.get((today, "reported"), 0)
+    return {
+        "total_today": total_today,
+        "percentage_change": percentage_change(total_today, daily.get((yesterday, "reported"), 0)),
+        "escalated_today": daily.get((today, "escalated"), 0),
+        "total_users": totals.get("users", 0),
+        "active_tickets": sum(r["count"] for r in status_distribution if r["status"] != "Resolved"),
+        "priority_summary": breakdown("priority"),
+        "status_distribution": status_distribution,
+        "department_volume": breakdown("department"),
+    }
+
+
+# ===================== RECONCILIATION =====================
+def reconcile(conn, cursor, days=None, lock_timeout=0):
+    """Recount from the source tables and fold any drift back in.
+
+    Source rows and counters are read from one consistent snapshot, where
+    they agree unless something bypassed the counters; the difference is
+    then added as an increment, which commutes with concurrent writers, so
+    nothing is locked while counting. Daily tallies are checked for the last
+    `days` days. Returns the corrections applied, or None if another worker
+    is already reconciling. Expects a tuple cursor.
+    """
+    days = config.COUNTER_RECONCILE_DAYS if days is None else days
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, lock_timeout))
+    if cursor.fetchone()[0] != 1:
+        conn.rollback()
+        return None
+
+    try:
+        conn.rollback()
+        conn.start_transaction(consistent_snapshot=True)
+        since = date.today() - timedelta(days=days - 1)
+
+        source = Counter()
+        cursor.execute(
+            "SELECT status, priority, department, COUNT(*) FROM complaints "
+            "GROUP BY status, priority, department"
+        )
+        for status, priority, department, n in cursor.fetchall():
+            source.update(changes(None, {"status": status, "priority": priority, "department": department}, n))
+        cursor.execute("SELECT COUNT(*) FROM users")
+        source[(None, "users")] += cursor.fetchone()[0]
+        for column, name in (("reported_at", "reported"), ("escalated_at", "escalated")):
+            cursor.execute(
+                f"SELECT DATE({column}), COUNT(*) FROM complaints WHERE {column} >= %s GROUP BY DATE({column})",
+                (since,),
+            )
+            for day, n in cursor.fetchall():
+                source[(day, name)] += n
+
+        current = Counter()
+        cursor.execute(TOTALS_SQL)
+        for name, value in cursor.fetchall():
+            current[(None, name)] += int(value)
+        cursor.execute(DAILY_SQL, (since,))
+        for day, name, value in cursor.fetchall():
+            current[(day, name)] += int(value)
+
+        drift = Counter()
+        for key in source.keys() | current.keys():
+            if source[key] != current[key]:
+                drift[key] = source[key] - current[key]
+
+        apply(cursor, drift, slot=0)
+        conn.commit()
+        return drift
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+
+
+class Reconciler:
+    """Runs a reconcile job now or periodically in a background thread.
+
+    job(conn, cursor) returns its corrections as a dict, or None when another
+    worker holds the job's lock.
+    """
+
+    def __init__(self, job, name):
+        self.job = job
+        self.name = name
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._corrections = 0
+        self._last_run = None
+        self._last_error = None
+
+    def run(self, cursor_factory):
+        with cursor_factory(dictionary=False) as (conn, cursor):
+            drift = self.job(conn, cursor)
+        with self._lock:
+            self._last_run = time.time()
+            if drift is not None:
+                self._runs += 1
+                self._corrections += sum(1 for n in drift.values() if n)
+        return drift
+
+    def start(self, cursor_factory, interval):
+        if interval <= 0:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    drift = self.run(cursor_factory)
+                    if drift:
+                        print(f"⚠️ {self.name} drifted, corrected {len(drift)} entries")
+                except Exception as e:
+                    with self._lock:
+                        self._last_error = str(e)
+                    print(f"⚠️ {self.name} reconcile failed: {e}")
+
+        threading.Thread(target=loop, name=f"{self.name}-reconcile", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reconcile_runs": self._runs,
+                "corrections": self._corrections,
+                "last_run": self._last_run,
+                "last_error": self._last_error,
+            }
+
+
+reconciler = Reconciler(reconcile, "counters")
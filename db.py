@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector as sql
+
+import config
+
+
+# ===================== RAW CONNECTION =====================
+def get_conn():
+    return sql.connect(
+        host=config.DB_HOST,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        database=config.DB_NAME,
+        port=config.DB_PORT,
+    )
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the checkout timeout."""
+
+
+class _Entry:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+# ===================== CONNECTION POOL =====================
+class ConnectionPool:
+    def __init__(self, factory, size, checkout_timeout, max_lifetime, ping_interval):
+        self.factory = factory
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._open = 0
+        self._in_use = 0
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+
+    def _take(self):
+        """Reserve an idle entry, or a slot to open a new one (returns None)."""
+        deadline = time.monotonic() + self.checkout_timeout
+        waited_from = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    entry = None
+                    break
+                now = time.monotonic()
+                if waited_from is None:
+                    waited_from = now
+                    self._waits += 1
+                if now >= deadline:
+                    self._timeouts += 1
+                    self._wait_seconds += now - waited_from
+                    raise PoolTimeout(f"no database connection free after {self.checkout_timeout}s")
+                self._cond.wait(deadline - now)
+
+            if waited_from is not None:
+                self._wait_seconds += time.monotonic() - waited_from
+            self._checkouts += 1
+            self._in_use += 1
+        return entry
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _drop_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _connect(self):
+        try:
+            entry = _Entry(self.factory())
+        except Exception:
+            self._drop_slot()
+            raise
+        with self._cond:
+            self._created += 1
+        return entry
+
+    def _is_usable(self, entry):
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            with self._cond:
+                self._recycled += 1
+            return False
+        if now - entry.last_used > self.ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._discarded += 1
+                return False
+        return True
+
+    def acquire(self):
+        entry = self._take()
+        if entry is None:
+            return self._connect()
+        if self._is_usable(entry):
+            return entry
+        self._close_quietly(entry.conn)
+        return self._connect()
+
+    def release(self, entry, discard=False):
+        if not discard:
+            try:
+                if entry.conn.in_transaction:
+                    entry.conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._close_quietly(entry.conn)
+            with self._cond:
+                self._discarded += 1
+            self._drop_slot()
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        entry = self.acquire()
+        discard = False
+        try:
+            yield entry.conn
+        except sql.errors.OperationalError:
+            # lost/broken connection: never hand it to the next request
+            discard = True
+            raise
+        finally:
+            self.release(entry, discard=discard)
+
+    def close_all(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for entry in idle:
+            self._close_quietly(entry.conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_seconds_total": round(self._wait_seconds, 4),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "discarded": self._discarded,
+            }
+
+
+pool = ConnectionPool(
+    get_conn,
+    size=config.DB_POOL_SIZE,
+    checkout_timeout=config.DB_POOL_TIMEOUT,
+    max_lifetime=config.DB_POOL_MAX_LIFETIME,
+    ping_interval=config.DB_POOL_PING_INTERVAL,
+)
+
+
+@contextmanager
+def db_cursor(dictionary=True):
+    """Check out a pooled connection and a cursor; both are returned on exit."""
+    with pool.connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary, buffered=True)
+        try:
+            yield conn, cursor
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
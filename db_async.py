@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiomysql
+
+import config
+from db import PoolTimeout
+
+
+# ===================== ASYNC CONNECTION POOL =====================
+_pool = None
+
+async def open_pool():
+    global _pool
+    if _pool is None:
+        _pool = await aiomysql.create_pool(
+            host=config.DB_HOST,
+            port=config.DB_PORT,
+            user=config.DB_USER,
+            password=config.DB_PASSWORD,
+            db=config.DB_NAME,
+            minsize=1,
+            maxsize=config.DB_POOL_SIZE,
+            pool_recycle=int(config.DB_POOL_MAX_LIFETIME),
+            autocommit=True,
+        )
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+@asynccontextmanager
+async def async_cursor():
+    """Async twin of db.db_cursor(): pooled connection + dict cursor."""
+    pool = await open_pool()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout=config.DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PoolTimeout(f"no database connection free after {config.DB_POOL_TIMEOUT}s")
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            yield conn, cursor
+    finally:
+        pool.release(conn)
+
+
+async def fetch_one(query, params=None):
+    async with async_cursor() as (conn, cursor):
+        await cursor.execute(query, params)
+        return await cursor.fetchone()
+
+async def fetch_all(query, params=None):
+    async with async_cursor() as (conn, cursor):
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+def stats():
+    if _pool is None:
+        return None
+    return {
+        "size": _pool.maxsize,
+        "open": _pool.size,
+        "idle": _pool.freesize,
+        "in_use": _pool.size - _pool.freesize,
+    }
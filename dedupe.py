@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+import config
+import events
+from geo import GEOM_FROM_WKT, bbox_wkt, bounding_box, point_wkt
+from view_cache import bump_history
+
+# ===================== NEAR-DUPLICATE COMPLAINTS =====================
+# A new complaint of the same type as an unresolved one reported within
+# DEDUPE_WINDOW_HOURS and DEDUPE_RADIUS_M is a second report of the same
+# problem. Instead of a new complaints row it becomes a complaint_duplicates
+# row linked to that canonical complaint, whose reports_count goes up, so
+# stats, escalation and the admin queue see one work item per problem.
+#
+# The lookup is a SPATIAL-index MBRContains probe on a box around the new
+# point, trimmed to the exact radius with ST_Distance_Sphere; the nearest
+# candidate wins. Two reports racing for a spot with no canonical yet can
+# both create one; later reports link to the nearer of the two. The same
+# goes for two reports of one spot inside a single bulk or queued batch:
+# each is checked against what is already committed, not against the rest
+# of its batch.
+#
+# Linking locks the canonical complaint row before any users row
+# (bump_history), the same order as admin updates and escalations. A batch
+# locks all its canonical rows up front, in id order, so links to several
+# complaints can't interleave with those writers either. A deadlock that
+# still happens is retried (LINK_ATTEMPTS in all).
+
+ER_LOCK_DEADLOCK = 1213
+LINK_ATTEMPTS = 3
+
+CREATE_DUPLICATES = """
+CREATE TABLE IF NOT EXISTS complaint_duplicates (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    complaint_id INT NOT NULL,
+    user_id INT NOT NULL,
+    description TEXT,
+    image_url TEXT,
+    latitude DECIMAL(10,8) NOT NULL,
+    longitude DECIMAL(11,8) NOT NULL,
+    distance_m FLOAT NOT NULL,
+    reported_at DATETIME NOT NULL,
+    INDEX idx_duplicates_complaint (complaint_id, reported_at),
+    INDEX idx_duplicates_user (user_id)
+)
+"""
+
+
+def find_canonical(cursor, complaint_type, lat, lng, now):
+    """Nearest unresolved complaint this report duplicates, or None.
+
+    Returns {"id", "reports_count", "distance_m"}.
+    """
+    radius_m = config.DEDUPE_RADIUS_M
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_m / 1000)
+    cursor.execute(
+        f"""
+        SELECT * FROM (
+            SELECT id, reports_count,
+                   ST_Distance_Sphere(location, {GEOM_FROM_WKT}) AS distance_m
+            FROM complaints
+            WHERE MBRContains({GEOM_FROM_WKT}, location)
+              AND type = %s
+              AND status <> 'Resolved'
+              AND reported_at >= %s
+              AND latitude IS NOT NULL
+              AND longitude IS NOT NULL
+        ) candidates
+        WHERE distance_m <= %s
+        ORDER BY distance_m, id
+        LIMIT 1
+        """,
+        (
+            point_wkt(lat, lng),
+            bbox_wkt(min_lat, max_lat, min_lng, max_lng),
+            complaint_type,
+            now - timedelta(hours=config.DEDUPE_WINDOW_HOURS),
+            radius_m,
+        ),
+    )
+    row = cursor.fetchone()
+    if row is not None and not isinstance(row, dict):
+        row = dict(zip(("id", "reports_count", "distance_m"), row))
+    return row
+
+
+def lock_canonicals(cursor, ids):
+    """Lock these complaints in id order; returns {id: reports_count} for the unresolved ones."""
+    ids = sorted(set(ids))
+    cursor.execute(
+        f"SELECT id, reports_count, status FROM complaints "
+        f"WHERE id IN ({','.join(['%s'] * len(ids))}) ORDER BY id FOR UPDATE",
+        tuple(ids),
+    )
+    rows = [row if isinstance(row, dict) else dict(zip(("id", "reports_count", "status"), row))
+            for row in cursor.fetchall()]
+    return {row["id"]: row["reports_count"] for row in rows if row["status"] != "Resolved"}
+
+
+def link(cursor, canonical_id, data, reported_at, distance_m, submission_id=None):
+    """Record data as another report of canonical_id; the last step before the caller's COMMIT.
+
+    Locks the canonical row before touching users; with several links in one
+    transaction, call lock_canonicals() first.
+    """
+    cursor.execute(
+        """
+        INSERT INTO complaint_duplicates
+        (complaint_id, user_id, description, image_url, latitude, longitude, distance_m, reported_at,
+         submission_id)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """,
+        (
+            canonical_id,
+            data.user_id,
+            data.description,
+            data.image_url,
+            data.latitude,
+            data.longitude,
+            distance_m,
+            reported_at,
+            submission_id,
+        ),
+    )
+    cursor.execute(
+        "UPDATE complaints SET reports_count = reports_count + 1, version = version + 1 WHERE id=%s",
+        (canonical_id,),
+    )
+    # the owner and every reporter, this one included, see the new reports_count
+    bump_history(cursor, [canonical_id])
+    report = {
+        "id": canonical_id,
+        "user_id": data.user_id,
+        "type": data.type,
+        "priority": data.priority,
+        "department": data.department,
+        "latitude": data.latitude,
+        "longitude": data.longitude,
+    }
+    events.append(cursor, [events.event("duplicate", None, report, reported_at)])
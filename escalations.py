@@ -0,0 +1,376 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import config
+import counters
+import events
+import heatmap
+import rollups
+from view_cache import bump_history
+
+# ===================== ESCALATION SCHEDULER =====================
+# Every open complaint has a deadline, reported_at + its SLA hours. The
+# scheduler keeps them in a min-heap and sleeps until the earliest one, then
+# escalates exactly the complaints that are due, a batch per transaction.
+# Write paths call track() so new complaints and status/priority changes
+# move their deadlines; a periodic reload picks up other workers' writes.
+#
+# Every worker runs its own scheduler. Escalation re-reads each due row
+# under FOR UPDATE and skips anything already escalated or closed, so
+# workers racing on the same complaint escalate it once.
+
+CLOSED_STATUSES = ("Resolved", "Escalated")
+ROW_COLUMNS = """
+    id, user_id, type, status, priority, department, description, latitude, longitude,
+    reported_at, acknowledged_at, in_progress_at, resolved_at, escalated_at
+"""
+
+
+def sla_hours(department, priority) -> float:
+    """SLA for a complaint: department/priority, then department, then priority."""
+    overrides = config.ESCALATION_SLA_OVERRIDES
+    for key in (f"{department}/{priority}", f"department:{department}", f"priority:{priority}"):
+        if key in overrides:
+            return float(overrides[key])
+    return config.ESCALATION_SLA_HOURS
+
+
+def deadline_for(row):
+    """Epoch seconds at which the complaint escalates, or None if it never will."""
+    if row.get("status") in CLOSED_STATUSES or row.get("reported_at") is None:
+        return None
+    return row["reported_at"].timestamp() + sla_hours(row.get("department"), row.get("priority")) * 3600
+
+
+def escalate_batch(conn, cursor, ids, now, is_due):
+    """Escalate the complaints in ids for which is_due(row) holds, in one transaction.
+
+    Rows are re-read under FOR UPDATE, so anything closed or changed since
+    the ids were picked is judged on its current state. Returns (escalated
+    rows as they now are, open rows that were not due).
+    """
+    placeholders = ",".join(["%s"] * len(ids))
+    cursor.execute(
+        f"SELECT {ROW_COLUMNS} FROM complaints WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE",
+        tuple(ids),
+    )
+    due, later = [], []
+    for row in cursor.fetchall():
+        if row["status"] in CLOSED_STATUSES:
+            continue
+        (due if is_due(row) else later).append(row)
+    if not due:
+        conn.rollback()
+        return [], later
+
+    escalated = [{**row, "status": "Escalated", "escalated_at": now} for row in due]
+    cursor.execute(
+        f"UPDATE complaints SET status='Escalated', escalated_at=%s, version = version + 1 "
+        f"WHERE id IN ({','.join(['%s'] * len(due))})",
+        (now, *(row["id"] for row in due)),
+    )
+    bump_history(cursor, [row["id"] for row in due])
+    delta = Counter()
+    rollup_delta = {}
+    heatmap_delta = {}
+    for old, new in zip(due, escalated):
+        delta.update(counters.changes(old, new))
+        rollups.merge(rollup_delta, rollups.changes(old, new))
+        heatmap.merge(heatmap_delta, heatmap.changes(old, new))
+    counters.apply(cursor, delta)
+    rollups.apply(cursor, rollup_delta)
+    heatmap.apply(cursor, heatmap_delta)
+    events.append(cursor, [events.event("escalated", old, new, now) for old, new in zip(due, escalated)])
+    conn.commit()
+    return escalated, later
+
+
+class EscalationScheduler:
+    def __init__(self, batch_size):
+        self.enabled = config.ESCALATION_ENABLED
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._heap = []        # (deadline, id); stale entries are skipped lazily
+        self._deadline = {}    # id -> current deadline
+        # changes seen while a reload is in flight, replayed onto the new heap
+        self._replay = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self._escalated = 0
+        self._batches = 0
+        self._last_error = None
+        self.loaded_at = None
+
+    # ---------- tracking ----------
+    def _set(self, cid, deadline):
+        if deadline is None:
+            self._deadline.pop(cid, None)
+            return
+        self._deadline[cid] = deadline
+        heapq.heappush(self._heap, (deadline, cid))
+        if len(self._heap) > 2 * len(self._deadline) + 1024:
+            self._heap = [(d, i) for i, d in self._deadline.items()]
+            heapq.heapify(self._heap)
+
+    def track(self, row):
+        """(Re)compute a complaint's deadline after it was created or changed."""
+        if not self.enabled:
+            return
+        cid, deadline = int(row["id"]), deadline_for(row)
+        with self._lock:
+            earliest = self._heap[0][0] if self._heap else None
+            self._set(cid, deadline)
+            if self._replay is not None:
+                self._replay.append((cid, deadline))
+        if deadline is not None and (earliest is None or deadline < earliest):
+            self._wake.set()
+
+    def load(self, cursor):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._replay = []
+
+        cursor.execute(
+            "SELECT id, status, priority, department, reported_at FROM complaints "
+            "WHERE status NOT IN ('Resolved', 'Escalated')"
+        )
+        deadlines = {}
+        for row in cursor.fetchall():
+            deadline = deadline_for(row)
+            if deadline is not None:
+                deadlines[int(row["id"])] = deadline
+
+        with self._lock:
+            self._deadline = deadlines
+            self._heap = [(d, i) for i, d in deadlines.items()]
+            heapq.heapify(self._heap)
+            for cid, deadline in self._replay:
+                self._set(cid, deadline)
+            self._replay = None
+            self.loaded_at = datetime.now()
+        self._wake.set()
+
+    def _pop_due(self, now_ts):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts and len(due) < self.batch_size:
+                deadline, cid = heapq.heappop(self._heap)
+                if self._deadline.get(cid) == deadline:
+                    del self._deadline[cid]
+                    due.append((deadline, cid))
+        return due
+
+    def _restore(self, due):
+        with self._lock:
+            for deadline, cid in due:
+                if cid not in self._deadline:
+                    self._set(cid, deadline)
+
+    def seconds_until_next(self, now_ts):
+        with self._lock:
+            while self._heap and self._deadline.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] - now_ts if self._heap else None
+
+    # ---------- escalation ----------
+    def run_due(self, cursor_factory, on_escalated):
+        """Escalate everything due now, batch by batch; returns how many."""
+        total = 0
+        while not self._stop.is_set():
+            now = datetime.now().replace(microsecond=0)
+            due = self._pop_due(now.timestamp())
+            if not due:
+                break
+            try:
+                with cursor_factory() as (conn, cursor):
+                    rows, later = escalate_batch(
+                        conn, cursor, [cid for _, cid in due], now,
+                        lambda row: deadline_for(row) is not None and deadline_for(row) <= now.timestamp(),
+                    )
+                # priority or department changed elsewhere: not due yet after all
+                for row in later:
+                    self.track(row)
+            except Exception:
+                self._restore(due)
+                raise
+            with self._lock:
+                self._batches += 1
+                self._escalated += len(rows)
+            total += len(rows)
+            if rows:
+                on_escalated(rows)
+        return total
+
+    def start(self, cursor_factory, on_escalated, reload_interval):
+        if not self.enabled:
+            return
+
+        def loop():
+            next_reload = time.monotonic() + reload_interval
+            while not self._stop.is_set():
+                self._wake.clear()
+                try:
+                    if reload_interval > 0 and time.monotonic() >= next_reload:
+                        with cursor_factory() as (conn, cursor):
+                            self.load(cursor)
+                        next_reload = time.monotonic() + reload_interval
+                    self.run_due(cursor_factory, on_escalated)
+                except Exception as e:
+                    with self._lock:
+                        self._last_error = str(e)
+                    print(f"⚠️ escalation scheduler failed: {e}")
+                    # back off instead of retrying a failing batch in a loop
+                    self._stop.wait(5)
+
+                wait = self.seconds_until_next(time.time())
+                if reload_interval > 0:
+                    until_reload = next_reload - time.monotonic()
+                    wait = until_reload if wait is None else min(wait, until_reload)
+                self._wake.wait(max(0.0, wait) if wait is not None else None)
+
+        threading.Thread(target=loop, name="escalation-scheduler", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self):
+        next_in = self.seconds_until_next(time.time())
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "tracked": len(self._deadline),
+                "next_deadline_in_s": round(next_in, 1) if next_in is not None else None,
+                "escalated": self._escalated,
+                "batches": self._batches,
+                "last_error": self._last_error,
+                "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            }
+
+
+escalation_scheduler = EscalationScheduler(config.ESCALATION_BATCH_SIZE)
+
+
+# ===================== OVERDUE SWEEP =====================
+class OverdueSweep:
+    """Escalates every open complaint reported before cutoff, in id order.
+
+    Each batch is picked with a plain (non-locking) read of the next
+    batch_size overdue ids after the last one handled, then escalated in its
+    own short transaction, with an optional pause in between, so a large
+    backlog never holds more than one batch of row locks.
+    """
+
+    def __init__(self, sweep_id, cutoff, now, batch_size, pause):
+        self.id = sweep_id
+        self.cutoff = cutoff
+        self.now = now
+        self.batch_size = batch_size
+        self.pause = pause
+        self.state = "pending"
+        self.total_estimate = None
+        self.escalated_ids = []
+        self.batches = 0
+        self.last_id = 0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def _is_due(self, row):
+        return row["reported_at"] is not None and row["reported_at"] <= self.cutoff
+
+    def run(self, cursor_factory, on_escalated):
+        self.state = "running"
+        self.started_at = datetime.now()
+        try:
+            with cursor_factory() as (conn, cursor):
+                cursor.execute(
+                    "SELECT COUNT(*) AS n FROM complaints "
+                    "WHERE status IN ('Reported', 'Acknowledged', 'InProgress') AND reported_at <= %s",
+                    (self.cutoff,),
+                )
+                self.total_estimate = cursor.fetchone()["n"]
+                conn.rollback()
+
+            while True:
+                with cursor_factory() as (conn, cursor):
+                    cursor.execute(
+                        """
+                        SELECT id FROM complaints
+                        WHERE id > %s
+                          AND status NOT IN ('Resolved', 'Escalated')
+                          AND reported_at <= %s
+                        ORDER BY id
+                        LIMIT %s
+                        """,
+                        (self.last_id, self.cutoff, self.batch_size),
+                    )
+                    ids = [row["id"] for row in cursor.fetchall()]
+                    conn.rollback()
+                    if not ids:
+                        break
+                    rows, _ = escalate_batch(conn, cursor, ids, self.now, self._is_due)
+
+                self.last_id = ids[-1]
+                self.batches += 1
+                self.escalated_ids.extend(row["id"] for row in rows)
+                if rows:
+                    on_escalated(rows)
+                if self.pause > 0:
+                    time.sleep(self.pause)
+
+            self.state = "done"
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            raise
+        finally:
+            self.finished_at = datetime.now()
+
+    def progress(self, include_ids=True):
+        result = {
+            "sweep_id": self.id,
+            "state": self.state,
+            "cutoff": self.cutoff.isoformat(),
+            "total_estimate": self.total_estimate,
+            "escalated": len(self.escalated_ids),
+            "batches": self.batches,
+            "last_id": self.last_id,
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_ids:
+            result["ids"] = list(self.escalated_ids)
+        return result
+
+
+class SweepRegistry:
+    """Recent sweeps by id, so background runs can be polled for progress."""
+
+    def __init__(self, keep=20):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._sweeps = {}
+        self._next_id = 1
+
+    def create(self, cutoff, now, batch_size, pause):
+        with self._lock:
+            sweep = OverdueSweep(self._next_id, cutoff, now, batch_size, pause)
+            self._next_id += 1
+            self._sweeps[sweep.id] = sweep
+            while len(self._sweeps) > self.keep:
+                del self._sweeps[min(self._sweeps)]
+            return sweep
+
+    def get(self, sweep_id):
+        with self._lock:
+            return self._sweeps.get(sweep_id)
+
+
+sweeps = SweepRegistry()
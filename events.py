@@ -0,0 +1,214 @@
+from datetime import timedelta
+
+import config
+
+# ===================== COMPLAINT EVENT LOG =====================
+# Append-only change feed: one complaint_events row per creation, admin
+# update, escalation and duplicate report, written in the same
+# transaction as the change itself. Consumers page through it with
+# GET /api/events?after=<seq> and keep the last seq they processed.
+#
+# seq is AUTO_INCREMENT, so concurrent writers never queue behind each
+# other for it. InnoDB hands seqs out in allocation order, not commit
+# order, though: while the transaction holding seq 11 is still open, 12
+# can already be committed, and a reader that moved past 12 would never
+# see 11. Readers therefore stop at the committed watermark: they walk
+# seqs upward and stop at the first missing one, unless that gap is
+# settled, i.e. no transaction that could own it is still open.
+#
+# horizon() reads when the oldest open writing transaction started. A seq
+# below a visible event was allocated before that event was logged, so if
+# the event was logged before every open writer started, the missing seq
+# belonged to a transaction that has since rolled back (InnoDB never
+# reuses one). Every writer changes complaint rows before it appends
+# events, so an owner of an unused seq always shows up as a writer.
+# horizon() is read before the snapshot the rows come from, so a writer
+# that commits in between is either still counted or already visible.
+# Reading information_schema.innodb_trx needs the PROCESS privilege.
+#
+# The top seq a transaction got is stamped on the changed complaints as
+# row_version. Delta sync reads the watermark and the rows in one
+# snapshot, so everything with a row_version <= the token it hands out is
+# already visible to it.
+
+CREATE_EVENTS = """
+CREATE TABLE IF NOT EXISTS complaint_events (
+    seq BIGINT NOT NULL PRIMARY KEY,
+    complaint_id INT NOT NULL,
+    user_id INT NULL,
+    kind VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NULL,
+    previous_status VARCHAR(20) NULL,
+    priority VARCHAR(20) NULL,
+    previous_priority VARCHAR(20) NULL,
+    type VARCHAR(50) NULL,
+    department VARCHAR(50) NULL,
+    latitude DECIMAL(10,8) NULL,
+    longitude DECIMAL(11,8) NULL,
+    at DATETIME NOT NULL,
+    INDEX idx_events_complaint (complaint_id, seq)
+)
+"""
+
+# seq counter row of migration 11; migration 14 replaced it with AUTO_INCREMENT
+CREATE_EVENT_SEQ = """
+CREATE TABLE IF NOT EXISTS complaint_event_seq (
+    id TINYINT NOT NULL PRIMARY KEY,
+    seq BIGINT NOT NULL
+)
+"""
+
+SEED_EVENT_SEQ = "INSERT IGNORE INTO complaint_event_seq (id, seq) VALUES (1, 0)"
+
+COLUMNS = (
+    "complaint_id", "user_id", "kind", "status", "previous_status", "priority",
+    "previous_priority", "type", "department", "latitude", "longitude", "at",
+)
+
+FIELDS = ("seq", *COLUMNS)
+
+# start of the oldest open transaction that has changed rows; NOW(3) if none
+HORIZON_SQL = """
+    SELECT COALESCE(MIN(trx_started), NOW(3)) AS horizon
+    FROM information_schema.innodb_trx
+    WHERE trx_rows_modified > 0
+"""
+
+# tail page for watermark(): (before, limit)
+TAIL_SQL = """
+    SELECT seq, logged_at
+    FROM complaint_events
+    WHERE seq < %s
+    ORDER BY seq DESC
+    LIMIT %s
+"""
+TAIL_PAGE = 500
+
+
+def page_sql(fields=FIELDS):
+    """Page query (after, limit) selecting fields, a subset of FIELDS, plus "logged_at".
+
+    Pass the rows through committed() before handing them out.
+    """
+    return f"""
+        SELECT {', '.join(fields)}, logged_at
+        FROM complaint_events
+        WHERE seq > %s
+        ORDER BY seq
+        LIMIT %s
+    """
+
+
+def _scalar(row, name):
+    return row[name] if isinstance(row, dict) else row[0]
+
+
+def increment(cursor):
+    """Distance between consecutive seqs (auto_increment_increment)."""
+    cursor.execute("SELECT @@auto_increment_increment AS step")
+    return int(_scalar(cursor.fetchone(), "step"))
+
+
+def horizon(conn, cursor):
+    """Events logged before this time have no open transaction owning a gap below them.
+
+    Ends the current transaction, so call it first: the reads that follow
+    get a snapshot taken after it. EVENTS_GAP_SLACK_S is taken off because
+    trx_started is whole seconds and logged_at is when the INSERT statement
+    started, a moment before its seqs were allocated.
+    """
+    conn.rollback()
+    cursor.execute(HORIZON_SQL)
+    started = _scalar(cursor.fetchone(), "horizon")
+    conn.rollback()
+    return started - timedelta(seconds=config.EVENTS_GAP_SLACK_S)
+
+
+def committed(rows, after, step, cutoff):
+    """The leading page rows up to the first gap that may still be filled; drops "logged_at"."""
+    visible = []
+    previous = after
+    for row in rows:
+        logged_at = row.pop("logged_at")
+        if row["seq"] - previous > step and not logged_at < cutoff:
+            break
+        visible.append(row)
+        previous = row["seq"]
+    return visible
+
+
+def watermark(cursor, cutoff):
+    """Highest seq such that every event up to it is committed or abandoned.
+
+    Walks down from the newest event to one logged before cutoff (see
+    horizon()); expects a dict cursor.
+    """
+    step = increment(cursor)
+    mark = 0
+    above = None   # the next higher row seen
+    before = 2 ** 63 - 1
+    while True:
+        cursor.execute(TAIL_SQL, (before, TAIL_PAGE))
+        rows = cursor.fetchall()
+        if not rows:
+            # reached the first event; a recent one may still have a gap below it
+            if above is not None and not above["logged_at"] < cutoff and above["seq"] > step:
+                mark = 0
+            return mark
+        for row in rows:
+            if above is None:
+                mark = row["seq"]
+            elif above["seq"] - row["seq"] > step and not above["logged_at"] < cutoff:
+                mark = row["seq"]
+            if row["logged_at"] < cutoff:
+                return mark
+            above = row
+        before = rows[-1]["seq"]
+
+
+def event(kind, old, new, at):
+    """Event row for a complaint going from old (None if new) to new."""
+    old = old or {}
+    return {
+        "complaint_id": new["id"],
+        "user_id": new.get("user_id"),
+        "kind": kind,
+        "status": new.get("status"),
+        "previous_status": old.get("status"),
+        "priority": new.get("priority"),
+        "previous_priority": old.get("priority"),
+        "type": new.get("type"),
+        "department": new.get("department"),
+        "latitude": new.get("latitude"),
+        "longitude": new.get("longitude"),
+        "at": at,
+    }
+
+
+def change_kind(old, new):
+    """"escalated", "status" or "priority" for an update, or "updated" if neither changed."""
+    if new.get("status") != old.get("status"):
+        return "escalated" if new.get("status") == "Escalated" else "status"
+    if new.get("priority") != old.get("priority"):
+        return "priority"
+    # e.g. a status re-stamped with a fresh timestamp
+    return "updated"
+
+
+def append(cursor, rows):
+    """Insert rows and stamp row_version with their top seq; call last, just before COMMIT."""
+    if not rows:
+        return None
+    cursor.execute(
+        f"INSERT INTO complaint_events ({', '.join(COLUMNS)}) VALUES "
+        + ", ".join(["(" + ",".join(["%s"] * len(COLUMNS)) + ")"] * len(rows)),
+        tuple(row[c] for row in rows for c in COLUMNS),
+    )
+    # a multi-row INSERT takes one consecutive block of seqs; lastrowid is the first
+    top = cursor.lastrowid + (len(rows) - 1) * increment(cursor)
+    ids = sorted({row["complaint_id"] for row in rows})
+    cursor.execute(
+        f"UPDATE complaints SET row_version = %s WHERE id IN ({','.join(['%s'] * len(ids))})",
+        (top, *ids),
+    )
+    return top
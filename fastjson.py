@@ -0,0 +1,72 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+# ===================== FAST JSON RESPONSES =====================
+# List endpoints return rows straight from dictionary cursors. FastAPI would
+# walk every value through jsonable_encoder before json.dumps; here rows go
+# to orjson directly, which encodes datetime/date natively and only calls
+# back into Python for Decimal. Output matches jsonable_encoder: Decimals
+# become floats and datetimes ISO 8601 strings.
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(
+        payload, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# ===================== SPARSE FIELDSETS =====================
+SHAPES = ("rows", "columnar")
+
+
+def select_fields(fields, allowed, default, required=()):
+    """Field names for a comma-separated fields= value, in allowed's order.
+
+    Unknown names raise ValueError; required names are always included.
+    """
+    if not fields:
+        wanted = set(default)
+    else:
+        wanted = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = wanted - set(allowed)
+        if unknown:
+            raise ValueError(
+                f"Unknown fields: {', '.join(sorted(unknown))}; allowed: {', '.join(allowed)}"
+            )
+    wanted.update(required)
+    return [name for name in allowed if name in wanted]
+
+
+def projection(names, allowed):
+    """SELECT list for names, each aliased to its field name."""
+    return ", ".join(f"{allowed[name]} AS {name}" for name in names)
+
+
+def columnar(rows, names):
+    """{name: [value per row]} instead of one dict per row."""
+    return {name: [row[name] for row in rows] for name in names}
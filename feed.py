@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+import config
+
+# ===================== LIVE FEED =====================
+# In-process pub/sub behind the SSE endpoints. Write paths publish after
+# commit (from request threads and the escalation jobs); each SSE
+# connection holds a bounded asyncio queue fed through its event loop.
+#
+# Event ids are "<epoch>-<seq>": seq counts up per process and the last
+# RING_SIZE events are kept, so a reconnecting client's Last-Event-ID
+# replays exactly what it missed. An id from another process (epoch
+# differs) or older than the ring gets a "reset" event instead, telling
+# the client to refetch. A subscriber whose queue fills up is cut off with
+# an "overflow" event rather than slowing publishers; it reconnects and
+# resumes from the ring.
+#
+# Only this worker's writes are seen; with several workers, clients on
+# one miss changes committed on another until they refetch.
+
+OVERFLOW = object()
+
+
+class Subscription:
+    def __init__(self, loop, match, queue_size):
+        self.loop = loop
+        self.match = match
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, item):
+        # runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.queue.maxsize - 1:
+            # keep the last slot for the marker so the client learns why it was cut off
+            self.overflowed = True
+            self.queue.put_nowait(OVERFLOW)
+            return
+        self.queue.put_nowait(item)
+
+
+class EventBus:
+    def __init__(self, ring_size, queue_size):
+        self.epoch = format(int(time.time()), "x")
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._ring = deque(maxlen=ring_size)   # (seq, event)
+        self._subscribers = set()
+
+        self._published = 0
+        self._overflows = 0
+
+    def publish(self, event):
+        """Record event (a dict with at least "type") and fan it out; thread-safe."""
+        with self._lock:
+            self._seq += 1
+            event = {**event, "id": f"{self.epoch}-{self._seq}"}
+            self._ring.append((self._seq, event))
+            self._published += 1
+            subscribers = [sub for sub in self._subscribers if sub.match(event)]
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # loop already closed; the connection is gone
+                self.unsubscribe(sub)
+
+    def subscribe(self, match, last_event_id=None):
+        """(subscription, missed events, complete); complete is False when a reset is needed.
+
+        Registering and reading the ring happen under one lock, so nothing
+        published in between is lost or delivered twice.
+        """
+        sub = Subscription(asyncio.get_running_loop(), match, self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+            if not last_event_id:
+                return sub, [], True
+            epoch, _, seq = last_event_id.partition("-")
+            if epoch != self.epoch or not seq.isdigit():
+                return sub, [], False
+            seq = int(seq)
+            oldest = self._ring[0][0] if self._ring else self._seq + 1
+            complete = seq >= oldest - 1
+            missed = [event for s, event in self._ring if s > seq and match(event)]
+            return sub, missed, complete
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+            if sub.overflowed:
+                self._overflows += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "subscribers": len(self._subscribers),
+                "published": self._published,
+                "ring": len(self._ring),
+                "overflows": self._overflows,
+            }
+
+
+def sse(event_type, data, event_id=None):
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream(request, match):
+    """SSE body for one connection: missed events, then live ones, with heartbeats."""
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    sub, missed, complete = bus.subscribe(match, last_event_id)
+    try:
+        yield f"retry: {config.FEED_RETRY_MS}\n\n"
+        if not complete:
+            yield sse("reset", {"epoch": bus.epoch})
+        for event in missed:
+            yield sse(event["type"], event, event["id"])
+        while True:
+            try:
+                item = await asyncio.wait_for(sub.queue.get(), timeout=config.FEED_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            if item is OVERFLOW:
+                yield sse("overflow", {"detail": "Client too slow; reconnect to resume"})
+                return
+            yield sse(item["type"], item, item["id"])
+    finally:
+        bus.unsubscribe(sub)
+
+
+bus = EventBus(config.FEED_RING_SIZE, config.FEED_QUEUE_SIZE)
@@ -0,0 +1,145 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0
+SRID = 4326
+
+
+# ===================== WKT HELPERS =====================
+# All WKT here is written longitude-first and parsed with
+# ST_GeomFromText(wkt, 4326, 'axis-order=long-lat'), so the SQL never depends
+# on MySQL's latitude-first default for SRID 4326.
+GEOM_FROM_WKT = "ST_GeomFromText(%s, 4326, 'axis-order=long-lat')"
+
+def point_wkt(lat, lng) -> str:
+    # complaints without coordinates get a placeholder point; queries still
+    # filter on latitude/longitude IS NOT NULL
+    if lat is None or lng is None:
+        return "POINT(0 0)"
+    return f"POINT({float(lng)} {float(lat)})"
+
+# SRID 4326 takes longitudes in (-180, 180]; boxes reaching the western
+# edge stop just inside it. Boxes are not split at the antimeridian, so one
+# crossing it must be sent as two queries.
+MIN_LNG = -179.9999999
+
+def bbox_wkt(min_lat, max_lat, min_lng, max_lng) -> str:
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lng, max_lng = max(min_lng, MIN_LNG), min(max_lng, 180.0)
+    return (
+        f"POLYGON(({min_lng} {min_lat}, {max_lng} {min_lat}, {max_lng} {max_lat}, "
+        f"{min_lng} {max_lat}, {min_lng} {min_lat}))"
+    )
+
+
+# ===================== DISTANCE =====================
+def bounding_box(lat: float, lng: float, radius_km: float):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing a radius around a point."""
+    lat_delta = radius_km / 111.0
+    lng_delta = radius_km / (111.0 * max(0.2, math.cos(math.radians(lat))))
+    return lat - lat_delta, lat + lat_delta, lng - lng_delta, lng + lng_delta
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ===================== GEOHASH =====================
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32)}
+KM_PER_DEG_LAT = 111.0
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # geohash interleaves bits starting with longitude
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                value = value * 2 + 1
+                lng_lo = mid
+            else:
+                value = value * 2
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value = value * 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+def geohash_bbox(cell: str):
+    """(min_lat, max_lat, min_lng, max_lng) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for ch in cell:
+        value = _BASE32_INDEX[ch]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+def geohash_cell_size(precision: int):
+    """(lat_degrees, lng_degrees) spanned by one cell at this precision."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+def geohash_precision_for_radius(radius_km: float, max_precision: int = 8) -> int:
+    """Finest precision whose cells are at least half radius_km tall.
+
+    A cell grown by the radius on every side then spans at most ~3 radii,
+    so cached per-cell candidate sets stay small.
+    """
+    precision = 1
+    for p in range(1, max_precision + 1):
+        if geohash_cell_size(p)[0] * KM_PER_DEG_LAT >= radius_km / 2:
+            precision = p
+    return precision
+
+def geohash_cells_in_bbox(min_lat, max_lat, min_lng, max_lng, precision):
+    """Every cell at this precision that overlaps the box."""
+    lat_step, lng_step = geohash_cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            cells.add(geohash_encode(min(lat, max_lat), min(lng, max_lng), precision))
+            if lng >= max_lng:
+                break
+            lng += lng_step
+        if lat >= max_lat:
+            break
+        lat += lat_step
+    return cells
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+import config
+
+
+class HashQueueFull(Exception):
+    """Every worker is busy and the waiting queue is at capacity."""
+
+
+class HashTimeout(Exception):
+    """A hash job didn't finish within the pool timeout."""
+
+
+# ===================== WORKER-SIDE FUNCTIONS =====================
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+def _check_password(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+def _time_hash(rounds: int) -> float:
+    started = time.perf_counter()
+    bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(rounds=rounds))
+    return time.perf_counter() - started
+
+
+def hash_rounds(hashed: str) -> int:
+    """Cost factor stored in a modular-crypt bcrypt hash ("$2b$12$...")."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+# ===================== BOUNDED HASH POOL =====================
+class HashPool:
+    def __init__(self, workers, queue_size, timeout, rounds, pinned=False):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        # cost factor used for new hashes; replaced by calibrate() unless pinned
+        self.rounds = rounds
+        self.pinned = pinned
+        self.calibration = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+        # recent end-to-end latencies (queue wait + hashing), seconds
+        self._latencies = deque(maxlen=512)
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        self.start()
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise HashQueueFull("password hashing queue is full")
+            self._in_flight += 1
+
+        started = time.perf_counter()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+                self._failed += 1
+            raise
+        # the slot is held until the job really ends, not until this caller
+        # gives up waiting: a timed-out hash still occupies its worker
+        future.add_done_callback(self._release)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()   # drops it if it never left the queue
+            with self._lock:
+                self._failed += 1
+            raise HashTimeout(f"password hashing took longer than {self.timeout}s")
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+
+        with self._lock:
+            self._completed += 1
+            self._latencies.append(time.perf_counter() - started)
+        return result
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def calibrate(self, target_ms, min_rounds, max_rounds):
+        """Pick the highest cost whose hash time on a worker fits target_ms.
+
+        Each extra round doubles the work, so the scan stops at the first
+        cost over budget; min_rounds is used even if it is already over.
+        """
+        self.start()
+        timings = {}
+        chosen = min_rounds
+        for rounds in range(min_rounds, max_rounds + 1):
+            # best of two, so a cold worker doesn't skew the first sample
+            elapsed = min(self._executor.submit(_time_hash, rounds).result() for _ in range(2))
+            timings[rounds] = round(elapsed * 1000, 1)
+            if elapsed * 1000 > target_ms:
+                break
+            chosen = rounds
+
+        self.rounds = chosen
+        self.pinned = False
+        self.calibration = {"target_ms": target_ms, "measured_ms": timings}
+        return chosen
+
+    def needs_rehash(self, hashed: str) -> bool:
+        if self.pinned:
+            # one configured cost for every worker: move hashes to it either way
+            return hash_rounds(hashed) != self.rounds
+        # calibrated: upgrade only, since each worker calibrates on its own and
+        # may land one cost apart; both ways would flip a hash on every login
+        return hash_rounds(hashed) < self.rounds
+
+    def hash_password(self, password: str) -> str:
+        return self._run(_hash_password, password.encode("utf-8"), self.rounds).decode("utf-8")
+
+    def check_password(self, password: str, hashed: str) -> bool:
+        return self._run(_check_password, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def is_idle(self):
+        with self._lock:
+            return self._in_flight < self.workers
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            in_flight = self._in_flight
+            stats = {
+                "rounds": self.rounds,
+                "calibration": self.calibration,
+                "workers": self.workers,
+                "queue_capacity": self.queue_size,
+                "in_flight": in_flight,
+                "queue_depth": max(0, in_flight - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "failed": self._failed,
+            }
+
+        def pct(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 1)
+
+        stats["latency_ms"] = {"p50": pct(50), "p90": pct(90), "p99": pct(99)}
+        return stats
+
+
+hash_pool = HashPool(
+    workers=config.HASH_WORKERS,
+    queue_size=config.HASH_QUEUE_SIZE,
+    timeout=config.HASH_TIMEOUT,
+    rounds=config.BCRYPT_ROUNDS or 12,
+    pinned=bool(config.BCRYPT_ROUNDS),
+)
+
+
+def calibrate():
+    if config.BCRYPT_ROUNDS:
+        return hash_pool.rounds
+    return hash_pool.calibrate(
+        config.BCRYPT_TARGET_MS,
+        config.BCRYPT_MIN_ROUNDS,
+        config.BCRYPT_MAX_ROUNDS,
+    )
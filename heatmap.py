@@ -0,0 +1,257 @@
+import math
+import sys
+from array import array
+from collections import Counter
+from datetime import date, timedelta
+
+import config
+from counters import Reconciler
+
+# ===================== HEATMAP GRID =====================
+# Cells are anchored at (0, 0) and sized from the map zoom so that a 256px
+# map tile holds CELLS_PER_TILE x CELLS_PER_TILE of them. The same viewport
+# therefore returns roughly the same number of cells at every zoom,
+# whatever the number of complaints underneath.
+CELLS_PER_TILE = 16
+MIN_ZOOM = 0
+MAX_ZOOM = 20
+# refuse boxes that would bin into more cells than this
+MAX_CELLS = 20000
+
+# binary format: coordinates are fixed-point with this many units per degree
+# (1e5 ~ 1 m), which keeps every value within int32
+FIXED_POINT_SCALE = 100000
+BINARY_MEDIA_TYPE = "application/vnd.fixit.heatmap+int32"
+
+
+def cell_size_deg(zoom: int) -> float:
+    """Edge length in degrees of one heatmap cell at this zoom."""
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+
+def cell_count(min_lat, max_lat, min_lng, max_lng, cell_deg) -> int:
+    """Upper bound on the number of cells a box can bin into."""
+    rows = int((max_lat - min_lat) / cell_deg) + 2
+    cols = int((max_lng - min_lng) / cell_deg) + 2
+    return rows * cols
+
+
+def encode_binary(cells) -> bytes:
+    """Pack [(lat, lng, weight), ...] as little-endian int32s.
+
+    Layout: n, then n triples. The first triple is absolute; each later one
+    stores lat/lng as deltas from the previous cell. Cells are sorted first,
+    so the deltas stay small.
+    """
+    values = array("i", [len(cells)])
+    prev_lat = prev_lng = 0
+    for lat, lng, weight in sorted(
+        (round(lat * FIXED_POINT_SCALE), round(lng * FIXED_POINT_SCALE), int(weight))
+        for lat, lng, weight in cells
+    ):
+        values.extend((lat - prev_lat, lng - prev_lng, weight))
+        prev_lat, prev_lng = lat, lng
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+# ===================== PRE-BINNED CELLS =====================
+# heatmap_cells holds one row per (zoom, cell, reported day, status, type)
+# for every zoom up to BINNED_MAX_ZOOM: the complaint count and the sums of
+# their fixed-point coordinates, from which a cell's centroid is read back.
+# A tile request sums those rows over its cells, so its cost depends on
+# the cells and days in view, not on the complaints behind them. Zooms
+# above BINNED_MAX_ZOOM cover boxes small enough to bin raw rows from the
+# SPATIAL index.
+#
+# Maintained like the hourly rollups: writers add the difference between a
+# complaint's old and new contributions inside their own transaction, and
+# reconcile() recounts a recent window from source to fix drift.
+
+LOCK_NAME = "fixit_heatmap_reconcile"
+BINNED_MAX_ZOOM = min(MAX_ZOOM, config.HEATMAP_BINNED_MAX_ZOOM)
+BINNED_ZOOMS = range(MIN_ZOOM, BINNED_MAX_ZOOM + 1)
+DIMENSIONS = ("zoom", "cell_row", "cell_col", "day", "status", "type")
+METRICS = ("weight", "lat_sum", "lng_sum")
+# complaints store coordinates as DECIMAL(.., 8)
+COORDINATE_DIGITS = 8
+
+CREATE_CELLS = """
+CREATE TABLE IF NOT EXISTS heatmap_cells (
+    zoom TINYINT NOT NULL,
+    cell_row INT NOT NULL,
+    cell_col INT NOT NULL,
+    day DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    weight BIGINT NOT NULL DEFAULT 0,
+    lat_sum BIGINT NOT NULL DEFAULT 0,
+    lng_sum BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (zoom, cell_row, cell_col, day, status, type),
+    INDEX idx_heatmap_cells_day (day)
+)
+"""
+
+# (zoom, first row, last row, first col, last col) + filters, see cells_sql()
+CELLS_SQL = """
+    SELECT SUM(lat_sum), SUM(lng_sum), SUM(weight)
+    FROM heatmap_cells
+    WHERE zoom = %s
+      AND cell_row BETWEEN %s AND %s
+      AND cell_col BETWEEN %s AND %s
+      {filters}
+    GROUP BY cell_row, cell_col
+    HAVING SUM(weight) > 0
+"""
+
+
+def cell_of(lat, lng, zoom):
+    """(row, col) of the zoom's cell holding a point."""
+    cell_deg = cell_size_deg(zoom)
+    return math.floor(lat / cell_deg), math.floor(lng / cell_deg)
+
+
+def contributions(row, zooms=BINNED_ZOOMS):
+    """{(zoom, cell_row, cell_col, day, status, type): Counter(metric -> n)} for one complaint.
+
+    Rows missing a coordinate, status, type or reported_at contribute nothing.
+    """
+    if any(row.get(c) is None for c in ("latitude", "longitude", "status", "type", "reported_at")):
+        return {}
+    # rounded as stored, so writers and reconcile() bin the same value
+    lat = round(float(row["latitude"]), COORDINATE_DIGITS)
+    lng = round(float(row["longitude"]), COORDINATE_DIGITS)
+    metrics = Counter(
+        weight=1, lat_sum=round(lat * FIXED_POINT_SCALE), lng_sum=round(lng * FIXED_POINT_SCALE),
+    )
+    day = row["reported_at"].date() if hasattr(row["reported_at"], "date") else row["reported_at"]
+    return {
+        (zoom, *cell_of(lat, lng, zoom), day, row["status"], row["type"]): metrics
+        for zoom in zooms
+    }
+
+
+def changes(old, new, weight=1):
+    """Cell deltas for a complaint going from old to new (either may be None)."""
+    delta = {}
+    for row, sign in ((new, weight), (old, -weight)):
+        for key, metrics in contributions(row or {}).items():
+            cell = delta.setdefault(key, Counter())
+            for metric, n in metrics.items():
+                cell[metric] += n * sign
+    return delta
+
+
+def merge(into, delta):
+    for key, metrics in delta.items():
+        into.setdefault(key, Counter()).update(metrics)
+    return into
+
+
+def apply(cursor, delta):
+    """Add delta to heatmap_cells; call inside the writer's transaction."""
+    rows = [
+        (*key, *(metrics[m] for m in METRICS))
+        for key, metrics in sorted(delta.items())
+        if any(metrics.values())
+    ]
+    if not rows:
+        return
+    columns = (*DIMENSIONS, *METRICS)
+    placeholders = "(" + ",".join(["%s"] * len(columns)) + ")"
+    cursor.execute(
+        f"INSERT INTO heatmap_cells ({', '.join(columns)}) VALUES "
+        + ", ".join([placeholders] * len(rows))
+        + " ON DUPLICATE KEY UPDATE "
+        + ", ".join(f"{m} = {m} + VALUES({m})" for m in METRICS),
+        tuple(v for row in rows for v in row),
+    )
+
+
+def cells_sql(status=None, complaint_type=None, since=None, until=None):
+    """CELLS_SQL with its optional filters, and the parameters they add."""
+    filters = ""
+    params = []
+    for clause, value in (
+        ("status = %s", status),
+        ("type = %s", complaint_type),
+        ("day >= %s", since),
+        ("day < %s", until),
+    ):
+        if value is not None:
+            filters += f" AND {clause}"
+            params.append(value)
+    return CELLS_SQL.format(filters=filters), params
+
+
+# ===================== RECONCILIATION =====================
+SOURCE_SQL = """
+    SELECT latitude, longitude, status, type, DATE(reported_at), COUNT(*)
+    FROM complaints
+    WHERE reported_at >= %s
+      AND latitude IS NOT NULL AND longitude IS NOT NULL
+    GROUP BY latitude, longitude, status, type, DATE(reported_at)
+"""
+
+
+def reconcile(conn, cursor, days=None, lock_timeout=0):
+    """Recount cells of complaints reported in the last `days` days (all history if 0).
+
+    Same approach as rollups.reconcile, one zoom at a time so only one
+    zoom's cells are held in memory. Returns {zoom: cells corrected}, or
+    None if another worker is already reconciling. Expects a tuple cursor.
+    """
+    days = config.HEATMAP_RECONCILE_DAYS if days is None else days
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, lock_timeout))
+    if cursor.fetchone()[0] != 1:
+        conn.rollback()
+        return None
+
+    try:
+        conn.rollback()
+        conn.start_transaction(consistent_snapshot=True)
+        since = date.today() - timedelta(days=days - 1) if days else date(1000, 1, 1)
+
+        cursor.execute(SOURCE_SQL, (since,))
+        groups = cursor.fetchall()
+        corrected = {}
+        for zoom in BINNED_ZOOMS:
+            source = {}
+            for lat, lng, status, type_, day, n in groups:
+                row = {"latitude": lat, "longitude": lng, "status": status, "type": type_, "reported_at": day}
+                for key, metrics in contributions(row, (zoom,)).items():
+                    cell = source.setdefault(key, Counter())
+                    for metric, value in metrics.items():
+                        cell[metric] += value * n
+
+            current = {}
+            cursor.execute(
+                f"SELECT {', '.join(DIMENSIONS)}, {', '.join(METRICS)} "
+                "FROM heatmap_cells WHERE zoom = %s AND day >= %s",
+                (zoom, since),
+            )
+            for *key, weight, lat_sum, lng_sum in cursor.fetchall():
+                current[tuple(key)] = Counter(weight=int(weight), lat_sum=int(lat_sum), lng_sum=int(lng_sum))
+
+            drift = {}
+            for key in source.keys() | current.keys():
+                want, have = source.get(key, Counter()), current.get(key, Counter())
+                diff = Counter({m: want[m] - have[m] for m in METRICS if want[m] != have[m]})
+                if diff:
+                    drift[key] = diff
+            apply(cursor, drift)
+            if drift:
+                corrected[zoom] = len(drift)
+
+        conn.commit()
+        return corrected
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+
+
+reconciler = Reconciler(reconcile, "heatmap")
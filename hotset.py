@@ -0,0 +1,239 @@
+import threading
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # hot set is optional; callers fall back to SQL
+    np = None
+
+import config
+import ranking
+from geo import EARTH_RADIUS_KM, bounding_box
+
+STATUSES = ["Reported", "Acknowledged", "InProgress", "Resolved", "Escalated"]
+STATUS_CODE = {s: i for i, s in enumerate(STATUSES)}
+
+LOAD_SQL = """
+    SELECT id, type, priority, department, status, description,
+           latitude, longitude, reported_at, escalated_at
+    FROM complaints
+    WHERE status <> 'Resolved'
+"""
+
+
+class _Codes:
+    """Interns short repeated strings (type, priority, department) as ints."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        if value not in self.codes:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        return self.codes[value]
+
+
+def _ts(value):
+    return value.timestamp() if isinstance(value, datetime) else np.nan
+
+
+class _Table:
+    """Column arrays for the open complaints, grown by doubling."""
+
+    def __init__(self, capacity=1024):
+        self.n = 0
+        self.row_of = {}
+        self.descriptions = {}
+        self.types = _Codes()
+        self.priorities = _Codes()
+        self.departments = _Codes()
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.lat = np.full(capacity, np.nan)
+        self.lng = np.full(capacity, np.nan)
+        self.type = np.zeros(capacity, dtype=np.int32)
+        self.priority = np.zeros(capacity, dtype=np.int32)
+        self.department = np.zeros(capacity, dtype=np.int32)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.reported_at = np.full(capacity, np.nan)
+        self.escalated_at = np.full(capacity, np.nan)
+
+    _COLUMNS = ("ids", "lat", "lng", "type", "priority", "department",
+                "status", "reported_at", "escalated_at")
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in self._COLUMNS}
+        self._alloc(len(self.ids) * 2)
+        for name, values in old.items():
+            getattr(self, name)[:self.n] = values[:self.n]
+
+    def upsert(self, row):
+        cid = int(row["id"])
+        i = self.row_of.get(cid)
+        if i is None:
+            if self.n == len(self.ids):
+                self._grow()
+            i = self.n
+            self.n += 1
+            self.row_of[cid] = i
+
+        lat, lng = row.get("latitude"), row.get("longitude")
+        self.ids[i] = cid
+        self.lat[i] = float(lat) if lat is not None else np.nan
+        self.lng[i] = float(lng) if lng is not None else np.nan
+        self.type[i] = self.types.code(row.get("type"))
+        self.priority[i] = self.priorities.code(row.get("priority"))
+        self.department[i] = self.departments.code(row.get("department"))
+        self.status[i] = STATUS_CODE.get(row.get("status"), 0)
+        self.reported_at[i] = _ts(row.get("reported_at"))
+        self.escalated_at[i] = _ts(row.get("escalated_at"))
+        self.descriptions[cid] = row.get("description")
+
+    def remove(self, cid):
+        i = self.row_of.pop(cid, None)
+        if i is None:
+            return
+        self.descriptions.pop(cid, None)
+        last = self.n - 1
+        if i != last:
+            # move the last row into the hole
+            for name in self._COLUMNS:
+                col = getattr(self, name)
+                col[i] = col[last]
+            self.row_of[int(self.ids[i])] = i
+        self.n = last
+
+
+# ===================== HOT SET =====================
+class HotSet:
+    def __init__(self):
+        self.enabled = config.HOTSET_ENABLED and np is not None
+        self.ready = False
+        self._lock = threading.RLock()
+        self._table = None
+        # mutations seen while a reload is in flight, replayed onto the new table
+        self._replay = None
+        self._stop = threading.Event()
+        self.loaded_at = None
+
+    # ---------- loading ----------
+    def load(self, cursor):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._replay = []
+
+        cursor.execute(LOAD_SQL)
+        table = _Table(max(1024, cursor.rowcount or 0))
+        for row in cursor.fetchall():
+            table.upsert(row)
+
+        with self._lock:
+            for fn, args in self._replay:
+                fn(table, *args)
+            self._replay = None
+            self._table = table
+            self.ready = True
+            self.loaded_at = datetime.now()
+
+    def start_refresh(self, cursor_factory, interval):
+        if not self.enabled or interval <= 0:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    with cursor_factory() as (conn, cursor):
+                        self.load(cursor)
+                except Exception as e:
+                    print(f"⚠️ hot set refresh failed: {e}")
+
+        threading.Thread(target=loop, name="hotset-refresh", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _mutate(self, fn, *args):
+        with self._lock:
+            if self.ready:
+                fn(self._table, *args)
+            if self._replay is not None:
+                self._replay.append((fn, args))
+
+    # ---------- write-path hooks ----------
+    def upsert(self, row):
+        """Insert/refresh a complaint row; resolved complaints drop out."""
+        if row.get("status") == "Resolved":
+            self._mutate(_Table.remove, int(row["id"]))
+        else:
+            self._mutate(_Table.upsert, dict(row))
+
+    # ---------- queries ----------
+    def nearby(self, lat, lng, radius_km, k, order, now: datetime):
+        """The k best open complaints within radius_km, as row dicts."""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        now_ts = now.timestamp()
+        with self._lock:
+            t = self._table
+            n = t.n
+            plat, plng = t.lat[:n], t.lng[:n]
+
+            box = (plat >= min_lat) & (plat <= max_lat) & (plng >= min_lng) & (plng <= max_lng)
+            idx = np.flatnonzero(box)
+            dist = haversine_km(lat, lng, plat[idx], plng[idx])
+            keep = dist <= radius_km
+            idx, dist = idx[keep], dist[keep]
+
+            # rank cheap (position, distance) pairs; only the winners become dicts
+            priorities = t.priorities.values
+            reported = np.nan_to_num(t.reported_at[idx], nan=0.0)
+            best = ranking.top_k(
+                range(len(idx)),
+                k,
+                key=lambda j: ranking.sort_key(
+                    order, priorities[t.priority[idx[j]]], dist[j], reported[j], radius_km, now_ts,
+                ),
+            )
+            return [self._row(t, idx[j], dist[j]) for j in best]
+
+    @staticmethod
+    def _row(t, i, distance_km):
+        cid = int(t.ids[i])
+        reported = t.reported_at[i]
+        return {
+            "id": cid,
+            "description": t.descriptions.get(cid),
+            "type": t.types.values[t.type[i]],
+            "department": t.departments.values[t.department[i]],
+            "priority": t.priorities.values[t.priority[i]],
+            "status": STATUSES[t.status[i]],
+            "reported_at": None if np.isnan(reported) else datetime.fromtimestamp(reported),
+            "latitude": float(t.lat[i]),
+            "longitude": float(t.lng[i]),
+            "distance_km": float(distance_km) if distance_km is not None else None,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ready": self.ready,
+                "open_complaints": self._table.n if self._table else 0,
+                "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            }
+
+
+def haversine_km(lat, lng, lats, lngs):
+    p1 = np.radians(lat)
+    p2 = np.radians(lats)
+    dp = p2 - p1
+    dl = np.radians(lngs - lng)
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+hotset = HotSet()
@@ -0,0 +1,294 @@
+import mysql.connector as sql
+
+import counters
+import dedupe
+import events
+import heatmap
+import rollups
+import sketches
+
+# Ordered schema migrations. Each entry is (version, description, steps);
+# a step is either a SQL string or a callable(conn, cursor). Steps must be
+# safe to re-run, because DDL auto-commits in MySQL and a crash can leave a
+# migration half applied without its schema_version row.
+#
+# Append new migrations at the end; never edit one that has shipped.
+
+LOCK_NAME = "fixit_schema_migrations"
+LOCK_TIMEOUT_S = 120
+
+
+# ===================== HELPERS =====================
+def column_exists(cursor, table, column):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (table, column),
+    )
+    return cursor.fetchone()[0] > 0
+
+def index_exists(cursor, table, index):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """,
+        (table, index),
+    )
+    return cursor.fetchone()[0] > 0
+
+def add_index(table, index, definition):
+    def step(conn, cursor):
+        if not index_exists(cursor, table, index):
+            cursor.execute(f"ALTER TABLE {table} ADD {definition}")
+    return step
+
+def drop_index(table, index):
+    def step(conn, cursor):
+        if index_exists(cursor, table, index):
+            cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}")
+    return step
+
+def add_column(table, column, definition):
+    def step(conn, cursor):
+        if not column_exists(cursor, table, column):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+# ===================== MIGRATION STEPS =====================
+CREATE_USERS = """
+CREATE TABLE IF NOT EXISTS users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    aadhar_no VARCHAR(12) NOT NULL UNIQUE,
+    mobile_no VARCHAR(15) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    lat DECIMAL(10,8) NULL,
+    lng DECIMAL(11,8) NULL,
+    location_text VARCHAR(255) NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+CREATE_COMPLAINTS = """
+CREATE TABLE IF NOT EXISTS complaints (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    description TEXT,
+    image_url TEXT,
+    status ENUM('Reported','Acknowledged','InProgress','Resolved','Escalated') DEFAULT 'Reported',
+    priority VARCHAR(20) NOT NULL,
+    department VARCHAR(50) NOT NULL,
+    latitude DECIMAL(10,8),
+    longitude DECIMAL(11,8),
+    reported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    acknowledged_at DATETIME NULL,
+    in_progress_at DATETIME NULL,
+    resolved_at DATETIME NULL,
+    escalated_at DATETIME NULL,
+    CONSTRAINT fk_complaints_user FOREIGN KEY (user_id) REFERENCES users(id)
+        ON DELETE CASCADE
+)
+"""
+
+def add_spatial_location(conn, cursor, batch_size=5000):
+    """complaints.location POINT SRID 4326, backfilled, then SPATIAL-indexed."""
+    if not column_exists(cursor, "complaints", "location"):
+        cursor.execute("ALTER TABLE complaints ADD COLUMN location POINT NULL SRID 4326")
+
+    # backfill in primary-key ranges so no single UPDATE locks the whole table
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM complaints")
+    max_id = cursor.fetchone()[0]
+    for start in range(0, max_id + 1, batch_size):
+        cursor.execute(
+            """
+            UPDATE complaints
+            SET location = IF(
+                latitude IS NULL OR longitude IS NULL,
+                ST_GeomFromText('POINT(0 0)', 4326, 'axis-order=long-lat'),
+                ST_GeomFromText(CONCAT('POINT(', longitude, ' ', latitude, ')'), 4326, 'axis-order=long-lat')
+            )
+            WHERE id > %s AND id <= %s AND location IS NULL
+            """,
+            (start, start + batch_size),
+        )
+        conn.commit()
+
+    # SPATIAL indexes require NOT NULL
+    cursor.execute("ALTER TABLE complaints MODIFY location POINT NOT NULL SRID 4326")
+    if not index_exists(cursor, "complaints", "idx_complaints_location"):
+        cursor.execute("ALTER TABLE complaints ADD SPATIAL INDEX idx_complaints_location (location)")
+
+
+def backfill_counters(conn, cursor):
+    # counting from empty tables is just a recount
+    counters.reconcile(conn, cursor, lock_timeout=LOCK_TIMEOUT_S)
+
+
+def backfill_rollups(conn, cursor):
+    # days=0 recounts the whole history
+    rollups.reconcile(conn, cursor, days=0, lock_timeout=LOCK_TIMEOUT_S)
+
+
+def backfill_sketches(conn, cursor):
+    sketches.reconcile(conn, cursor, days=0, lock_timeout=LOCK_TIMEOUT_S)
+
+
+def backfill_heatmap(conn, cursor):
+    heatmap.reconcile(conn, cursor, days=0, lock_timeout=LOCK_TIMEOUT_S)
+
+
+MIGRATIONS = [
+    (1, "users + complaints tables", [CREATE_USERS, CREATE_COMPLAINTS]),
+    (2, "complaints.location spatial column", [add_spatial_location]),
+    (3, "secondary indexes for hot complaint queries", [
+        add_index("complaints", "idx_complaints_status_reported",
+                  "INDEX idx_complaints_status_reported (status, reported_at)"),
+        add_index("complaints", "idx_complaints_user_reported",
+                  "INDEX idx_complaints_user_reported (user_id, reported_at)"),
+        add_index("complaints", "idx_complaints_status_escalated",
+                  "INDEX idx_complaints_status_escalated (status, escalated_at)"),
+        add_index("complaints", "idx_complaints_department",
+                  "INDEX idx_complaints_department (department)"),
+        add_index("complaints", "idx_complaints_priority",
+                  "INDEX idx_complaints_priority (priority)"),
+    ]),
+    # admin complaint list: keyset pages on (reported_at, id), optionally
+    # filtered by one equality column. InnoDB appends the primary key to
+    # every secondary index, so (x, reported_at) is really (x, reported_at, id)
+    # and each page is a single backward range scan.
+    (4, "keyset pagination indexes for the admin complaint list", [
+        add_index("complaints", "idx_complaints_reported",
+                  "INDEX idx_complaints_reported (reported_at)"),
+        add_index("complaints", "idx_complaints_priority_reported",
+                  "INDEX idx_complaints_priority_reported (priority, reported_at)"),
+        add_index("complaints", "idx_complaints_department_reported",
+                  "INDEX idx_complaints_department_reported (department, reported_at)"),
+        # left prefixes of the two above
+        drop_index("complaints", "idx_complaints_priority"),
+        drop_index("complaints", "idx_complaints_department"),
+    ]),
+    (5, "dashboard counters", [
+        counters.CREATE_COUNTERS,
+        counters.CREATE_DAILY_COUNTERS,
+        backfill_counters,
+    ]),
+    (6, "hourly complaint rollups", [
+        rollups.CREATE_ROLLUPS,
+        backfill_rollups,
+    ]),
+    (7, "SLA quantile sketches", [
+        # lets the reconcile jobs recount a recent window with range scans
+        add_index("complaints", "idx_complaints_acknowledged",
+                  "INDEX idx_complaints_acknowledged (acknowledged_at)"),
+        add_index("complaints", "idx_complaints_resolved",
+                  "INDEX idx_complaints_resolved (resolved_at)"),
+        add_index("complaints", "idx_complaints_escalated",
+                  "INDEX idx_complaints_escalated (escalated_at)"),
+        sketches.CREATE_SKETCHES,
+        backfill_sketches,
+    ]),
+    (8, "complaints.submission_id for write-behind replay", [
+        add_column("complaints", "submission_id", "CHAR(32) NULL"),
+        add_index("complaints", "uq_complaints_submission", "UNIQUE KEY uq_complaints_submission (submission_id)"),
+    ]),
+    (9, "near-duplicate complaint links", [
+        add_column("complaints", "reports_count", "INT NOT NULL DEFAULT 1"),
+        dedupe.CREATE_DUPLICATES,
+    ]),
+    (10, "version stamps for complaint detail/history ETags", [
+        add_column("complaints", "version", "INT NOT NULL DEFAULT 1"),
+        add_column("users", "history_version", "INT NOT NULL DEFAULT 1"),
+    ]),
+    (11, "complaint_events change feed", [
+        events.CREATE_EVENTS,
+        events.CREATE_EVENT_SEQ,
+        events.SEED_EVENT_SEQ,
+    ]),
+    (12, "complaints.row_version for citizen delta sync", [
+        add_column("complaints", "row_version", "BIGINT NOT NULL DEFAULT 0"),
+        add_index("complaints", "idx_complaints_user_row_version",
+                  "INDEX idx_complaints_user_row_version (user_id, row_version)"),
+    ]),
+    (13, "complaint_duplicates.submission_id for write-behind replay", [
+        add_column("complaint_duplicates", "submission_id", "CHAR(32) NULL"),
+        add_index("complaint_duplicates", "uq_duplicates_submission",
+                  "UNIQUE KEY uq_duplicates_submission (submission_id)"),
+    ]),
+    (14, "AUTO_INCREMENT complaint event seqs read up to a committed watermark", [
+        "ALTER TABLE complaint_events MODIFY seq BIGINT NOT NULL AUTO_INCREMENT",
+        add_column("complaint_events", "logged_at", "DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)"),
+        "DROP TABLE IF EXISTS complaint_event_seq",
+    ]),
+    (15, "pre-binned heatmap cells", [
+        heatmap.CREATE_CELLS,
+        backfill_heatmap,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ===================== RUNNER =====================
+def current_version(cursor):
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except sql.errors.ProgrammingError as e:
+        if e.errno == 1146:  # ER_NO_SUCH_TABLE: database predates migrations
+            return 0
+        raise
+    return cursor.fetchone()[0] or 0
+
+
+def migrate(conn, cursor):
+    """Bring the schema to LATEST_VERSION; returns the versions applied.
+
+    The common case -- already current -- is a single indexed read with no
+    DDL, so concurrent worker start-ups don't queue on metadata locks. Only
+    when something is pending do workers serialise on a named lock.
+    """
+    version = current_version(cursor)
+    conn.rollback()
+    if version >= LATEST_VERSION:
+        return []
+
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT_S))
+    if cursor.fetchone()[0] != 1:
+        raise RuntimeError("timed out waiting for the schema migration lock")
+
+    applied = []
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # another worker may have migrated while we waited for the lock
+        version = current_version(cursor)
+
+        for number, description, steps in MIGRATIONS:
+            if number <= version:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn, cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (number, description),
+            )
+            conn.commit()
+            applied.append(number)
+            print(f"✅ migration {number} applied: {description}")
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+
+    return applied
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # optional; ranking falls back to a Python loop
+    np = None
+
+import config
+import ranking
+from geo import (
+    bounding_box,
+    geohash_bbox,
+    geohash_cells_in_bbox,
+    geohash_encode,
+    geohash_precision_for_radius,
+    haversine_km,
+)
+from hotset import haversine_km as haversine_km_array
+
+
+class Candidates:
+    """One cached cell: its rows plus their coordinates and report times as arrays.
+
+    Built once per miss, so a hit only pays for the vectorized distance
+    pass and ranking what falls inside the radius.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        lat = [float(row["latitude"]) for row in rows]
+        lng = [float(row["longitude"]) for row in rows]
+        reported_ts = [row["reported_at"].timestamp() if row.get("reported_at") else 0.0 for row in rows]
+        if np is not None:
+            lat, lng, reported_ts = np.array(lat), np.array(lng), np.array(reported_ts)
+        self.lat, self.lng, self.reported_ts = lat, lng, reported_ts
+
+
+# ===================== NEARBY RESULT CACHE =====================
+class NearbyCache:
+    """LRU + TTL cache of nearby candidates, keyed by geohash cell.
+
+    An entry holds every complaint (or every open one) in its cell grown by
+    radius_km on each side, so it is a superset of the answer for any
+    centre inside the cell; callers narrow it to the exact radius and rank
+    per request. It serves the searches the hot set can't: those that
+    include resolved complaints, and open-only ones before the hot set has
+    loaded. A cell over max_rows is remembered as too big, and its
+    searches go to SQL, which can apply LIMIT k directly.
+    """
+
+    def __init__(self, max_entries, ttl, max_rows):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, Candidates or None if too big)
+        self._keys_by_cell = {}         # cell -> set of keys
+        self._max_radius = {}           # precision -> largest radius cached
+        # bumped on every invalidation; a load that raced one is not stored
+        self._generation = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def candidates(self, lat, lng, radius_km, only_unresolved, load):
+        """Superset Candidates for a query, or None if its cell is too big to cache.
+
+        On a miss, load(min_lat, max_lat, min_lng, max_lng, only_unresolved,
+        limit) returns up to limit rows.
+        """
+        precision = geohash_precision_for_radius(radius_km)
+        cell = geohash_encode(lat, lng, precision)
+        key = (cell, round(radius_km, 3), only_unresolved)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+            generation = self._generation
+
+        min_lat, max_lat, min_lng, max_lng = geohash_bbox(cell)
+        # grow the cell by the radius, measured at its most poleward edge
+        widest = max(abs(min_lat), abs(max_lat))
+        south, _, west, _ = bounding_box(widest, 0.0, radius_km)
+        lat_pad, lng_pad = widest - south, -west
+        rows = load(
+            min_lat - lat_pad, max_lat + lat_pad, min_lng - lng_pad, max_lng + lng_pad,
+            only_unresolved, self.max_rows + 1,
+        )
+        found = Candidates(rows) if len(rows) <= self.max_rows else None
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, cell, precision, radius_km, found, now + self.ttl)
+        return found
+
+    def _store(self, key, cell, precision, radius_km, found, expires_at):
+        self._entries[key] = (expires_at, found)
+        self._entries.move_to_end(key)
+        self._keys_by_cell.setdefault(cell, set()).add(key)
+        self._max_radius[precision] = max(self._max_radius.get(precision, 0.0), radius_km)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget(old_key)
+            self._evictions += 1
+
+    def _forget(self, key):
+        keys = self._keys_by_cell.get(key[0])
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_cell[key[0]]
+
+    def invalidate_point(self, lat, lng):
+        """Drop every cached cell whose grown area could contain (lat, lng)."""
+        if lat is None or lng is None:
+            return
+        lat, lng = float(lat), float(lng)
+        with self._lock:
+            self._generation += 1
+            for precision, radius_km in self._max_radius.items():
+                # 10% slack: over-invalidating is harmless, missing a cell is not
+                area = bounding_box(lat, lng, radius_km * 1.1)
+                for cell in geohash_cells_in_bbox(*area, precision):
+                    for key in self._keys_by_cell.pop(cell, ()):
+                        if self._entries.pop(key, None) is not None:
+                            self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_cell.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_rows": self.max_rows,
+                "ttl_s": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+                "invalidations": self._invalidations,
+                "evictions": self._evictions,
+            }
+
+
+def nearest(candidates, lat, lng, radius_km, k, order, now):
+    """Exact-radius filter + top-k ranking over a cached Candidates superset."""
+    now_ts = now.timestamp()
+    rows = candidates.rows
+    if np is not None:
+        dist = haversine_km_array(lat, lng, candidates.lat, candidates.lng)
+        within = np.flatnonzero(dist <= radius_km)
+    else:
+        dist = [haversine_km(lat, lng, a, b) for a, b in zip(candidates.lat, candidates.lng)]
+        within = [i for i, d in enumerate(dist) if d <= radius_km]
+
+    # rank cheap positions; only the winners become dicts
+    best = ranking.top_k(
+        within,
+        k,
+        key=lambda i: ranking.sort_key(
+            order, rows[i].get("priority"), dist[i], candidates.reported_ts[i], radius_km, now_ts,
+        ),
+    )
+    return [{**rows[i], "distance_km": float(dist[i])} for i in best]
+
+
+nearby_cache = NearbyCache(config.NEARBY_CACHE_ENTRIES, config.NEARBY_CACHE_TTL_S, config.NEARBY_CACHE_MAX_ROWS)
@@ -0,0 +1,54 @@
+import heapq
+
+# ===================== NEARBY RANKING =====================
+# order names accepted by /api/complaints/nearby
+ORDERS = ("priority", "distance", "score")
+
+PRIORITY_RANK = {"High": 1, "Medium": 2, "Low": 3}
+UNKNOWN_PRIORITY_RANK = 9
+# weight of each priority in the combined score
+PRIORITY_WEIGHT = {"High": 3.0, "Medium": 2.0, "Low": 1.0}
+# complaints stop gaining urgency from age after this many hours
+SCORE_AGE_CAP_HOURS = 72.0
+
+
+def score(priority, distance_km, radius_km, age_hours) -> float:
+    """Combined urgency, higher first: priority scaled by closeness, plus age."""
+    closeness = max(0.0, 1.0 - distance_km / radius_km)
+    age = min(max(age_hours, 0.0), SCORE_AGE_CAP_HOURS) / SCORE_AGE_CAP_HOURS
+    return PRIORITY_WEIGHT.get(priority, 0.5) * closeness + age
+
+
+def sort_key(order, priority, distance_km, reported_ts, radius_km, now_ts):
+    """Ascending sort key; reported_ts/now_ts are epoch seconds."""
+    if order == "distance":
+        return (distance_km, -reported_ts)
+    if order == "score":
+        age_hours = (now_ts - reported_ts) / 3600
+        return (-score(priority, distance_km, radius_km, age_hours), distance_km)
+    return (PRIORITY_RANK.get(priority, UNKNOWN_PRIORITY_RANK), -reported_ts)
+
+
+def top_k(candidates, k, key):
+    """The k smallest candidates by key, via a bounded heap (O(n log k))."""
+    return heapq.nsmallest(k, candidates, key=key)
+
+
+def sql_order_by(order) -> str:
+    """ORDER BY clause mirroring sort_key, over a derived table of nearby rows.
+
+    The "score" order contains one %s placeholder, bound to radius_km.
+    """
+    if order == "distance":
+        return "distance_km ASC, reported_at DESC"
+    if order == "score":
+        weight = "CASE priority WHEN 'High' THEN 3 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 1 ELSE 0.5 END"
+        age = (
+            f"LEAST(GREATEST(TIMESTAMPDIFF(SECOND, reported_at, NOW()) / 3600, 0), "
+            f"{SCORE_AGE_CAP_HOURS}) / {SCORE_AGE_CAP_HOURS}"
+        )
+        return f"({weight} * GREATEST(0, 1 - distance_km / %s) + {age}) DESC, distance_km ASC"
+    return (
+        "CASE priority WHEN 'High' THEN 1 WHEN 'Medium' THEN 2 WHEN 'Low' THEN 3 "
+        f"ELSE {UNKNOWN_PRIORITY_RANK} END ASC, reported_at DESC"
+    )
@@ -0,0 +1,207 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import config
+from counters import Reconciler
+
+# ===================== HOURLY ROLLUPS =====================
+# complaint_rollups holds one row per (hour, department, type, priority)
+# with event counts and duration sums. Each event lands in the hour it
+# happened: a complaint acknowledged at 14:20 counts toward the 14:00
+# acknowledged tally, and its response time goes there too. Analytics
+# endpoints read only this table.
+#
+# Maintained like the dashboard counters: writers add the difference
+# between a row's old and new contributions inside their own transaction,
+# and reconcile() recounts a recent window from source to fix drift.
+
+LOCK_NAME = "fixit_rollup_reconcile"
+DIMENSIONS = ("department", "type", "priority")
+METRICS = (
+    "created",
+    "acknowledged",
+    "resolved",
+    "escalated",
+    "response_sum_s",
+    "response_count",
+    "resolution_sum_s",
+    "resolution_count",
+)
+
+CREATE_ROLLUPS = """
+CREATE TABLE IF NOT EXISTS complaint_rollups (
+    bucket DATETIME NOT NULL,
+    department VARCHAR(50) NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    priority VARCHAR(20) NOT NULL,
+    created BIGINT NOT NULL DEFAULT 0,
+    acknowledged BIGINT NOT NULL DEFAULT 0,
+    resolved BIGINT NOT NULL DEFAULT 0,
+    escalated BIGINT NOT NULL DEFAULT 0,
+    response_sum_s BIGINT NOT NULL DEFAULT 0,
+    response_count BIGINT NOT NULL DEFAULT 0,
+    resolution_sum_s BIGINT NOT NULL DEFAULT 0,
+    resolution_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, department, type, priority)
+)
+"""
+
+# a DATETIME truncated to its hour, without DATE_FORMAT's % codes
+HOUR_BUCKET_SQL = "TIMESTAMPADD(HOUR, TIMESTAMPDIFF(HOUR, '2000-01-01', {column}), '2000-01-01')"
+
+
+def hour_bucket(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _seconds(start, end) -> int:
+    return int((end - start).total_seconds())
+
+
+def contributions(row):
+    """{(bucket, department, type, priority): Counter(metric -> n)} for one row.
+
+    Only the timestamp columns present in the dict contribute; rows without
+    all three dimensions contribute nothing.
+    """
+    if any(row.get(d) is None for d in DIMENSIONS):
+        return {}
+    dims = tuple(row[d] for d in DIMENSIONS)
+    result = {}
+
+    def add(ts, **metrics):
+        result.setdefault((hour_bucket(ts), *dims), Counter()).update(metrics)
+
+    reported_at = row.get("reported_at")
+    if reported_at is not None:
+        add(reported_at, created=1)
+    if row.get("acknowledged_at") is not None:
+        add(row["acknowledged_at"], acknowledged=1)
+        if reported_at is not None:
+            add(row["acknowledged_at"], response_sum_s=_seconds(reported_at, row["acknowledged_at"]),
+                response_count=1)
+    if row.get("resolved_at") is not None:
+        add(row["resolved_at"], resolved=1)
+        if reported_at is not None:
+            add(row["resolved_at"], resolution_sum_s=_seconds(reported_at, row["resolved_at"]),
+                resolution_count=1)
+    if row.get("escalated_at") is not None:
+        add(row["escalated_at"], escalated=1)
+    return result
+
+
+def changes(old, new, weight=1):
+    """Rollup deltas for a row going from old to new (either may be None)."""
+    delta = {}
+    for row, sign in ((new, weight), (old, -weight)):
+        for key, metrics in contributions(row or {}).items():
+            bucket = delta.setdefault(key, Counter())
+            for metric, n in metrics.items():
+                bucket[metric] += n * sign
+    return delta
+
+
+def merge(into, delta):
+    for key, metrics in delta.items():
+        into.setdefault(key, Counter()).update(metrics)
+    return into
+
+
+def apply(cursor, delta):
+    """Add delta to the rollups; call inside the writer's transaction."""
+    rows = [
+        (*key, *(metrics[m] for m in METRICS))
+        for key, metrics in sorted(delta.items())
+        if any(metrics.values())
+    ]
+    if not rows:
+        return
+    columns = ("bucket", *DIMENSIONS, *METRICS)
+    placeholders = "(" + ",".join(["%s"] * len(columns)) + ")"
+    cursor.execute(
+        f"INSERT INTO complaint_rollups ({', '.join(columns)}) VALUES "
+        + ", ".join([placeholders] * len(rows))
+        + " ON DUPLICATE KEY UPDATE "
+        + ", ".join(f"{m} = {m} + VALUES({m})" for m in METRICS),
+        tuple(v for row in rows for v in row),
+    )
+
+
+# ===================== RECONCILIATION =====================
+def _source_sql(column, metrics):
+    return f"""
+        SELECT {HOUR_BUCKET_SQL.format(column=column)} AS bucket, department, type, priority, {metrics}
+        FROM complaints
+        WHERE {column} >= %s
+        GROUP BY bucket, department, type, priority
+    """
+
+# (timestamp column, SELECT list, metric names in SELECT order)
+SOURCE_QUERIES = (
+    ("reported_at", "COUNT(*)", ("created",)),
+    ("acknowledged_at",
+     "COUNT(*), SUM(TIMESTAMPDIFF(SECOND, reported_at, acknowledged_at)), COUNT(reported_at)",
+     ("acknowledged", "response_sum_s", "response_count")),
+    ("resolved_at",
+     "COUNT(*), SUM(TIMESTAMPDIFF(SECOND, reported_at, resolved_at)), COUNT(reported_at)",
+     ("resolved", "resolution_sum_s", "resolution_count")),
+    ("escalated_at", "COUNT(*)", ("escalated",)),
+)
+
+
+def reconcile(conn, cursor, days=None, lock_timeout=0):
+    """Recount the last `days` days of rollups from source (all history if 0).
+
+    Same approach as counters.reconcile: one consistent snapshot, drift
+    applied as increments. Expects a tuple cursor.
+    """
+    days = config.ROLLUP_RECONCILE_DAYS if days is None else days
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, lock_timeout))
+    if cursor.fetchone()[0] != 1:
+        conn.rollback()
+        return None
+
+    try:
+        conn.rollback()
+        conn.start_transaction(consistent_snapshot=True)
+        if days:
+            since = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+        else:
+            since = datetime(1000, 1, 1)
+
+        source = {}
+        for column, select, metrics in SOURCE_QUERIES:
+            cursor.execute(_source_sql(column, select), (since,))
+            for bucket, department, type_, priority, *values in cursor.fetchall():
+                counts = source.setdefault((bucket, department, type_, priority), Counter())
+                for metric, value in zip(metrics, values):
+                    counts[metric] += int(value or 0)
+
+        current = {}
+        cursor.execute(
+            f"SELECT bucket, {', '.join(DIMENSIONS)}, {', '.join(METRICS)} "
+            "FROM complaint_rollups WHERE bucket >= %s",
+            (since,),
+        )
+        for bucket, department, type_, priority, *values in cursor.fetchall():
+            current[(bucket, department, type_, priority)] = Counter(dict(zip(METRICS, map(int, values))))
+
+        drift = {}
+        for key in source.keys() | current.keys():
+            want, have = source.get(key, Counter()), current.get(key, Counter())
+            diff = Counter({m: want[m] - have[m] for m in METRICS if want[m] != have[m]})
+            if diff:
+                drift[key] = diff
+
+        apply(cursor, drift)
+        conn.commit()
+        return drift
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+
+
+reconciler = Reconciler(reconcile, "rollups")
@@ -0,0 +1,165 @@
+import math
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import config
+from counters import Reconciler
+
+# ===================== SLA QUANTILE SKETCHES =====================
+# Time-to-acknowledge ("response") and time-to-resolve ("resolution") kept
+# as DDSketch-style histograms: durations fall into logarithmic bins whose
+# edges grow by GAMMA, so any quantile read back from a bin is within
+# RELATIVE_ACCURACY of the true value. A sketch is one row per non-empty
+# bin in sla_sketches, per (day, department, priority, metric); merging
+# sketches across days or groups is SUM(count) GROUP BY bin, and removing a
+# sample is a decrement, which the delta-based write path below relies on.
+#
+# RELATIVE_ACCURACY is baked into the stored bins; changing it needs a
+# rebuild of the table.
+
+LOCK_NAME = "fixit_sketch_reconcile"
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+# metric -> timestamp column whose distance from reported_at is measured
+METRICS = {"response": "acknowledged_at", "resolution": "resolved_at"}
+
+CREATE_SKETCHES = """
+CREATE TABLE IF NOT EXISTS sla_sketches (
+    day DATE NOT NULL,
+    department VARCHAR(50) NOT NULL,
+    priority VARCHAR(20) NOT NULL,
+    metric VARCHAR(20) NOT NULL,
+    bin SMALLINT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, department, priority, metric, bin)
+)
+"""
+
+
+def bin_index(seconds) -> int:
+    """Bin 0 holds zero/negative durations; bin i > 0 covers (GAMMA^(i-2), GAMMA^(i-1)]."""
+    if seconds <= 0:
+        return 0
+    return 1 + max(0, math.ceil(math.log(seconds) / _LOG_GAMMA))
+
+
+def bin_value(index) -> float:
+    """Representative duration (seconds) of a bin, within RELATIVE_ACCURACY."""
+    if index <= 0:
+        return 0.0
+    return 2 * GAMMA ** (index - 1) / (GAMMA + 1)
+
+
+def quantiles(histogram, qs):
+    """{q: seconds} from a merged {bin: count} histogram (None when empty)."""
+    total = sum(n for n in histogram.values() if n > 0)
+    if not total:
+        return {q: None for q in qs}
+    bins = sorted((b, n) for b, n in histogram.items() if n > 0)
+    result = {}
+    for q in qs:
+        rank = q * (total - 1)
+        seen = 0
+        for b, n in bins:
+            seen += n
+            if seen > rank:
+                result[q] = bin_value(b)
+                break
+    return result
+
+
+def contributions(row) -> Counter:
+    """{(day, department, priority, metric, bin): 1} for each duration a row has."""
+    keys = Counter()
+    reported_at = row.get("reported_at")
+    if reported_at is None or row.get("department") is None or row.get("priority") is None:
+        return keys
+    for metric, column in METRICS.items():
+        stamped = row.get(column)
+        if stamped is not None:
+            seconds = int((stamped - reported_at).total_seconds())
+            keys[(stamped.date(), row["department"], row["priority"], metric, bin_index(seconds))] += 1
+    return keys
+
+
+def changes(old, new) -> Counter:
+    delta = Counter()
+    delta.update(contributions(new or {}))
+    delta.subtract(contributions(old or {}))
+    return delta
+
+
+def apply(cursor, delta):
+    """Add delta to the sketches; call inside the writer's transaction."""
+    rows = [(*key, n) for key, n in sorted(delta.items()) if n]
+    if not rows:
+        return
+    cursor.execute(
+        "INSERT INTO sla_sketches (day, department, priority, metric, bin, count) VALUES "
+        + ", ".join(["(%s,%s,%s,%s,%s,%s)"] * len(rows))
+        + " ON DUPLICATE KEY UPDATE count = count + VALUES(count)",
+        tuple(v for row in rows for v in row),
+    )
+
+
+# ===================== RECONCILIATION =====================
+def reconcile(conn, cursor, days=None, lock_timeout=0):
+    """Rebuild the last `days` days of sketches from source (all history if 0).
+
+    Same approach as counters.reconcile. Durations are grouped in SQL and
+    binned here, so source and write path bin identically. Expects a tuple
+    cursor.
+    """
+    days = config.SKETCH_RECONCILE_DAYS if days is None else days
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, lock_timeout))
+    if cursor.fetchone()[0] != 1:
+        conn.rollback()
+        return None
+
+    try:
+        conn.rollback()
+        conn.start_transaction(consistent_snapshot=True)
+        since = date.today() - timedelta(days=days - 1) if days else date(1000, 1, 1)
+
+        source = Counter()
+        for metric, column in METRICS.items():
+            cursor.execute(
+                f"""
+                SELECT DATE({column}), department, priority,
+                       TIMESTAMPDIFF(SECOND, reported_at, {column}) AS seconds, COUNT(*)
+                FROM complaints
+                WHERE {column} >= %s AND reported_at IS NOT NULL
+                GROUP BY DATE({column}), department, priority, seconds
+                """,
+                (datetime.combine(since, datetime.min.time()),),
+            )
+            for day, department, priority, seconds, n in cursor.fetchall():
+                source[(day, department, priority, metric, bin_index(seconds))] += n
+
+        current = Counter()
+        cursor.execute(
+            "SELECT day, department, priority, metric, bin, count FROM sla_sketches WHERE day >= %s",
+            (since,),
+        )
+        for day, department, priority, metric, b, n in cursor.fetchall():
+            current[(day, department, priority, metric, b)] += n
+
+        drift = Counter()
+        for key in source.keys() | current.keys():
+            if source[key] != current[key]:
+                drift[key] = source[key] - current[key]
+
+        apply(cursor, drift)
+        conn.commit()
+        return drift
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+
+
+reconciler = Reconciler(reconcile, "sketches")
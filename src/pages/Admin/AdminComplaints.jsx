@@ -6,13 +6,31 @@ import logo from "../../assets/fixit_logo.png";
 function AdminComplaints() {
   const navigate = useNavigate();
   const [complaints, setComplaints] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [total, setTotal] = useState(null);
+  const [statusFilter, setStatusFilter] = useState("");
+  const [loading, setLoading] = useState(false);
+
+  // cursor === null loads the first page and replaces the list
+  const loadPage = (cursor) => {
+    setLoading(true);
+    const params = { limit: 50 };
+    if (cursor) params.cursor = cursor;
+    if (statusFilter) params.status = statusFilter;
+
+    axios.get("http://127.0.0.1:8000/api/admin/complaints", { params })
+      .then(res => {
+        setComplaints(prev => (cursor ? [...prev, ...res.data.items] : res.data.items));
+        setNextCursor(res.data.next_cursor);
+        if (!cursor) setTotal(res.data.total_exact ? `${res.data.total}` : `${res.data.total}+`);
+      })
+      .catch(err => console.error("Error fetching complaints:", err))
+      .finally(() => setLoading(false));
+  };
 
   useEffect(() => {
-    axios.get("http://127.0.0.1:8000/api/admin/complaints")
-
-      .then(res => setComplaints(res.data))
-      .catch(err => console.error("Error fetching complaints:", err));
-  }, []);
+    loadPage(null);
+  }, [statusFilter]);
 
   const statusStyles = {
     "In Progress": "bg-yellow-100 text-yellow-700",
@@ -60,7 +78,25 @@ function AdminComplaints() {
 
       {/* Main Content */}
       <div className="flex-1 p-12">
-        <h1 className="text-4xl font-bold mb-10">All Complaints</h1>
+        <div className="flex items-center justify-between mb-10">
+          <h1 className="text-4xl font-bold">
+            All Complaints
+            {total !== null && <span className="ml-3 text-lg text-gray-500">({total})</span>}
+          </h1>
+
+          <select
+            value={statusFilter}
+            onChange={(e) => setStatusFilter(e.target.value)}
+            className="border rounded-lg px-4 py-2 bg-white"
+          >
+            <option value="">All statuses</option>
+            <option value="Reported">Reported</option>
+            <option value="Acknowledged">Acknowledged</option>
+            <option value="InProgress">In Progress</option>
+            <option value="Escalated">Escalated</option>
+            <option value="Resolved">Resolved</option>
+          </select>
+        </div>
 
         <div className="space-y-8">
           {complaints.map((complaint) => (
@@ -106,6 +142,16 @@ function AdminComplaints() {
           ))}
         </div>
 
+        {nextCursor && (
+          <button
+            onClick={() => loadPage(nextCursor)}
+            disabled={loading}
+            className="mt-10 bg-white border border-[#1E3A8A] text-[#1E3A8A] px-6 py-2 rounded-lg hover:bg-[#EEF2FF] transition"
+          >
+            {loading ? "Loading..." : "Load more"}
+          </button>
+        )}
+
       </div>
     </div>
   );
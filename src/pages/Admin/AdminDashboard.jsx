@@ -3,7 +3,10 @@ import logo from "../../assets/fixit_logo.png";
 import { useNavigate, NavLink } from "react-router-dom";
 import { useEffect, useState } from "react";
 import axios from "axios";
-import { getFirstWorking } from "../../api"; // must exist
+import { getFirstWorking, API_BASE } from "../../api"; // must exist
+
+// escalation events arriving within this window share one stats refetch
+const STATS_REFRESH_DELAY_MS = 1000;
 
 function AdminDashboard() {
   const navigate = useNavigate();
@@ -33,21 +36,73 @@ function AdminDashboard() {
   }, []);
 
   // ✅ Stats fetch (ONLY ONE place)
+  const fetchStats = async () => {
+    try {
+      const { data, path } = await getFirstWorking([
+        "/api/stats",
+        "/stats",
+        "/dashboard",
+        "/api/dashboard",
+      ]);
+      console.log("✅ Stats loaded from:", path);
+      setStats(data);
+    } catch (err) {
+      console.error("❌ Stats fetch failed on all paths:", err);
+    }
+  };
+
+  useEffect(() => {
+    fetchStats();
+  }, []);
+
+  // ✅ Live escalations: pushed by the server instead of polled
   useEffect(() => {
-    (async () => {
+    const source = new EventSource(`${API_BASE}/api/stream/admin`);
+
+    // an escalation sweep emits a burst of events; refetch stats once per burst
+    let statsTimer = null;
+    const refreshStatsSoon = () => {
+      if (statsTimer) return;
+      statsTimer = setTimeout(() => {
+        statsTimer = null;
+        fetchStats();
+      }, STATS_REFRESH_DELAY_MS);
+    };
+
+    source.addEventListener("escalated", (e) => {
+      const event = JSON.parse(e.data);
+      setNotifications((prev) =>
+        [
+          {
+            id: event.complaint_id,
+            type: event.complaint_type,
+            priority: event.priority,
+            department: event.department,
+          },
+          ...prev.filter((item) => item.id !== event.complaint_id),
+        ].slice(0, 10)
+      );
+      refreshStatsSoon();
+    });
+
+    // missed more than the server remembers: reload everything once
+    source.addEventListener("reset", async () => {
       try {
-        const { data, path } = await getFirstWorking([
-          "/api/stats",
-          "/stats",
-          "/dashboard",
-          "/api/dashboard",
-        ]);
-        console.log("✅ Stats loaded from:", path);
-        setStats(data);
+        const res = await axios.get("http://127.0.0.1:8000/escalations");
+        setNotifications(res.data.escalated || []);
       } catch (err) {
-        console.error("❌ Stats fetch failed on all paths:", err);
+        console.error("Escalation fetch failed:", err);
       }
-    })();
+      fetchStats();
+    });
+
+    // on "overflow" the server ends the stream; EventSource reconnects by
+    // itself and resumes from Last-Event-ID
+
+    return () => {
+      source.close();
+      clearTimeout(statsTimer);
+    };
   }, []);
 
   const handleLogout = () => {
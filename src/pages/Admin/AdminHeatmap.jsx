@@ -5,6 +5,25 @@ import L from "leaflet";
 import "leaflet/dist/leaflet.css";
 import "leaflet.heat";
 
+// binary cells: little-endian int32 n, then n (lat, lng, weight) triples;
+// lat/lng are 1e-5 degree fixed point, delta-coded after the first cell
+const FIXED_POINT_SCALE = 100000;
+
+function decodeCells(buffer) {
+  const view = new DataView(buffer);
+  const n = view.getInt32(0, true);
+  const cells = [];
+  let lat = 0;
+  let lng = 0;
+  for (let i = 0; i < n; i++) {
+    const offset = 4 + i * 12;
+    lat += view.getInt32(offset, true);
+    lng += view.getInt32(offset + 4, true);
+    cells.push([lat / FIXED_POINT_SCALE, lng / FIXED_POINT_SCALE, view.getInt32(offset + 8, true)]);
+  }
+  return cells;
+}
+
 export default function AdminHeatmap() {
   const mapRef = useRef(null);
   const navigate = useNavigate();
@@ -20,34 +39,49 @@ export default function AdminHeatmap() {
       attribution: "© OpenStreetMap contributors",
     }).addTo(map);
 
-    // 🔥 CALL FASTAPI HEATMAP ENDPOINT
-    axios.get("http://127.0.0.1:8000/heatmap-data")
-      .then(res => {
-        const points = res.data;
-
-        if (!points.length) {
-          setInsight("No complaints available for heatmap.");
-          return;
-        }
-
-        const heatData = points.map(p => [
-          Number(p.lat),
-          Number(p.lng),
-          0.8
-        ]);
-
-        L.heatLayer(heatData, {
-          radius: 35,
-          blur: 25,
-          maxZoom: 17,
-        }).addTo(map);
-
-        setInsight("Heatmap generated successfully.");
+    const heatLayer = L.heatLayer([], {
+      radius: 35,
+      blur: 25,
+      maxZoom: 17,
+    }).addTo(map);
+
+    // 🔥 CALL FASTAPI HEATMAP ENDPOINT: pre-binned cells for the visible box
+    const loadCells = () => {
+      const bounds = map.getBounds();
+      axios.get("http://127.0.0.1:8000/api/heatmap/tiles", {
+        params: {
+          min_lat: Math.max(bounds.getSouth(), -90),
+          max_lat: Math.min(bounds.getNorth(), 90),
+          // SRID 4326 longitudes are (-180, 180]
+          min_lng: Math.max(bounds.getWest(), -179.9999999),
+          max_lng: Math.min(bounds.getEast(), 180),
+          zoom: map.getZoom(),
+          format: "binary",
+        },
+        responseType: "arraybuffer",
       })
-      .catch(err => {
-        console.error("Error fetching heatmap data:", err);
-        setInsight("Error loading complaint data.");
-      });
+        .then(res => {
+          const cells = decodeCells(res.data);
+
+          if (!cells.length) {
+            heatLayer.setLatLngs([]);
+            setInsight("No complaints available for heatmap.");
+            return;
+          }
+
+          const maxWeight = Math.max(...cells.map(c => c[2]));
+          heatLayer.setLatLngs(cells.map(([lat, lng, weight]) => [lat, lng, 0.3 + 0.7 * weight / maxWeight]));
+
+          setInsight("Heatmap generated successfully.");
+        })
+        .catch(err => {
+          console.error("Error fetching heatmap data:", err);
+          setInsight("Error loading complaint data.");
+        });
+    };
+
+    loadCells();
+    map.on("moveend", loadCells);
 
   }, []);
 
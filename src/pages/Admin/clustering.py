@@ -0,0 +1,139 @@
+import math
+from collections import defaultdict
+
+# Cluster rule for auto-escalation: a complaint is clustered when more than
+# MORE_THAN other open complaints of the same type lie within RADIUS_KM.
+#
+# Points are bucketed per type into a grid whose cells are at most
+# RADIUS_KM/sqrt(2) on a side (a little less, see CELL_SAFETY), so any two
+# points sharing a cell are within the radius of each other. A full cell
+# settles all its members at once; everything else counts neighbours in the
+# cells the radius can reach and stops as soon as the threshold is passed.
+# Cost is O(n) for realistic densities instead of the O(n^2) pair join.
+
+RADIUS_KM = 5.0
+MORE_THAN = 5
+EARTH_RADIUS_KM = 6371.0
+# same sphere as haversine_km, so cell sizes and distances agree
+KM_PER_DEG = EARTH_RADIUS_KM * math.pi / 180
+# the flat-plane diagonal bound is off by rounding-sized amounts on a sphere
+CELL_SAFETY = 0.999
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class ClusterIndex:
+    """Open complaints bucketed for same-type radius queries.
+
+    Supports incremental add/remove, so a long-lived index only has to look
+    at newly reported complaints and their neighbourhoods.
+    """
+
+    def __init__(self, radius_km=RADIUS_KM, more_than=MORE_THAN):
+        self.radius_km = radius_km
+        self.more_than = more_than
+        self.cell_lat = radius_km / math.sqrt(2) * CELL_SAFETY / KM_PER_DEG
+        self.reach_lat = radius_km / KM_PER_DEG
+        self._cells = defaultdict(dict)   # (type, row, col) -> {id: (lat, lng)}
+        self._key_of = {}                 # id -> cell key
+
+    def _cell_lng(self, row):
+        # widest point of the band, so cells are never wider than intended
+        equatorward = min(89.0, abs(row * self.cell_lat), abs((row + 1) * self.cell_lat))
+        return self.cell_lat / math.cos(math.radians(equatorward))
+
+    def _reach_lng(self, lat):
+        """Largest longitude difference to a point within the radius of lat."""
+        sin_radius = math.sin(self.radius_km / EARTH_RADIUS_KM)
+        cos_lat = math.cos(math.radians(lat))
+        if sin_radius >= cos_lat:
+            return 180.0   # the circle takes in a pole
+        return math.degrees(math.asin(sin_radius / cos_lat))
+
+    def _key(self, ctype, lat, lng):
+        row = math.floor(lat / self.cell_lat)
+        return ctype, row, math.floor(lng / self._cell_lng(row))
+
+    def __len__(self):
+        return len(self._key_of)
+
+    def add(self, cid, ctype, lat, lng):
+        self.remove(cid)
+        key = self._key(ctype, float(lat), float(lng))
+        self._cells[key][cid] = (float(lat), float(lng))
+        self._key_of[cid] = key
+
+    def remove(self, cid):
+        key = self._key_of.pop(cid, None)
+        if key is not None:
+            cell = self._cells[key]
+            cell.pop(cid, None)
+            if not cell:
+                del self._cells[key]
+
+    def neighbours(self, cid, limit=None):
+        """Ids of same-type complaints within the radius, up to limit of them."""
+        ctype, _, _ = key = self._key_of[cid]
+        lat, lng = self._cells[key][cid]
+        reach_lng = self._reach_lng(lat)
+        found = []
+        first_row = math.floor((lat - self.reach_lat) / self.cell_lat)
+        last_row = math.floor((lat + self.reach_lat) / self.cell_lat)
+        for r in range(first_row, last_row + 1):
+            width = self._cell_lng(r)
+            first_col = math.floor((lng - reach_lng) / width)
+            last_col = math.floor((lng + reach_lng) / width)
+            for c in range(first_col, last_col + 1):
+                for other, (olat, olng) in self._cells.get((ctype, r, c), {}).items():
+                    if other != cid and haversine_km(lat, lng, olat, olng) <= self.radius_km:
+                        found.append(other)
+                        if limit is not None and len(found) >= limit:
+                            return found
+        return found
+
+    def is_clustered(self, cid):
+        key = self._key_of[cid]
+        # the cell holds cid itself plus len - 1 neighbours
+        if len(self._cells[key]) > self.more_than + 1:
+            return True
+        return len(self.neighbours(cid, limit=self.more_than + 1)) > self.more_than
+
+    def clustered(self, ids=None):
+        """Clustered ids among `ids` (default: every indexed complaint)."""
+        if ids is None:
+            result = set()
+            for cell in self._cells.values():
+                if len(cell) > self.more_than + 1:
+                    result.update(cell)
+                else:
+                    result.update(cid for cid in cell if self.is_clustered(cid))
+            return result
+        return {cid for cid in ids if cid in self._key_of and self.is_clustered(cid)}
+
+    def affected_by(self, new_ids):
+        """new_ids plus every indexed complaint near one of them.
+
+        Only these can have crossed the threshold since new_ids were added.
+        """
+        affected = set()
+        for cid in new_ids:
+            if cid in self._key_of:
+                affected.add(cid)
+                affected.update(self.neighbours(cid))
+        return affected
+
+
+def find_clustered(rows, radius_km=RADIUS_KM, more_than=MORE_THAN):
+    """Clustered ids among (id, type, lat, lng) rows, in one pass."""
+    index = ClusterIndex(radius_km, more_than)
+    for cid, ctype, lat, lng in rows:
+        if lat is not None and lng is not None:
+            index.add(cid, ctype, lat, lng)
+    return index.clustered()
@@ -1,7 +1,92 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
 import mysql.connector
-import mysql.connector
+
+from clustering import ClusterIndex
+
+# escalate through the backend's escalate_batch (repository root), so
+# counters, rollups, history stamps and the change feed stay in step
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from escalations import escalate_batch  # noqa: E402
+
+# escalate in id batches so no single UPDATE holds many row locks
+UPDATE_BATCH = 500
+# rebuild the cluster index from scratch every this many runs
+FULL_RESYNC_RUNS = 12
+# clock slack when looking for complaints that left 'Reported'
+SYNC_SLACK = timedelta(minutes=1)
+
+# cluster index of 'Reported' complaints, kept between runs so each run only
+# looks at what changed since the previous one
+_state = {"index": None, "last_id": 0, "synced_at": None, "runs": 0}
+
+
+def _load_index(cursor):
+    index = ClusterIndex()
+    cursor.execute("""
+        SELECT id, type, latitude, longitude
+        FROM complaints
+        WHERE status = 'Reported'
+        AND latitude IS NOT NULL
+        AND longitude IS NOT NULL
+    """)
+    last_id = 0
+    for cid, ctype, lat, lng in cursor.fetchall():
+        index.add(cid, ctype, lat, lng)
+        last_id = max(last_id, cid)
+    _state.update(index=index, last_id=last_id)
+    return None  # None = check every indexed complaint
+
+
+def _sync_index(cursor, since):
+    """Apply changes since the last run; returns ids whose cluster status may have changed."""
+    index = _state["index"]
+
+    # complaints that left 'Reported' (every transition stamps a timestamp)
+    cursor.execute("""
+        SELECT id FROM complaints
+        WHERE status <> 'Reported'
+        AND (acknowledged_at >= %s OR in_progress_at >= %s
+             OR resolved_at >= %s OR escalated_at >= %s)
+    """, (since, since, since, since))
+    for (cid,) in cursor.fetchall():
+        index.remove(cid)
+
+    # newly reported complaints
+    cursor.execute("""
+        SELECT id, type, latitude, longitude
+        FROM complaints
+        WHERE status = 'Reported'
+        AND id > %s
+        AND latitude IS NOT NULL
+        AND longitude IS NOT NULL
+    """, (_state["last_id"],))
+    new_ids = []
+    for cid, ctype, lat, lng in cursor.fetchall():
+        index.add(cid, ctype, lat, lng)
+        new_ids.append(cid)
+        _state["last_id"] = max(_state["last_id"], cid)
+    return index.affected_by(new_ids)
+
+
+def _escalate_ids(connection, ids):
+    """Escalate still-'Reported' complaints among ids, UPDATE_BATCH per transaction."""
+    cursor = connection.cursor(dictionary=True)
+    now = datetime.now().replace(microsecond=0)
+    try:
+        for start in range(0, len(ids), UPDATE_BATCH):
+            escalate_batch(
+                connection, cursor, ids[start:start + UPDATE_BATCH], now,
+                lambda row: row["status"] == "Reported",
+            )
+    finally:
+        cursor.close()
+
 
 def auto_escalate():
+    """Escalate 'Reported' complaints that sit in a same-type cluster."""
     connection = mysql.connector.connect(
         host="localhost",
         user="root",
@@ -10,45 +95,24 @@ def auto_escalate():
     )
 
     cursor = connection.cursor()
+    started_at = datetime.now()
 
-    # Condition 1: Older than 24 hours
-    cursor.execute("""
-        UPDATE complaints
-        SET status = 'Escalated',
-            escalated_at = NOW()
-        WHERE status = 'Reported'
-        AND reported_at <= NOW() - INTERVAL 1 DAY
-    """)
+    # Clustered complaints (more than 5 same type within 5km), found with a
+    # grid index instead of a pairwise self-join. Overdue complaints are not
+    # handled here: the backend's escalation scheduler escalates them at
+    # their SLA deadline.
+    if _state["index"] is None or _state["runs"] % FULL_RESYNC_RUNS == 0:
+        candidates = _load_index(cursor)
+    else:
+        candidates = _sync_index(cursor, _state["synced_at"] - SYNC_SLACK)
+    _state["synced_at"] = started_at
+    _state["runs"] += 1
 
-    # Condition 2: Clustered complaints (more than 5 same type within 5km)
-    cursor.execute("""
-        UPDATE complaints c
-        JOIN (
-            SELECT c1.id
-            FROM complaints c1
-            JOIN complaints c2
-              ON c1.type = c2.type
-              AND c1.id != c2.id
-              AND c1.status = 'Reported'
-              AND c2.status = 'Reported'
-              AND c1.latitude IS NOT NULL
-              AND c1.longitude IS NOT NULL
-              AND c2.latitude IS NOT NULL
-              AND c2.longitude IS NOT NULL
-              AND (
-                6371000 * ACOS(
-                    COS(RADIANS(c1.latitude)) * COS(RADIANS(c2.latitude)) *
-                    COS(RADIANS(c2.longitude) - RADIANS(c1.longitude)) +
-                    SIN(RADIANS(c1.latitude)) * SIN(RADIANS(c2.latitude))
-                )
-              ) <= 5000
-            GROUP BY c1.id
-            HAVING COUNT(c2.id) > 5
-        ) clustered ON c.id = clustered.id
-        SET c.status = 'Escalated',
-            c.escalated_at = NOW()
-    """)
+    index = _state["index"]
+    clustered = sorted(index.clustered(candidates))
+    _escalate_ids(connection, clustered)
+    for cid in clustered:
+        index.remove(cid)
 
-    connection.commit()
     cursor.close()
     connection.close()
@@ -1,9 +1,15 @@
+import threading
+import time
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from mysql.connector import Error
 import mysql.connector as sql
 from escalation import auto_escalate
 
+# seconds between background cluster-escalation runs
+AUTO_ESCALATE_INTERVAL_S = 300
+
 
 app = FastAPI()
 
@@ -26,6 +32,22 @@ def get_connection():
         port=3306
     )
 
+# Escalation runs on its own schedule; GET /api/escalations only reads.
+# Overdue complaints are escalated by the main backend's deadline scheduler
+# (escalations.py, per-department/priority SLAs); this loop only applies
+# the cluster rule, which has no deadline to schedule on.
+@app.on_event("startup")
+def start_auto_escalation():
+    def loop():
+        while True:
+            try:
+                auto_escalate()
+            except Exception as e:
+                print(f"auto-escalation failed: {e}")
+            time.sleep(AUTO_ESCALATE_INTERVAL_S)
+
+    threading.Thread(target=loop, name="auto-escalate", daemon=True).start()
+
 @app.get("/")
 def root():
     return {"message": "FixIt Backend Running 🚀"}
@@ -115,8 +137,6 @@ def get_ai_insight():
 @app.get("/api/escalations")
 def get_escalations():
     try:
-        auto_escalate()  
-
         conn = get_connection()
         cursor = conn.cursor(dictionary=True)
 
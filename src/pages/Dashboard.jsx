@@ -105,7 +105,8 @@ export default function Dashboard() {
             latitude: lat,
             longitude: lng,
             radius_km: 5,
-            limit: 50,
+            k: 5,
+            order: "priority",
             only_unresolved: true,
           }),
         });
@@ -67,22 +67,54 @@ export default function MyComplaints() {
       return;
     }
 
-    (async () => {
+    // last synced list + token, so a visit only downloads what changed
+    const storageKey = `fixit_complaints_${userId}`;
+    let synced = { token: 0, complaints: [] };
+    try {
+      const saved = JSON.parse(localStorage.getItem(storageKey) || "null");
+      if (saved && Array.isArray(saved.complaints)) {
+        synced = saved;
+        setComplaints(saved.complaints);
+        setLoading(false);
+      }
+    } catch {
+      localStorage.removeItem(storageKey);
+    }
+
+    const sync = async (full = false) => {
+      const since = full ? 0 : synced.token;
       try {
-        const res = await fetch(`${API}/api/complaints/user/${userId}`);
+        const res = await fetch(`${API}/api/complaints/user/${userId}/sync?since=${since}`);
         const json = await res.json().catch(() => ({}));
-        if (!res.ok) {
-          setComplaints([]);
-          setLoading(false);
-          return;
+        if (!res.ok || !Array.isArray(json.complaints)) return;
+
+        const byId = new Map(since ? synced.complaints.map((c) => [c.id, c]) : []);
+        json.complaints.forEach((c) => byId.set(c.id, c));
+        const merged = [...byId.values()].sort(
+          (a, b) => new Date(b.reported_at) - new Date(a.reported_at)
+        );
+
+        synced = { token: json.token, complaints: merged };
+        setComplaints(merged);
+        try {
+          localStorage.setItem(storageKey, JSON.stringify(synced));
+        } catch {
+          // storage full: still works, just without the offline copy
         }
-        setComplaints(Array.isArray(json.complaints) ? json.complaints : []);
       } catch {
-        setComplaints([]);
+        // offline: keep showing the last synced list
       } finally {
         setLoading(false);
       }
-    })();
+    };
+    sync();
+
+    // status changes are pushed; each one costs a small delta sync
+    const source = new EventSource(`${API}/api/stream/user/${userId}`);
+    source.addEventListener("status", () => sync());
+    source.addEventListener("escalated", () => sync());
+    source.addEventListener("reset", () => sync());
+    return () => source.close();
   }, [API]);
 
   const mapped = complaints.map((c) => {
@@ -0,0 +1,62 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "pages", "Admin"))
+
+from clustering import MORE_THAN, ClusterIndex, find_clustered, haversine_km
+
+
+def coincident(n, ctype="Pothole", lat=12.9716, lng=77.5946):
+    return [(cid, ctype, lat, lng) for cid in range(1, n + 1)]
+
+
+def test_exactly_more_than_neighbours_is_not_clustered():
+    # more_than + 1 points: each has exactly more_than others, which is not "more than"
+    rows = coincident(MORE_THAN + 1)
+    assert find_clustered(rows) == set()
+
+    index = ClusterIndex()
+    for row in rows:
+        index.add(*row)
+    assert not any(index.is_clustered(cid) for cid, *_ in rows)
+    assert index.clustered([cid for cid, *_ in rows]) == set()
+
+
+def test_one_more_point_clusters_all():
+    rows = coincident(MORE_THAN + 2)
+    assert find_clustered(rows) == {cid for cid, *_ in rows}
+
+
+def test_other_types_do_not_count():
+    rows = coincident(MORE_THAN + 1) + [(100, "Garbage", 12.9716, 77.5946)]
+    assert find_clustered(rows) == set()
+
+
+def test_opposite_corners_of_a_cell_are_not_one_cluster():
+    # two groups ~5.007 km apart across what used to be a single cell's diagonal
+    near = [(cid, "Pothole", 0.00001 + cid * 1e-6, 0.00001) for cid in range(1, 5)]
+    far = [(cid, "Pothole", 0.03184 + cid * 1e-6, 0.03184) for cid in range(5, 8)]
+    rows = near + far
+    # every point has only 3 neighbours within the radius
+    assert find_clustered(rows) == set()
+
+
+def brute_force(rows, radius_km=5.0, more_than=MORE_THAN):
+    return {
+        cid for cid, ctype, lat, lng in rows
+        if sum(
+            1 for oid, otype, olat, olng in rows
+            if oid != cid and otype == ctype and haversine_km(lat, lng, olat, olng) <= radius_km
+        ) > more_than
+    }
+
+
+def test_matches_pairwise_count_at_any_latitude():
+    rng = random.Random(7)
+    for center in (0.0, 28.6, -45.0, 70.0, 88.5):
+        rows = [
+            (cid, "Pothole", center + rng.uniform(-0.1, 0.1), 77.0 + rng.uniform(-0.1, 0.1))
+            for cid in range(300)
+        ]
+        assert find_clustered(rows) == brute_force(rows), center
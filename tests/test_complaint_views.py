@@ -0,0 +1,96 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mysql.connector")
+
+from fastapi.testclient import TestClient
+
+import auth
+from view_cache import view_cache
+
+# a complaints row joined with its owner, as MySQL hands it back, including
+# the binary POINT in location that no JSON encoder accepts
+ROW = {
+    "id": 7,
+    "user_id": 3,
+    "type": "Pothole",
+    "description": "Deep pothole",
+    "image_url": None,
+    "status": "Reported",
+    "priority": "High",
+    "department": "Roads",
+    "latitude": Decimal("12.97160000"),
+    "longitude": Decimal("77.59460000"),
+    "location": b"\xe6\x10\x00\x00\x01\x01\x00\x00\x00\x9a\x99\x99\x99\x99",
+    "reported_at": datetime(2026, 10, 1, 9, 30),
+    "acknowledged_at": None,
+    "in_progress_at": None,
+    "resolved_at": None,
+    "escalated_at": None,
+    "reports_count": 1,
+    "submission_id": None,
+    "version": 4,
+    "row_version": 12,
+    "history_version": 9,
+    "location_text": "MG Road",
+    "linked": 0,
+}
+
+
+class FakeCursor:
+    """Returns ROW restricted to whatever the last SELECT asked for."""
+
+    def __init__(self):
+        self.rows = []
+
+    def execute(self, query, params=None):
+        select = query.split("FROM", 1)[0]
+        if "c.*" in select:
+            names = list(ROW)
+        else:
+            names = re.findall(r"\bAS (\w+)", select) or re.findall(r"SELECT\s+(\w+)", select)
+        self.rows = [{name: ROW[name] for name in names}]
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    @contextmanager
+    def fake_db_cursor(dictionary=True):
+        yield None, FakeCursor()
+
+    monkeypatch.setattr(auth, "db_cursor", fake_db_cursor)
+    view_cache.invalidate(("complaint", ROW["id"]))
+    view_cache.invalidate_user(ROW["user_id"])
+    return TestClient(auth.app)
+
+
+def test_complaint_detail_renders_row_with_location(client):
+    response = client.get(f"/api/complaints/{ROW['id']}")
+
+    assert response.status_code == 200
+    complaint = response.json()["complaint"]
+    assert "location" not in complaint
+    assert complaint["id"] == ROW["id"]
+    assert complaint["location_text"] == "MG Road"
+    assert complaint["latitude"] == 12.9716
+
+
+def test_user_history_renders_row_with_location(client):
+    response = client.get(f"/api/complaints/user/{ROW['user_id']}")
+
+    assert response.status_code == 200
+    [complaint] = response.json()["complaints"]
+    assert "location" not in complaint
+    assert complaint["reported_at"] == "2026-10-01T09:30:00"
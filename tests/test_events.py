@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import config
+import events
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+
+
+class FakeDB:
+    """complaint_events as {seq: logged_at}, and the oldest open writer's start."""
+
+    def __init__(self, logged, oldest_writer=None, step=1):
+        self.logged = logged
+        self.oldest_writer = oldest_writer
+        self.step = step
+        self.rollbacks = 0
+        self.result = []
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def execute(self, query, params=()):
+        if "innodb_trx" in query:
+            self.result = [{"horizon": self.oldest_writer or NOW}]
+        elif "auto_increment_increment" in query:
+            self.result = [{"step": self.step}]
+        elif "seq < %s" in query:
+            before, limit = params
+            seqs = sorted((seq for seq in self.logged if seq < before), reverse=True)[:limit]
+            self.result = [{"seq": seq, "logged_at": self.logged[seq]} for seq in seqs]
+        else:
+            raise AssertionError(query)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def page(db, after):
+    return [{"seq": seq, "logged_at": db.logged[seq]} for seq in sorted(db.logged) if seq > after]
+
+
+def test_gap_held_by_a_long_open_transaction_is_never_passed():
+    # seq 3 belongs to a transaction that started an hour ago and is still open
+    hour_ago = NOW - timedelta(hours=1)
+    logged = {1: hour_ago - timedelta(minutes=5), 2: hour_ago - timedelta(minutes=1),
+              4: hour_ago + timedelta(minutes=1), 5: NOW - timedelta(seconds=1)}
+    db = FakeDB(logged, oldest_writer=hour_ago)
+    cutoff = events.horizon(db, db)
+    assert db.rollbacks == 2
+
+    assert events.watermark(db, cutoff) == 2
+    assert [row["seq"] for row in events.committed(page(db, 0), 0, 1, cutoff)] == [1, 2]
+
+
+def test_gap_is_settled_once_no_writer_is_open():
+    old = NOW - timedelta(hours=1)
+    logged = {1: old, 2: old, 4: old + timedelta(seconds=1), 5: NOW - timedelta(seconds=30)}
+    db = FakeDB(logged)
+    cutoff = events.horizon(db, db)
+    assert events.watermark(db, cutoff) == 5
+    assert [row["seq"] for row in events.committed(page(db, 0), 0, 1, cutoff)] == [1, 2, 4, 5]
+
+
+def test_recent_gap_waits_out_the_slack():
+    # the only writer may have started in the same second as event 4
+    logged = {1: NOW - timedelta(minutes=1), 2: NOW - timedelta(minutes=1),
+              4: NOW - timedelta(seconds=config.EVENTS_GAP_SLACK_S / 2)}
+    db = FakeDB(logged)
+    cutoff = events.horizon(db, db)
+    assert events.watermark(db, cutoff) == 2
+    assert [row["seq"] for row in events.committed(page(db, 0), 0, 1, cutoff)] == [1, 2]
+
+
+def test_step_larger_than_one():
+    logged = {1: NOW - timedelta(hours=1), 3: NOW - timedelta(seconds=10), 5: NOW - timedelta(seconds=5)}
+    db = FakeDB(logged, oldest_writer=NOW - timedelta(hours=2), step=2)
+    cutoff = events.horizon(db, db)
+    assert events.watermark(db, cutoff) == 5
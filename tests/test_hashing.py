@@ -0,0 +1,23 @@
+from hashing import HashPool
+
+
+def pool(rounds, pinned):
+    return HashPool(workers=1, queue_size=0, timeout=1.0, rounds=rounds, pinned=pinned)
+
+
+def stored(rounds):
+    return f"$2b${rounds:02d}$" + "x" * 53
+
+
+def test_pinned_cost_rehashes_up_and_down():
+    hashes = pool(12, pinned=True)
+    assert hashes.needs_rehash(stored(10))
+    assert hashes.needs_rehash(stored(14))
+    assert not hashes.needs_rehash(stored(12))
+
+
+def test_calibrated_cost_only_rehashes_up():
+    hashes = pool(12, pinned=False)
+    assert hashes.needs_rehash(stored(10))
+    assert not hashes.needs_rehash(stored(13))
+    assert not hashes.needs_rehash(stored(12))
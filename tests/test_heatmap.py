@@ -0,0 +1,100 @@
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal
+
+import heatmap
+
+CREATED = {
+    "id": 1,
+    "type": "Pothole",
+    "status": "Reported",
+    "latitude": 12.971598765432,
+    "longitude": 77.594612345678,
+    "reported_at": datetime(2026, 10, 1, 9, 30),
+}
+
+
+class FakeCells:
+    """heatmap_cells and the complaints source query, for reconcile()."""
+
+    def __init__(self, complaints):
+        self.complaints = complaints
+        self.cells = {}
+        self.result = []
+
+    # connection
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def start_transaction(self, consistent_snapshot=False):
+        pass
+
+    # cursor
+    def execute(self, query, params=()):
+        if "GET_LOCK" in query or "RELEASE_LOCK" in query:
+            self.result = [(1,)]
+        elif query.lstrip().startswith("INSERT INTO heatmap_cells"):
+            width = len(heatmap.DIMENSIONS) + len(heatmap.METRICS)
+            for i in range(0, len(params), width):
+                *key, weight, lat_sum, lng_sum = params[i:i + width]
+                self.cells.setdefault(tuple(key), Counter()).update(
+                    weight=weight, lat_sum=lat_sum, lng_sum=lng_sum,
+                )
+        elif "FROM heatmap_cells" in query:
+            zoom, since = params
+            self.result = [
+                (*key, c["weight"], c["lat_sum"], c["lng_sum"])
+                for key, c in self.cells.items()
+                if key[0] == zoom and key[3] >= since
+            ]
+        elif "FROM complaints" in query:
+            groups = Counter(
+                (Decimal(f"{row['latitude']:.8f}"), Decimal(f"{row['longitude']:.8f}"),
+                 row["status"], row["type"], row["reported_at"].date())
+                for row in self.complaints
+            )
+            self.result = [(*key, n) for key, n in groups.items()]
+        else:
+            raise AssertionError(query)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def test_write_deltas_agree_with_a_recount():
+    resolved = {**CREATED, "status": "Resolved"}
+    other = {**CREATED, "id": 2, "latitude": 12.98, "longitude": 77.6}
+    fake = FakeCells([resolved, other])
+    heatmap.apply(fake, heatmap.changes(None, CREATED))
+    heatmap.apply(fake, heatmap.changes(None, other))
+    heatmap.apply(fake, heatmap.changes(CREATED, resolved))
+
+    assert heatmap.reconcile(fake, fake, days=0) == {}
+
+
+def test_recount_fixes_drift():
+    fake = FakeCells([CREATED])
+    corrected = heatmap.reconcile(fake, fake, days=0)
+    assert set(corrected) == set(heatmap.BINNED_ZOOMS)
+    assert heatmap.reconcile(fake, fake, days=0) == {}
+    assert sum(c["weight"] for c in fake.cells.values()) == len(heatmap.BINNED_ZOOMS)
+
+
+def test_status_change_moves_the_weight():
+    delta = heatmap.changes(CREATED, {**CREATED, "status": "Escalated"})
+    by_status = Counter()
+    for key, metrics in delta.items():
+        by_status[key[4]] += metrics["weight"]
+    assert by_status == {"Escalated": len(heatmap.BINNED_ZOOMS), "Reported": -len(heatmap.BINNED_ZOOMS)}
+
+
+def test_cells_sql_filters():
+    query, params = heatmap.cells_sql(status="Reported", since=date(2026, 10, 1))
+    assert "status = %s" in query and "day >= %s" in query and "type = %s" not in query
+    assert params == ["Reported", date(2026, 10, 1)]
@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+# ===================== VERSION STAMPS =====================
+# complaints.version goes up on every UPDATE of a complaint row, and
+# users.history_version on every change to what GET /api/complaints/user/{id}
+# returns for that user: their own complaints, and canonical complaints
+# they reported again as duplicates. ETags are built from these stamps.
+#
+# Writers bump users rows *before* inserting complaints for them: the FK
+# check on insert takes a shared lock on the users row, and two
+# transactions upgrading that to exclusive would deadlock.
+
+
+def bump_users(cursor, user_ids):
+    """history_version += 1 for these users; returns how many rows matched."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    cursor.execute(
+        f"UPDATE users SET history_version = history_version + 1 "
+        f"WHERE id IN ({','.join(['%s'] * len(user_ids))})",
+        tuple(user_ids),
+    )
+    return cursor.rowcount
+
+
+def bump_history(cursor, complaint_ids):
+    """Bump every user whose history shows one of these complaints."""
+    complaint_ids = list(complaint_ids)
+    if not complaint_ids:
+        return
+    placeholders = ",".join(["%s"] * len(complaint_ids))
+    cursor.execute(
+        f"""
+        SELECT user_id FROM complaints WHERE id IN ({placeholders})
+        UNION
+        SELECT user_id FROM complaint_duplicates WHERE complaint_id IN ({placeholders})
+        """,
+        (*complaint_ids, *complaint_ids),
+    )
+    rows = cursor.fetchall()
+    bump_users(cursor, (row["user_id"] if isinstance(row, dict) else row[0] for row in rows))
+
+
+# ===================== VIEW CACHE =====================
+class ViewCache:
+    """LRU of rendered JSON bodies for complaint detail and user history.
+
+    Entries are keyed ("complaint", id) or ("user", id) and hold the version
+    stamp they were rendered at. Within ttl seconds of being loaded or
+    revalidated an entry is served with no database work at all; after that
+    one primary-key read of the stamp revalidates it. Writes in this worker
+    invalidate entries at once, so ttl only bounds how long another
+    worker's write can go unseen.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> [checked_at, version, etag, body, complaint_ids]
+        self._keys_by_complaint = {}    # complaint id -> keys whose body shows it
+        # bumped on every invalidation; a load that raced one is not stored
+        self._generation = 0
+
+        self._hits = 0
+        self._revalidated = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def etag(key, version):
+        return f'"{key[0]}-{key[1]}-v{version}"'
+
+    def lookup(self, key, if_none_match, probe, load):
+        """(etag, body) for key; body is None when if_none_match already matches.
+
+        probe() -> current stamp or None (gone); load() -> (stamp, body bytes,
+        complaint ids shown) or None. Returns None when the view doesn't exist.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now - entry[0] < self.ttl:
+                    self._hits += 1
+                    return self._answer(entry[2], entry[3], if_none_match)
+
+        # stale entry, or a client holding an etag: one stamp read may spare the load
+        if entry is not None or if_none_match:
+            version = probe()
+            if version is None:
+                self.invalidate(key)
+                return None
+            with self._lock:
+                if entry is not None and entry[1] == version:
+                    entry[0] = now
+                    self._revalidated += 1
+                    return self._answer(entry[2], entry[3], if_none_match)
+                if matches(self.etag(key, version), if_none_match):
+                    return self._answer(self.etag(key, version), None, if_none_match)
+
+        loaded = load()
+        if loaded is None:
+            return None
+        version, body, complaint_ids = loaded
+        tag = self.etag(key, version)
+        with self._lock:
+            self._misses += 1
+            if self.enabled and generation == self._generation:
+                self._store(key, [now, version, tag, body, set(complaint_ids)])
+            return self._answer(tag, body, if_none_match)
+
+    def _answer(self, tag, body, if_none_match):
+        if matches(tag, if_none_match):
+            self._not_modified += 1
+            return tag, None
+        return tag, body
+
+    def _store(self, key, entry):
+        self._drop(key)
+        self._entries[key] = entry
+        for cid in entry[4]:
+            self._keys_by_complaint.setdefault(cid, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for cid in entry[4]:
+            keys = self._keys_by_complaint.get(cid)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_complaint[cid]
+        return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            if self._drop(key):
+                self._invalidations += 1
+
+    def invalidate_complaint(self, complaint_id):
+        """Drop the complaint's detail and every user history showing it."""
+        with self._lock:
+            self._generation += 1
+            keys = {("complaint", complaint_id)} | self._keys_by_complaint.get(complaint_id, set())
+            for key in keys:
+                if self._drop(key):
+                    self._invalidations += 1
+
+    def invalidate_user(self, user_id):
+        self.invalidate(("user", user_id))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self._hits,
+                "revalidated": self._revalidated,
+                "misses": self._misses,
+                "not_modified": self._not_modified,
+                "invalidations": self._invalidations,
+                "evictions": self._evictions,
+            }
+
+
+def matches(tag, if_none_match):
+    return bool(if_none_match) and ("*" in if_none_match or tag in if_none_match)
+
+
+def parse_if_none_match(header):
+    """Entity tags listed in an If-None-Match header (weak prefixes ignored)."""
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+view_cache = ViewCache(config.VIEW_CACHE_ENTRIES, config.VIEW_CACHE_TTL_S)
@@ -0,0 +1,361 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import config
+
+# ===================== WRITE-BEHIND QUEUE =====================
+# Optional submission path for complaint storms. A submission is appended
+# to a local journal (flushed + fsynced) and acknowledged with a
+# submission id; a flusher thread then writes queued submissions to MySQL
+# in batches, one transaction per batch, whenever BATCH rows are waiting
+# or the oldest has waited FLUSH_MS. Clients poll the submission id for
+# the complaint id.
+#
+# Journal appends are group-committed: concurrent submitters write their
+# lines, and one of them fsyncs on behalf of all, so a storm costs one
+# fsync per group rather than one per request.
+#
+# Each worker claims its own journal file in the journal directory with
+# an exclusive flock. On startup a worker replays whatever its file still
+# holds; a crashed worker's file is picked up by whichever worker claims
+# it next. Committed batches are marked done in the journal. Once nothing
+# is pending the file is truncated, and once it has grown past
+# COMPACT_BYTES, mostly with finished work, it is rewritten with just the
+# live submissions. complaints.submission_id is unique, so a batch that
+# committed just before a crash is skipped on replay instead of inserted
+# twice.
+#
+# Submission statuses live in the memory of the worker that took the
+# submission. Another worker can answer only once the row is in MySQL;
+# before that, polling it gives 404 even though the submission is queued.
+
+
+class Journal:
+    """Append-only JSON-lines file: submissions, then {"done": [ids]} markers."""
+
+    def __init__(self, directory, slots, compact_bytes):
+        self.directory = directory
+        self.slots = slots
+        self.compact_bytes = compact_bytes
+        self.path = None
+        self._fh = None
+        self._lock_fh = None
+        self._cond = threading.Condition(threading.Lock())
+        self._live = OrderedDict()  # submission id -> its journal line, until marked done
+        self._size = 0              # bytes in the file
+        self._written = 0           # lines written
+        self._synced = 0            # lines known to be on disk
+        self._syncing = False
+        self._syncs = 0
+        self._compactions = 0
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for n in range(self.slots):
+            # the lock lives in its own file, so compaction can replace the journal
+            lock_fh = open(os.path.join(self.directory, f"journal-{n}.lock"), "a+b")
+            try:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_fh.close()
+                continue
+            self._lock_fh = lock_fh
+            self.path = os.path.join(self.directory, f"journal-{n}.log")
+            self._fh = open(self.path, "a+b")
+            return self.path
+        raise RuntimeError(f"all {self.slots} write-behind journals in {self.directory} are in use")
+
+    def replay(self):
+        """Submissions in the file that were never marked done, in order."""
+        self._fh.seek(0)
+        pending = OrderedDict()
+        for line in self._fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # torn final write from a crash; the client never got an ack for it
+                continue
+            if "done" in record:
+                for sid in record["done"]:
+                    pending.pop(sid, None)
+            else:
+                pending[record["sid"]] = record
+        with self._cond:
+            self._live = OrderedDict((sid, self._line(record)) for sid, record in pending.items())
+            self._size = self._fh.tell()
+        return list(pending.values())
+
+    @staticmethod
+    def _line(record):
+        return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+    def append(self, record):
+        """Write one submission; returns once it is on disk."""
+        line = self._line(record)
+        with self._cond:
+            self._live[record["sid"]] = line
+            self._write(line)
+            self._sync(self._written)
+
+    def done(self, sids):
+        """Mark submissions finished; truncates or compacts the file when worthwhile."""
+        with self._cond:
+            for sid in sids:
+                self._live.pop(sid, None)
+            if not self._live:
+                self._rewrite()
+            elif self._size > self.compact_bytes and self._size > 2 * sum(map(len, self._live.values())):
+                self._rewrite()
+            else:
+                self._write(self._line({"done": list(sids)}))
+                self._sync(self._written)
+
+    def _write(self, line):
+        self._fh.write(line)
+        self._size += len(line)
+        self._written += 1
+
+    def _sync(self, ticket):
+        # group commit: the first caller to find no fsync running flushes and
+        # fsyncs every line written so far, outside the lock; the rest wait
+        # for an fsync that covers their own line. Called holding _cond.
+        while self._synced < ticket:
+            if self._syncing:
+                self._cond.wait()
+                continue
+            self._syncing = True
+            self._fh.flush()
+            target = self._written
+            fd = self._fh.fileno()
+            self._cond.release()
+            try:
+                os.fsync(fd)
+            finally:
+                self._cond.acquire()
+                self._syncing = False
+                self._cond.notify_all()
+            self._synced = max(self._synced, target)
+            self._syncs += 1
+
+    def _rewrite(self):
+        """Replace the file with just the live submissions. Called holding _cond."""
+        while self._syncing:
+            self._cond.wait()
+        if self._live:
+            # build the compacted copy aside, then swap it in atomically
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as fh:
+                for line in self._live.values():
+                    fh.write(line)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+            dir_fd = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            self._fh.close()
+            self._fh = open(self.path, "a+b")
+            self._compactions += 1
+        else:
+            self._fh.truncate(0)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self._size = self._fh.seek(0, os.SEEK_END)
+        self._synced = self._written
+
+    def stats(self):
+        with self._cond:
+            return {
+                "path": self.path,
+                "bytes": self._size,
+                "live": len(self._live),
+                "fsyncs": self._syncs,
+                "compactions": self._compactions,
+            }
+
+    def close(self):
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if self._lock_fh is not None:
+                self._lock_fh.close()
+                self._lock_fh = None
+
+
+class WriteBehindQueue:
+    def __init__(self, batch_size, flush_ms, keep):
+        self.enabled = config.WRITE_BEHIND_ENABLED
+        self.batch_size = batch_size
+        self.flush_s = flush_ms / 1000
+        self.keep = keep
+        self.journal = Journal(
+            config.WRITE_BEHIND_JOURNAL_DIR,
+            config.WRITE_BEHIND_JOURNAL_SLOTS,
+            config.WRITE_BEHIND_JOURNAL_COMPACT_BYTES,
+        )
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending = []          # [(enqueued monotonic, record)]
+        self._inflight = 0
+        self._status = OrderedDict()  # submission id -> {"state", "complaint_id"|"error"}
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._submitted = 0
+        self._committed = 0
+        self._failed = 0
+        self._batches = 0
+        self._replayed = 0
+        self._last_error = None
+
+    def _set_status(self, sid, status):
+        self._status[sid] = status
+        self._status.move_to_end(sid)
+        while len(self._status) > self.keep:
+            self._status.popitem(last=False)
+
+    # ---------- submission ----------
+    def open(self):
+        """Claim a journal and queue what it still holds; returns how many."""
+        if not self.enabled:
+            return 0
+        self.journal.open()
+        records = self.journal.replay()
+        now = time.monotonic()
+        with self._lock:
+            for record in records:
+                self._pending.append((now, record))
+                self._set_status(record["sid"], {"state": "queued"})
+            self._replayed = len(records)
+        return len(records)
+
+    def submit(self, fields, reported_at):
+        """Journal one complaint (a dict of ComplaintCreateModel fields); returns its submission id."""
+        sid = uuid.uuid4().hex
+        record = {"sid": sid, "at": reported_at.isoformat(), "data": fields}
+        # outside the queue lock, so concurrent submitters share one fsync
+        self.journal.append(record)
+        with self._cond:
+            self._pending.append((time.monotonic(), record))
+            self._set_status(sid, {"state": "queued"})
+            self._submitted += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return sid
+
+    def status(self, sid):
+        with self._lock:
+            status = self._status.get(sid)
+            return dict(status) if status is not None else None
+
+    # ---------- flushing ----------
+    def _take(self):
+        """Block until a batch is due; returns it (empty once stopped and drained)."""
+        with self._cond:
+            while True:
+                if self._pending:
+                    wait = self._pending[0][0] + self.flush_s - time.monotonic()
+                    if len(self._pending) >= self.batch_size or wait <= 0 or self._stop.is_set():
+                        break
+                    self._cond.wait(wait)
+                elif self._stop.is_set():
+                    return []
+                else:
+                    self._cond.wait()
+            batch = [record for _, record in self._pending[:self.batch_size]]
+            del self._pending[:self.batch_size]
+            self._inflight = len(batch)
+            return batch
+
+    def _requeue(self, batch):
+        now = time.monotonic()
+        with self._lock:
+            self._pending[:0] = [(now, record) for record in batch]
+            self._inflight = 0
+
+    def _finish(self, batch, results):
+        try:
+            self.journal.done([record["sid"] for record in batch])
+        except OSError as e:
+            # committed anyway; replay finds the rows by submission_id
+            with self._lock:
+                self._last_error = str(e)
+            print(f"⚠️ write-behind journal update failed: {e}")
+        with self._lock:
+            for sid, status in results.items():
+                self._set_status(sid, status)
+                if status["state"] == "committed":
+                    self._committed += 1
+                else:
+                    self._failed += 1
+            self._batches += 1
+            self._inflight = 0
+
+    def start(self, cursor_factory, writer, on_committed):
+        """writer(conn, cursor, records) -> ({sid: status}, created rows); it commits."""
+        if not self.enabled:
+            return
+
+        def loop():
+            while True:
+                batch = self._take()
+                if not batch:
+                    return
+                try:
+                    with cursor_factory(dictionary=False) as (conn, cursor):
+                        results, rows = writer(conn, cursor, batch)
+                except Exception as e:
+                    self._requeue(batch)
+                    with self._lock:
+                        self._last_error = str(e)
+                    print(f"⚠️ write-behind flush failed: {e}")
+                    if self._stop.wait(1):
+                        # shutting down with the database unavailable: the journal keeps them
+                        return
+                    continue
+                self._finish(batch, results)
+                if rows:
+                    on_committed(rows)
+
+        self._thread = threading.Thread(target=loop, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Flush what is queued, then release the journal."""
+        with self._cond:
+            self._stop.set()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.journal.close()
+
+    def stats(self):
+        journal = self.journal.stats()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "journal": journal,
+                "queued": len(self._pending),
+                "inflight": self._inflight,
+                "submitted": self._submitted,
+                "committed": self._committed,
+                "failed": self._failed,
+                "batches": self._batches,
+                "replayed": self._replayed,
+                "last_error": self._last_error,
+            }
+
+
+write_behind = WriteBehindQueue(
+    config.WRITE_BEHIND_BATCH, config.WRITE_BEHIND_FLUSH_MS, config.WRITE_BEHIND_STATUS_KEEP
+)